@@ -0,0 +1,178 @@
+# animaciones.py
+# Planificador único de animaciones de la interfaz. Todas las animaciones activas
+# avanzan en un mismo callback del Clock que solo está programado mientras queda
+# alguna: con la pantalla quieta no se ejecuta nada por frame.
+#
+# Solo se animan propiedades que no obligan a recolocar widgets ni a volver a
+# rasterizar texto:
+#   - opacity: Kivy la aplica en el canvas del widget.
+#   - escala:  una transformación (PushMatrix/Scale/PopMatrix) centrada en el widget,
+#              que se crea una vez por widget y se reutiliza en todas sus animaciones.
+# Las animaciones de widgets que no están en la ventana (pantallas que no se ven,
+# popups cerrados) se pausan hasta que vuelven a mostrarse.
+from kivy.animation import AnimationTransition
+from kivy.clock import Clock
+from kivy.graphics import InstructionGroup, PopMatrix, PushMatrix, Scale
+
+PROPIEDADES = ('opacity', 'escala')
+INTERVALO_PAUSA = 0.5  # Comprobación mientras todas las animaciones están fuera de pantalla
+
+
+class Transformacion:
+    """Escala del widget respecto a su centro, insertada al principio de su canvas."""
+
+    def __init__(self, widget):
+        self.scale = Scale(1, 1, 1, origin=widget.center)
+        grupo = InstructionGroup()
+        grupo.add(PushMatrix())
+        grupo.add(self.scale)
+        widget.canvas.before.insert(0, grupo)
+        widget.canvas.after.add(PopMatrix())
+        widget.bind(center=self._al_mover)
+
+    def _al_mover(self, widget, centro):
+        self.scale.origin = centro
+
+    @property
+    def escala(self):
+        return self.scale.x
+
+    @escala.setter
+    def escala(self, valor):
+        self.scale.xyz = (valor, valor, 1)
+
+
+def transformacion(widget):
+    if getattr(widget, '_transformacion', None) is None:
+        widget._transformacion = Transformacion(widget)
+    return widget._transformacion
+
+
+def _leer(widget, propiedad):
+    return transformacion(widget).escala if propiedad == 'escala' else getattr(widget, propiedad)
+
+
+def _escribir(widget, propiedad, valor):
+    if propiedad == 'escala':
+        transformacion(widget).escala = valor
+    else:
+        setattr(widget, propiedad, valor)
+
+
+class Tween:
+    __slots__ = ("widget", "valores", "duracion", "curva", "repetir", "ida_y_vuelta", "al_terminar", "transcurrido")
+
+    def __init__(self, widget, valores, duracion, curva, repetir, ida_y_vuelta, al_terminar):
+        self.widget = widget
+        self.valores = valores  # propiedad -> (inicial, final)
+        self.duracion = duracion
+        self.curva = curva
+        self.repetir = repetir
+        self.ida_y_vuelta = ida_y_vuelta
+        self.al_terminar = al_terminar
+        self.transcurrido = 0.0
+
+    def avanzar(self, dt):
+        """Aplica el valor para el tiempo transcurrido. Devuelve True al terminar."""
+        self.transcurrido += dt
+        if self.repetir and self.transcurrido >= self.duracion:
+            self.transcurrido %= self.duracion
+        progreso = min(self.transcurrido / self.duracion, 1.0) if self.duracion else 1.0
+        if self.ida_y_vuelta:
+            progreso = 1.0 - abs(1.0 - 2.0 * progreso)
+        factor = self.curva(progreso)
+        for propiedad, (inicial, final) in self.valores.items():
+            _escribir(self.widget, propiedad, inicial + (final - inicial) * factor)
+        return not self.repetir and self.transcurrido >= self.duracion
+
+
+class Animador:
+    def __init__(self):
+        self._activas = []
+        self._evento = None
+        self._intervalo = None
+
+    def animar(self, widget, duracion, curva='out_quad', repetir=False, ida_y_vuelta=False, al_terminar=None,
+               **valores):
+        """
+        Anima las propiedades de `valores` (opacity, escala) desde su valor actual.
+        :param repetir: Vuelve a empezar al terminar, hasta que se cancele.
+        :param ida_y_vuelta: Llega al valor final a mitad de la duración y vuelve al inicial.
+        :param al_terminar: Callback(widget) al acabar (no se llama si se cancela).
+        """
+        for propiedad in valores:
+            if propiedad not in PROPIEDADES:
+                raise ValueError(f"Propiedad no animable: {propiedad}")
+        # Una nueva animación sustituye a las que ya movían esas propiedades del widget
+        for tween in self._de(widget):
+            for propiedad in valores:
+                tween.valores.pop(propiedad, None)
+            if not tween.valores:
+                self._activas.remove(tween)
+        inicial = {propiedad: (_leer(widget, propiedad), final) for propiedad, final in valores.items()}
+        tween = Tween(widget, inicial, duracion, getattr(AnimationTransition, curva), repetir, ida_y_vuelta,
+                      al_terminar)
+        self._activas.append(tween)
+        self._programar(0)
+        return tween
+
+    def _de(self, widget):
+        return [tween for tween in self._activas if tween.widget is widget]
+
+    def cancelar(self, widget):
+        """Detiene las animaciones del widget dejando sus propiedades como estén."""
+        for tween in self._de(widget):
+            self._activas.remove(tween)
+
+    def _programar(self, intervalo):
+        if self._intervalo == intervalo:
+            return
+        if self._evento is not None:
+            self._evento.cancel()
+        self._evento = Clock.schedule_interval(self._paso, intervalo)
+        self._intervalo = intervalo
+
+    def _detener(self):
+        if self._evento is not None:
+            self._evento.cancel()
+        self._evento = self._intervalo = None
+
+    def _paso(self, dt):
+        # Con el planificador en pausa dt incluye la espera: no se adelanta a nadie
+        dt = dt if self._intervalo == 0 else 0
+        visibles = 0
+        for tween in list(self._activas):
+            if tween.widget.get_root_window() is None:
+                continue
+            visibles += 1
+            if tween.avanzar(dt):
+                self._activas.remove(tween)
+                if tween.al_terminar:
+                    tween.al_terminar(tween.widget)
+        if not self._activas:
+            self._detener()
+        else:
+            self._programar(0 if visibles else INTERVALO_PAUSA)
+
+    @property
+    def activas(self):
+        return len(self._activas)
+
+
+ANIMADOR = Animador()
+
+
+def animar(widget, duracion, **kwargs):
+    return ANIMADOR.animar(widget, duracion, **kwargs)
+
+
+def cancelar(widget):
+    ANIMADOR.cancelar(widget)
+
+
+def restablecer(widget):
+    """Cancela las animaciones del widget y le devuelve opacidad y escala normales."""
+    ANIMADOR.cancelar(widget)
+    widget.opacity = 1
+    if getattr(widget, '_transformacion', None) is not None:
+        widget._transformacion.escala = 1
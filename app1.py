@@ -1,4 +1,5 @@
 import random
+
 from kivy.app import App
 from kivy.core.window import Window
 from kivy.uix.screenmanager import ScreenManager, Screen
@@ -11,6 +12,8 @@ from kivy.uix.image import Image
 from kivy.uix.behaviors import ButtonBehavior
 from kivy.animation import Animation
 from kivy.graphics import Color, Rectangle
+from cartas import (Mazo, REGISTRO, crear_baraja, barajar, id_por_nombre, GUARDIA, PRINCIPE,
+                    REY, CONDESA, PRINCESA)
 
 # =====================================================
 # CONFIGURACIÓN DE LA VENTANA Y TEMÁTICA MEDIEVAL
@@ -49,97 +52,6 @@ class CardWidget(ButtonBehavior, BoxLayout):
 # =====================================================
 # LÓGICA DEL JUEGO
 # =====================================================
-class Carta:
-    def __init__(self, nombre, valor, descripcion, image_source):
-        self.nombre = nombre
-        self.valor = valor
-        self.descripcion = descripcion
-        self.image_source = image_source
-
-    def __str__(self):
-        return f"{self.nombre} (Valor: {self.valor})"
-
-    def __repr__(self):
-        return self.__str__()
-
-# Definición de las cartas con sus propiedades e imágenes  
-CARTAS_DEFINICION = {
-    "Espía": {
-        "cantidad": 2,
-        "valor": 0,
-        "descripcion": "Efecto del Espía",
-        "imagen": "images/Espia.png"
-    },
-    "Guardia": {
-        "cantidad": 6,
-        "valor": 1,
-        "descripcion": "Adivinar la mano de otro jugador",
-        "imagen": "images/Guardia.png"
-    },
-    "Sacerdote": {
-        "cantidad": 2,
-        "valor": 2,
-        "descripcion": "Mirar la mano de otro jugador",
-        "imagen": "images/Sacerdote.png"
-    },
-    "Baron": {
-        "cantidad": 2,
-        "valor": 3,
-        "descripcion": "Comparar cartas con otro jugador",
-        "imagen": "images/Baron.png"
-    },
-    "Doncella": {
-        "cantidad": 2,
-        "valor": 4,
-        "descripcion": "Protección hasta el siguiente turno",
-        "imagen": "images/Doncella.png"
-    },
-    "Príncipe": {
-        "cantidad": 2,
-        "valor": 5,
-        "descripcion": "Obliga a otro jugador a descartar su mano",
-        "imagen": "images/Principe.png"
-    },
-    "Chanciller": {
-        "cantidad": 2,
-        "valor": 6,
-        "descripcion": "Roba dos cartas y elige una"
-        # Si no se especifica imagen se usará la imagen default.
-    },
-    "Rey": {
-        "cantidad": 1,
-        "valor": 7,
-        "descripcion": "Intercambia mano con otro jugador",
-        "imagen": "images/Rey.png"
-    },
-    "Condesa": {
-        "cantidad": 1,
-        "valor": 8,
-        "descripcion": "Sin efecto adicional",
-        "imagen": "images/Condesa.png"
-    },
-    "Princesa": {
-        "cantidad": 1,
-        "valor": 9,
-        "descripcion": "Si se juega, el jugador queda eliminado",
-        "imagen": "images/Princesa.png"
-    }
-}
-
-def crear_baraja():
-    baraja = []
-    for nombre, info in CARTAS_DEFINICION.items():
-        for _ in range(info["cantidad"]):
-            # Se obtiene la imagen; si no se define, se usa "images/default.png"
-            image_source = info.get("imagen", "images/default.png")
-            carta = Carta(nombre, info["valor"], info["descripcion"], image_source)
-            baraja.append(carta)
-    return baraja
-
-def barajar(baraja):
-    random.shuffle(baraja)
-    return baraja
-
 class Jugador:
     def __init__(self, nombre):
         self.nombre = nombre
@@ -203,10 +115,11 @@ class GameScreen(Screen):
         
         # Variables de estado
         self.players = []
-        self.deck = []
+        self.deck = Mazo()
         self.turn = 0
         self.current_player = None
         self.card_played = False  # Bandera para saber si se jugó una carta en el turno actual
+        self.efectos = self.crear_tabla_efectos()
 
         # Layout principal
         self.layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
@@ -227,15 +140,17 @@ class GameScreen(Screen):
         self.rect.size = self.size
         self.rect.pos = self.pos
 
-    def start_game(self, players):
+    def start_game(self, players, semilla=None):
         self.players = players
-        self.deck = crear_baraja()
-        barajar(self.deck)
+        # Cada partida tiene su generador: con la misma semilla se reparte igual
+        self.semilla = random.getrandbits(32) if semilla is None else semilla
+        self.rng = random.Random(self.semilla)
+        self.deck = Mazo(barajar(crear_baraja(), self.rng))
         self.turn = 0
         # Repartir una carta inicial a cada jugador
         for jugador in self.players:
             if self.deck:
-                jugador.mano.append(self.deck.pop(0))
+                jugador.mano.append(self.deck.robar())
         self.log_label.text = "Juego iniciado.\n"
         self.next_turn()  # Inicia el primer turno
 
@@ -277,17 +192,17 @@ class GameScreen(Screen):
         self.current_player.protegido = False
         # Robar una carta si es posible
         if self.deck:
-            drawn = self.deck.pop(0)
+            drawn = self.deck.robar()
             self.current_player.mano.append(drawn)
             self.log(f"{self.current_player.nombre} roba: {drawn}")
         else:
             self.log("La baraja se ha agotado.")
 
         # Verificar regla de la Condesa: si hay Condesa junto a Rey o Príncipe, se debe jugar la Condesa
-        if any(carta.nombre == "Condesa" for carta in self.current_player.mano) and \
-           any(carta.nombre in ["Rey", "Príncipe"] for carta in self.current_player.mano):
+        ids = [carta.id for carta in self.current_player.mano]
+        if CONDESA in ids and (REY in ids or PRINCIPE in ids):
             for carta in self.current_player.mano:
-                if carta.nombre == "Condesa":
+                if carta.id == CONDESA:
                     self.log(f"{self.current_player.nombre} debe jugar la Condesa obligatoriamente.")
                     self.play_card(carta)
                     return
@@ -332,30 +247,37 @@ class GameScreen(Screen):
             self.log("Carta no encontrada en la mano.")
 
     def apply_effect(self, carta, jugador_actual):
-        if carta.nombre == "Guardia":
-            self.show_guardia_popup(jugador_actual, carta)
-        elif carta.nombre == "Sacerdote":
-            self.show_sacerdote_popup(jugador_actual, carta)
-        elif carta.nombre == "Baron":
-            self.show_baron_popup(jugador_actual, carta)
-        elif carta.nombre == "Doncella":
-            self.log(f"{jugador_actual.nombre} queda protegida por la Doncella.")
-            jugador_actual.protegido = True
-        elif carta.nombre == "Príncipe":
-            self.show_principe_popup(jugador_actual, carta)
-        elif carta.nombre == "Chanciller":
-            self.log("Efecto del Chanciller no implementado completamente.")
-        elif carta.nombre == "Rey":
-            self.show_rey_popup(jugador_actual, carta)
-        elif carta.nombre == "Condesa":
-            self.log("La Condesa no tiene efecto adicional.")
-        elif carta.nombre == "Princesa":
-            self.log(f"{jugador_actual.nombre} jugó la Princesa y queda eliminado.")
-            jugador_actual.eliminado = True
-        elif carta.nombre == "Espía":
-            self.log("Efecto del Espía no implementado.")
-        else:
-            self.log(f"{carta.nombre} no tiene efecto implementado.")
+        # Una sola consulta por jugada en la tabla indexada por id de carta
+        self.efectos[carta.id](jugador_actual, carta)
+
+    def crear_tabla_efectos(self):
+        """Asocia cada id de carta con el método que muestra su efecto, según cartas.json."""
+        vistas = {
+            "guardia": self.show_guardia_popup,
+            "sacerdote": self.show_sacerdote_popup,
+            "baron": self.show_baron_popup,
+            "doncella": self.efecto_doncella,
+            "principe": self.show_principe_popup,
+            "chanciller": self.efecto_chanciller,
+            "rey": self.show_rey_popup,
+            "princesa": self.efecto_princesa,
+            "ninguno": self.efecto_ninguno,
+        }
+        return tuple(vistas[nombre] for nombre in REGISTRO.efectos)
+
+    def efecto_doncella(self, jugador_actual, carta):
+        self.log(f"{jugador_actual.nombre} queda protegida por la Doncella.")
+        jugador_actual.protegido = True
+
+    def efecto_chanciller(self, jugador_actual, carta):
+        self.log("Efecto del Chanciller no implementado completamente.")
+
+    def efecto_princesa(self, jugador_actual, carta):
+        self.log(f"{jugador_actual.nombre} jugó la Princesa y queda eliminado.")
+        jugador_actual.eliminado = True
+
+    def efecto_ninguno(self, jugador_actual, carta):
+        self.log(f"{carta.nombre} no tiene efecto adicional.")
 
     # -----------------------------
     # Popups para efectos
@@ -386,10 +308,14 @@ class GameScreen(Screen):
             if selected_target["target"] is None:
                 self.log("Debes seleccionar un objetivo.")
             else:
-                guess = guess_input.text.strip().lower()
+                guess = guess_input.text.strip()
                 target = selected_target["target"]
-                if any(c.nombre.lower() == guess for c in target.mano):
-                    if any(c.nombre.lower() == "guardia" for c in target.mano):
+                try:
+                    guess_id = id_por_nombre(guess)
+                except KeyError:
+                    guess_id = None
+                if guess_id is not None and any(c.id == guess_id for c in target.mano):
+                    if any(c.id == GUARDIA for c in target.mano):
                         self.log(f"{target.nombre} tiene un Guardia, no puede ser eliminado.")
                     else:
                         self.log(f"¡Correcto! {target.nombre} tenía {guess} y queda eliminado.")
@@ -486,12 +412,12 @@ class GameScreen(Screen):
         if target.mano:
             discarded = target.mano.pop(0)
             self.log(f"{target.nombre} descarta {discarded}")
-            if discarded.nombre == "Princesa":
+            if discarded.id == PRINCESA:
                 self.log(f"{target.nombre} descartó la Princesa y queda eliminado.")
                 target.eliminado = True
             else:
                 if self.deck:
-                    new_card = self.deck.pop(0)
+                    new_card = self.deck.robar()
                     target.mano.append(new_card)
                     self.log(f"{target.nombre} roba una nueva carta: {new_card}")
                 else:
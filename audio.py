@@ -0,0 +1,241 @@
+# audio.py
+# Servicio de audio de la aplicación. Todo lo que toca el disco (SoundLoader.load) se
+# hace en un hilo de carga; el hilo principal solo recibe el Sound ya listo en un
+# callback del Clock, así que la música y los efectos nunca retrasan un frame.
+#
+# - Música: una lista de pistas que se reproduce con fundido cruzado entre pistas.
+#   La siguiente pista se carga unos segundos antes de que termine la actual. Las
+#   pistas no se guardan en ninguna caché: solo están cargadas la que suena y, durante
+#   el fundido, la que entra; la saliente se descarga al terminar. Con los proveedores
+#   de Kivy que la admiten (ffpyplayer, gstreamer) la pista se lee del disco a medida
+#   que suena en lugar de decodificarse entera.
+# - Efectos: los clips los precarga y reproduce el mezclador (mezclador.py) con
+#   cargar(); el servicio solo atenúa la música mientras suenan.
+import os
+import queue
+import threading
+import time
+
+from kivy.clock import Clock
+from kivy.core.audio import SoundLoader
+from kivy.logger import Logger
+
+FUNDIDO = 2.0          # Duración del fundido cruzado entre pistas, en segundos
+PRECARGA = 5.0         # Segundos antes del fundido en que se carga la siguiente pista
+INTERVALO_VIGILANCIA = 0.25
+INTERVALO_FUNDIDO = 1 / 30
+
+
+class ServicioAudio:
+    """
+    Música con lista de reproducción y fundido cruzado, y carga de sonidos en segundo plano.
+    :param volumen: Volumen general (0-1).
+    :param fundido: Duración del fundido cruzado en segundos (0 = corte directo).
+    """
+
+    def __init__(self, volumen=1.0, fundido=FUNDIDO):
+        self.volumen = volumen
+        self.atenuacion = 1.0     # Factor de la música mientras suenan efectos (ducking)
+        self.fundido = fundido
+
+        self.lista = []
+        self.indice = -1
+        self.bucle = True
+        self.actual = None        # Sound de la pista que suena
+        self._saliente = None     # Sound que se está apagando durante un fundido
+        self._siguiente = None    # (índice, Sound) precargado de la siguiente pista (Sound None: cargando)
+        self._entrar_al_cargar = False
+        self._generacion = 0      # Invalida cargas de listas anteriores
+        self._vigilancia = None
+        self._paso_fundido = None
+
+        self._tareas = queue.Queue()
+        self._hilo = threading.Thread(target=self._cargar_en_segundo_plano, daemon=True)
+        self._hilo.start()
+
+    # -----------------------------
+    # Carga en segundo plano
+    # -----------------------------
+    def cargar(self, ruta, al_cargar):
+        """Carga `ruta` en el hilo de carga y llama a `al_cargar(sound)` en el hilo principal (None si falla)."""
+        self._tareas.put((ruta, al_cargar))
+
+    def _cargar_en_segundo_plano(self):
+        while True:
+            tarea = self._tareas.get()
+            if tarea is None:
+                return
+            ruta, al_cargar = tarea
+            sound = None
+            if os.path.exists(ruta):
+                try:
+                    sound = SoundLoader.load(ruta)
+                except Exception as error:
+                    Logger.warning(f"Audio: no se pudo cargar {ruta}: {error}")
+            else:
+                Logger.warning(f"Audio: no existe {ruta}")
+            Clock.schedule_once(lambda dt, al_cargar=al_cargar, sound=sound: al_cargar(sound))
+
+    # -----------------------------
+    # Música
+    # -----------------------------
+    def reproducir_lista(self, rutas, bucle=True):
+        """Sustituye la lista de reproducción y empieza por la primera pista."""
+        self.detener()
+        self.lista = list(rutas)
+        self.bucle = bucle
+        self.indice = -1
+        self._avanzar()
+
+    def _indice_siguiente(self):
+        if self.indice + 1 < len(self.lista):
+            return self.indice + 1
+        if self.bucle and self.lista:
+            return 0
+        return None
+
+    def _avanzar(self):
+        """Pasa a la siguiente pista: la precargada si ya está lista, si no la carga ahora."""
+        indice = self._indice_siguiente()
+        if indice is None:
+            return
+        if self._siguiente is not None and self._siguiente[0] == indice:
+            sound = self._siguiente[1]
+            if sound is None:
+                # La precarga sigue en curso: la pista entra en cuanto termine
+                self._entrar_al_cargar = True
+                return
+            self._siguiente = None
+            self._entrar(indice, sound)
+            return
+        generacion = self._generacion
+        self.indice = indice  # Evita pedir la misma pista dos veces mientras se carga
+
+        def al_cargar(sound):
+            if generacion == self._generacion:
+                self._entrar(indice, sound)
+            else:
+                self._descargar(sound)
+        self.cargar(self.lista[indice], al_cargar)
+
+    def _precargar_siguiente(self):
+        indice = self._indice_siguiente()
+        if indice is None or self._siguiente is not None or indice == self.indice:
+            return
+        self._siguiente = (indice, None)  # Marca la carga como pedida
+        generacion = self._generacion
+
+        def al_cargar(sound):
+            if generacion != self._generacion:
+                self._descargar(sound)
+            elif self._entrar_al_cargar:
+                self._entrar_al_cargar = False
+                self._siguiente = None
+                self._entrar(indice, sound)
+            else:
+                self._siguiente = (indice, sound) if sound else None
+        self.cargar(self.lista[indice], al_cargar)
+
+    def _entrar(self, indice, sound):
+        if sound is None:
+            return
+        self.indice = indice
+        # Una única pista en bucle: la repite el propio proveedor, sin vigilancia ni fundido
+        sound.loop = self.bucle and len(self.lista) == 1
+        self._fundir(sound)
+        if not sound.loop and self._vigilancia is None:
+            self._vigilancia = Clock.schedule_interval(self._vigilar, INTERVALO_VIGILANCIA)
+
+    def _vigilar(self, dt):
+        """Precarga la siguiente pista y empieza el fundido cuando la actual se acerca al final."""
+        sound = self.actual
+        if sound is None or self._paso_fundido is not None:
+            return
+        if sound.state == 'stop':
+            # El proveedor no informa de la duración o la pista ya terminó
+            self._descargar(sound)
+            self.actual = None
+            self._avanzar()
+            return
+        restante = sound.length - sound.get_pos() if sound.length else None
+        if restante is None:
+            return
+        if restante <= self.fundido + PRECARGA:
+            self._precargar_siguiente()
+        if restante <= self.fundido and self._siguiente is not None and self._siguiente[1] is not None:
+            self._avanzar()
+
+    def _fundir(self, entrante):
+        """Sube el volumen de `entrante` mientras baja el de la pista actual, que se descarga al final."""
+        self._terminar_fundido()
+        self._saliente, self.actual = self.actual, entrante
+        con_fundido = self._saliente is not None and self.fundido
+        entrante.volume = 0 if con_fundido else self.volumen_musica
+        entrante.play()
+        if not con_fundido:
+            self._descargar(self._saliente)
+            self._saliente = None
+            return
+        inicio = time.monotonic()
+
+        def paso(dt):
+            t = min((time.monotonic() - inicio) / self.fundido, 1.0)
+            entrante.volume = self.volumen_musica * t
+            self._saliente.volume = self.volumen_musica * (1 - t)
+            if t >= 1.0:
+                self._terminar_fundido()
+                return False
+        self._paso_fundido = Clock.schedule_interval(paso, INTERVALO_FUNDIDO)
+
+    def _terminar_fundido(self):
+        if self._paso_fundido is not None:
+            self._paso_fundido.cancel()
+            self._paso_fundido = None
+        if self._saliente is not None:
+            self._descargar(self._saliente)
+            self._saliente = None
+        if self.actual is not None:
+            self.actual.volume = self.volumen_musica
+
+    @staticmethod
+    def _descargar(sound):
+        if sound is not None:
+            sound.stop()
+            sound.unload()
+
+    def detener(self):
+        """Detiene la música y descarga las pistas cargadas."""
+        self._generacion += 1
+        self._entrar_al_cargar = False
+        if self._vigilancia is not None:
+            self._vigilancia.cancel()
+            self._vigilancia = None
+        self._terminar_fundido()
+        self._descargar(self.actual)
+        self.actual = None
+        if self._siguiente is not None:
+            self._descargar(self._siguiente[1])
+            self._siguiente = None
+
+    @property
+    def volumen_musica(self):
+        return self.volumen * self.atenuacion
+
+    def ajustar_volumen(self, volumen):
+        self.volumen = volumen
+        self._aplicar_volumen_musica()
+
+    def atenuar(self, factor):
+        """Multiplica el volumen de la música por `factor` (1 = sin atenuar)."""
+        self.atenuacion = factor
+        self._aplicar_volumen_musica()
+
+    def _aplicar_volumen_musica(self):
+        # Durante un fundido el siguiente paso ya aplica el nuevo volumen
+        if self.actual is not None and self._paso_fundido is None:
+            self.actual.volume = self.volumen_musica
+
+    def cerrar(self):
+        """Detiene la música y termina el hilo de carga."""
+        self.detener()
+        self._tareas.put(None)
@@ -0,0 +1,240 @@
+# bot.py
+# Jugador artificial basado en ISMCTS (Monte Carlo Tree Search sobre conjuntos de
+# información, en su variante de un solo observador).
+#
+# En cada iteración se determiniza la información oculta (manos rivales y orden del
+# mazo) a partir de las cartas que el bot no ve, se desciende por el árbol con UCB1
+# contando solo las acciones disponibles en esa determinización, se expande una
+# acción nueva y se termina la partida al azar (simulacion.jugar_turno_al_azar).
+#
+# La búsqueda se paraleliza en la raíz: cada proceso de un ProcessPoolExecutor
+# construye su propio árbol durante el presupuesto de tiempo y al final se suman
+# las visitas de las acciones de la raíz.
+import math
+import multiprocessing
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from cartas import CATALOGO, Mazo
+from jugadores import Mano
+from partida import Jugada
+from simulacion import jugar_turno_al_azar, resolver_chanciller_al_azar
+
+EXPLORACION = 0.7  # Constante de exploración de UCB1
+
+
+# -----------------------------
+# Acciones
+# -----------------------------
+# Las acciones se representan con tuplas de enteros para poder compararlas entre
+# determinizaciones y enviarlas entre procesos:
+#   (id_carta, indice_objetivo, adivinanza)  jugar una carta
+#   (id_carta,)                              carta que se conserva con el Chanciller
+def acciones(partida):
+    if partida.chanciller_pendiente is not None:
+        return list({(carta.id,) for carta in partida.current_player.mano})
+    indices = {id(jugador): i for i, jugador in enumerate(partida.jugadores)}
+    return [(jugada.carta.id, None if jugada.objetivo is None else indices[id(jugada.objetivo)], jugada.adivinanza)
+            for jugada in partida.jugadas_legales()]
+
+
+def aplicar(partida, accion, rng=None):
+    """Aplica la acción. El orden de las cartas devueltas con el Chanciller sale de `rng` (o del de la partida)."""
+    if len(accion) == 1:
+        devueltas = list(partida.current_player.mano)
+        conservada = CATALOGO[accion[0]]
+        devueltas.remove(conservada)
+        (rng or partida.rng).shuffle(devueltas)
+        partida.resolver_chanciller(conservada, devueltas)
+    else:
+        id_carta, objetivo, adivinanza = accion
+        partida.jugar_carta(CATALOGO[id_carta], None if objetivo is None else partida.jugadores[objetivo],
+                            adivinanza)
+
+
+def avanzar(partida):
+    """Lleva la partida hasta la siguiente decisión. Devuelve el ganador si ha terminado."""
+    if partida.chanciller_pendiente is not None:
+        return None
+    ganador = partida.determinar_ganador()
+    if ganador is None:
+        partida.iniciar_turno()
+    return ganador
+
+
+def traducir(partida, accion):
+    """
+    Convierte una acción en algo que la partida entiende: una Jugada, o el par
+    (conservada, devueltas) para resolver el Chanciller.
+    """
+    if len(accion) == 1:
+        devueltas = list(partida.current_player.mano)
+        conservada = CATALOGO[accion[0]]
+        devueltas.remove(conservada)
+        return conservada, devueltas
+    id_carta, objetivo, adivinanza = accion
+    return Jugada(CATALOGO[id_carta], None if objetivo is None else partida.jugadores[objetivo], adivinanza)
+
+
+# -----------------------------
+# Búsqueda
+# -----------------------------
+class Nodo:
+    __slots__ = ("padre", "accion", "jugador", "hijos", "visitas", "victorias", "disponible")
+
+    def __init__(self, padre=None, accion=None, jugador=None):
+        self.padre = padre
+        self.accion = accion
+        self.jugador = jugador  # Índice del jugador que hizo la acción
+        self.hijos = {}
+        self.visitas = 0
+        self.victorias = 0
+        self.disponible = 0     # Veces que la acción era legal al pasar por el padre
+
+    def seleccionar(self, legales):
+        """Hijo con mayor UCB1 entre las acciones legales en esta determinización."""
+        mejor, mejor_valor = None, -1.0
+        for accion in legales:
+            hijo = self.hijos[accion]
+            valor = (hijo.victorias / hijo.visitas
+                     + EXPLORACION * math.sqrt(math.log(hijo.disponible) / hijo.visitas))
+            if valor > mejor_valor:
+                mejor, mejor_valor = hijo, valor
+        return mejor
+
+
+def determinizar(partida, yo, rng=random):
+    """Copia de la partida con las cartas que `yo` no ve repartidas al azar."""
+    mundo = partida.copiar()
+    recuentos = partida.cartas_no_vistas(partida.jugadores[yo])
+    ocultas = [CATALOGO[i] for i, n in enumerate(recuentos) for _ in range(n)]
+    rng.shuffle(ocultas)
+    for i, jugador in enumerate(mundo.jugadores):
+        if i != yo and jugador.mano:
+            n = len(jugador.mano)
+            jugador.mano = Mano(ocultas[:n])
+            del ocultas[:n]
+    mundo.deck = Mazo(ocultas)
+    return mundo
+
+
+def simular(partida, rng=random):
+    """Termina la partida al azar desde una decisión pendiente y devuelve el ganador."""
+    while True:
+        if partida.chanciller_pendiente is not None:
+            resolver_chanciller_al_azar(partida, rng)
+        else:
+            jugar_turno_al_azar(partida, partida.current_player, rng)
+        ganador = partida.determinar_ganador()
+        if ganador is not None:
+            return ganador
+        partida.iniciar_turno()
+
+
+def buscar(partida, presupuesto, semilla=None):
+    """
+    Ejecuta ISMCTS desde la decisión pendiente del jugador actual.
+    :param presupuesto: Segundos de búsqueda.
+    :return: Diccionario {acción: visitas} de la raíz.
+    """
+    rng = random.Random(semilla)
+    yo = partida.jugadores.index(partida.current_player)
+    raiz = Nodo()
+    limite = time.perf_counter() + presupuesto
+    while time.perf_counter() < limite:
+        mundo = determinizar(partida, yo, rng)
+        nodo = raiz
+        ganador = None
+        while True:
+            legales = acciones(mundo)
+            nuevas = [accion for accion in legales if accion not in nodo.hijos]
+            if nuevas:
+                accion = rng.choice(nuevas)
+                nodo.hijos[accion] = Nodo(nodo, accion, mundo.jugadores.index(mundo.current_player))
+            for accion_legal in legales:
+                hijo = nodo.hijos.get(accion_legal)
+                if hijo is not None:
+                    hijo.disponible += 1
+            nodo = nodo.hijos[accion] if nuevas else nodo.seleccionar(legales)
+            aplicar(mundo, nodo.accion, rng)
+            ganador = avanzar(mundo)
+            if ganador is not None or nuevas:
+                break
+        if ganador is None:
+            ganador = simular(mundo, rng)
+        ganador = mundo.jugadores.index(ganador)
+        while nodo is not raiz:
+            nodo.visitas += 1
+            if nodo.jugador == ganador:
+                nodo.victorias += 1
+            nodo = nodo.padre
+        raiz.visitas += 1
+    return {accion: hijo.visitas for accion, hijo in raiz.hijos.items()}
+
+
+class BotISMCTS:
+    """
+    :param presupuesto: Segundos de búsqueda por decisión.
+    :param procesos: Procesos de búsqueda en paralelo (por defecto, uno por CPU).
+    """
+
+    def __init__(self, presupuesto=1.0, procesos=None):
+        self.presupuesto = presupuesto
+        self.procesos = procesos or os.cpu_count() or 1
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn: los procesos no heredan el estado de Kivy ni de OpenGL del proceso principal
+            self._executor = ProcessPoolExecutor(self.procesos, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _lanzar(self, partida):
+        copia = partida.copiar()
+        return [self._pool().submit(buscar, copia, self.presupuesto, random.getrandbits(32))
+                for _ in range(self.procesos)]
+
+    def _decidir(self, partida, futuros):
+        visitas = Counter()
+        for futuro in futuros:
+            if futuro.exception() is None:
+                visitas.update(futuro.result())
+        if visitas:
+            return traducir(partida, max(visitas, key=visitas.get))
+        # Si ningún proceso terminó bien se juega al azar antes que bloquear la partida
+        return traducir(partida, random.choice(acciones(partida)))
+
+    def elegir(self, partida):
+        """Decide la acción del jugador actual esperando a la búsqueda."""
+        futuros = self._lanzar(partida)
+        for futuro in futuros:
+            futuro.exception()
+        return self._decidir(partida, futuros)
+
+    def pensar(self, partida, al_terminar):
+        """
+        Decide sin bloquear: `al_terminar(decision)` se llama desde otro hilo cuando
+        acaba la búsqueda. La partida no debe modificarse mientras tanto.
+        """
+        futuros = self._lanzar(partida)
+        pendientes = [len(futuros)]
+        cerrojo = threading.Lock()
+
+        def terminado(_):
+            with cerrojo:
+                pendientes[0] -= 1
+                if pendientes[0]:
+                    return
+            al_terminar(self._decidir(partida, futuros))
+
+        for futuro in futuros:
+            futuro.add_done_callback(terminado)
+
+    def cerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,218 @@
+# carga.py
+# Prueba de carga del servidor: lanza muchos clientes simulados que se sientan en
+# mesas y juegan acciones legales al azar hasta terminar. Mide las mesas y acciones
+# por segundo y la latencia desde que un cliente envía su acción hasta que recibe el
+# estado actualizado. Cada cliente reconstruye su vista con sincronizacion.Replica a
+# partir de los deltas y confirma cada uno.
+#
+# Por defecto arranca el servidor en el mismo proceso (y en el mismo núcleo que los
+# clientes, así que la cifra es conservadora); con --puerto se conecta a uno externo.
+#
+# Con --pausa S cada cliente piensa entre 0 y 2·S segundos antes de actuar, como un
+# jugador real: así se mide cuántas mesas simultáneas aguanta el servidor, no solo
+# cuántas acciones por segundo procesa.
+#
+# Con --cortes P, después de cada delta el cliente corta la conexión con probabilidad
+# P y se reconecta a su asiento; se mide lo que ocupa la resincronización.
+#
+# Con --corpus RUTA el servidor del mismo proceso guarda las partidas como repeticiones
+# (se reproducen con python repeticion.py RUTA).
+#
+# Con --diario DIRECTORIO el servidor del mismo proceso anota cada acción en el diario
+# de recuperación (diario.py); se informa de las confirmaciones en disco.
+#
+# Uso: python carga.py [mesas] [jugadores_por_mesa] [--pausa S] [--cortes P] [--puerto N] [--corpus RUTA]
+#                      [--diario DIRECTORIO] [--depuracion]
+import asyncio
+import random
+import sys
+import time
+
+import protocolo
+from servidor import Servidor
+from sincronizacion import Replica
+
+
+class Estadisticas:
+    def __init__(self):
+        self.acciones = 0
+        self.terminadas = set()  # Mesas cuyo final ha recibido algún jugador
+        self.errores = 0
+        self.desconexiones = 0
+        self.max_mesas = None  # Mesas abiertas a la vez como máximo (servidor en el mismo proceso)
+        self.latencias = []
+        self.bytes_recibidos = 0
+        self.bytes_enviados = 0
+        self.reconexiones = 0
+        self.bytes_resincronizacion = 0  # Primer delta tras cada reconexión
+        self.diario = None  # Informe del diario del servidor (en el mismo proceso)
+
+
+async def cliente(puerto, nombre, rng, estadisticas, pausa=0.0, cortes=0.0, depuracion=False):
+    replica = Replica()
+    sentado = None        # Mensaje "mesa": para reconectarse al asiento
+    reconectado = False   # El siguiente delta es la resincronización
+    jugado = None         # (turno, acciones) del último estado en que se actuó
+    enviada = None
+    while True:
+        reader, writer = await asyncio.open_connection('127.0.0.1', puerto)
+
+        def enviar(mensaje):
+            trama = protocolo.codificar(mensaje, depuracion)
+            estadisticas.bytes_enviados += len(trama)
+            writer.write(trama)
+
+        if sentado is None:
+            enviar({"tipo": "unirse", "nombre": nombre})
+        else:
+            enviar({"tipo": "reconectar", "mesa": sentado["mesa"], "asiento": sentado["asiento"],
+                    "clave": sentado["clave"], "tick": replica.tick})
+            estadisticas.reconexiones += 1
+            reconectado = True
+        try:
+            while True:
+                trama = await protocolo.leer_trama(reader)
+                if trama is None:
+                    estadisticas.desconexiones += 1
+                    return
+                estadisticas.bytes_recibidos += protocolo.LONGITUD.size + len(trama)
+                mensaje = protocolo.decodificar(trama)
+                tipo = mensaje["tipo"]
+                if tipo == "mesa":
+                    sentado = mensaje
+                elif tipo == "delta":
+                    if reconectado:
+                        estadisticas.bytes_resincronizacion += protocolo.LONGITUD.size + len(trama)
+                        reconectado = False
+                    if not replica.aplicar(mensaje):
+                        estadisticas.errores += 1  # Sin su base: el servidor no debería enviarlo
+                        return
+                    enviar({"tipo": "ack", "tick": replica.tick})
+                    if rng.random() < cortes:
+                        break
+                    estado = replica.estado
+                    if enviada is not None and (estado["turno"], estado["acciones"]) != jugado:
+                        estadisticas.latencias.append(time.perf_counter() - enviada)
+                        enviada = None
+                    if estado["acciones"] and (estado["turno"], estado["acciones"]) != jugado:
+                        jugado = (estado["turno"], estado["acciones"])
+                        if pausa:
+                            await asyncio.sleep(rng.uniform(0, 2 * pausa))
+                        enviar({"tipo": "accion", "accion": list(rng.choice(estado["acciones"]))})
+                        enviada = time.perf_counter()
+                        estadisticas.acciones += 1
+                elif tipo == "fin":
+                    if mensaje["ganador"] is None:
+                        estadisticas.errores += 1
+                    else:
+                        estadisticas.terminadas.add(sentado["mesa"])
+                    return
+                elif tipo == "error" and reconectado:
+                    # La partida terminó mientras estaba desconectado: su mesa ya no existe
+                    estadisticas.desconexiones += 1
+                    return
+                elif tipo == "error":
+                    estadisticas.errores += 1
+        except ConnectionError:
+            estadisticas.desconexiones += 1
+            return
+        finally:
+            writer.close()
+
+
+def percentil(valores, p):
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0.0
+
+
+def ampliar_limite_archivos():
+    """Cada cliente y su conexión en el servidor usan un descriptor: se sube el límite blando."""
+    try:
+        import resource
+    except ImportError:
+        return
+    blando, duro = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if duro == resource.RLIM_INFINITY or duro > blando:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (duro if duro != resource.RLIM_INFINITY else 65536, duro))
+
+
+async def probar(num_mesas, jugadores_por_mesa, puerto=None, pausa=0.0, cortes=0.0, semilla=0, depuracion=False,
+                 corpus=None, diario=None):
+    servidor = None
+    if puerto is None:
+        servidor = await Servidor(puerto=0, jugadores_por_mesa=jugadores_por_mesa, semilla=semilla,
+                                  depuracion=depuracion, corpus=corpus, diario=diario).iniciar()
+        puerto = servidor.puerto
+    rng = random.Random(semilla)
+    estadisticas = Estadisticas()
+    inicio = time.perf_counter()
+    # Los jugadores de una mesa se conectan seguidos para que el servidor los siente juntos
+    clientes = [cliente(puerto, f"m{mesa}-{asiento}", random.Random(rng.random()), estadisticas, pausa, cortes,
+                      depuracion)
+                for mesa in range(num_mesas) for asiento in range(jugadores_por_mesa)]
+    await asyncio.gather(*clientes)
+    segundos = time.perf_counter() - inicio
+    # Con cortes puede que ningún jugador de una mesa reciba su final: cuenta el servidor si se tiene
+    estadisticas.partidas = len(estadisticas.terminadas)
+    if servidor is not None:
+        estadisticas.max_mesas = servidor.max_mesas
+        estadisticas.partidas = servidor.terminadas
+        await servidor.cerrar()
+        if servidor.diario is not None:
+            estadisticas.diario = servidor.diario.informe()
+    return estadisticas, segundos
+
+
+def opcion(argumentos, nombre, tipo, defecto):
+    """Extrae `nombre valor` de la lista de argumentos."""
+    if nombre not in argumentos:
+        return defecto
+    posicion = argumentos.index(nombre)
+    valor = tipo(argumentos[posicion + 1])
+    del argumentos[posicion:posicion + 2]
+    return valor
+
+
+def memoria_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB
+
+
+def main():
+    argumentos = sys.argv[1:]
+    puerto = opcion(argumentos, '--puerto', int, None)
+    pausa = opcion(argumentos, '--pausa', float, 0.0)
+    cortes = opcion(argumentos, '--cortes', float, 0.0)
+    corpus = opcion(argumentos, '--corpus', str, None)
+    diario = opcion(argumentos, '--diario', str, None)
+    depuracion = '--depuracion' in argumentos
+    if depuracion:
+        argumentos.remove('--depuracion')
+    num_mesas = int(argumentos[0]) if len(argumentos) > 0 else 1000
+    jugadores_por_mesa = int(argumentos[1]) if len(argumentos) > 1 else 2
+
+    ampliar_limite_archivos()
+    estadisticas, segundos = asyncio.run(probar(num_mesas, jugadores_por_mesa, puerto, pausa, cortes,
+                                                     depuracion=depuracion, corpus=corpus, diario=diario))
+    latencias = sorted(estadisticas.latencias)
+    print(f"{estadisticas.partidas} mesas terminadas de {num_mesas} en {segundos:.2f} s "
+          f"({estadisticas.partidas / segundos:.0f} mesas/s, {estadisticas.acciones / segundos:.0f} acciones/s)")
+    print(f"Latencia acción -> estado: p50 {percentil(latencias, 0.5) * 1000:.1f} ms, "
+          f"p99 {percentil(latencias, 0.99) * 1000:.1f} ms")
+    total = estadisticas.bytes_recibidos + estadisticas.bytes_enviados
+    print(f"Tráfico: {total / max(num_mesas, 1):.0f} bytes por mesa "
+          f"({estadisticas.bytes_recibidos} recibidos, {estadisticas.bytes_enviados} enviados)")
+    print(f"Errores: {estadisticas.errores}, desconexiones: {estadisticas.desconexiones}")
+    if estadisticas.reconexiones:
+        print(f"Reconexiones: {estadisticas.reconexiones}, resincronización media "
+              f"{estadisticas.bytes_resincronizacion / estadisticas.reconexiones:.0f} bytes")
+    if estadisticas.diario is not None:
+        print(f"Diario: {estadisticas.diario}")
+    if estadisticas.max_mesas is not None:
+        print(f"Mesas simultáneas: {estadisticas.max_mesas}, memoria máxima del proceso: {memoria_mb():.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
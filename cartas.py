@@ -1,56 +1,196 @@
+import json
+import os
 import random
+import unicodedata
 
 class Carta:
-    def __init__(self, nombre, valor, descripcion, image_source):
-        self.nombre = nombre
-        self.valor = valor
-        self.descripcion = descripcion
-        self.image_source = image_source
+    """
+    Tipo de carta inmutable. Existe una única instancia por tipo en CATALOGO y
+    las barajas solo guardan referencias a ella, así que copiar una partida no
+    copia descripciones ni rutas de imagen.
+    """
+    __slots__ = ("id", "nombre", "valor", "descripcion", "image_source")
+
+    def __init__(self, id, nombre, valor, descripcion, image_source):
+        for campo, dato in zip(self.__slots__, (id, nombre, valor, descripcion, image_source)):
+            object.__setattr__(self, campo, dato)
+
+    def __setattr__(self, campo, dato):
+        raise AttributeError("Las cartas son inmutables")
+
+    def __delattr__(self, campo):
+        raise AttributeError("Las cartas son inmutables")
+
+    def __reduce__(self):
+        # Al serializar solo viaja el id; al cargar se recupera la instancia del catálogo
+        return carta_por_id, (self.id,)
 
     def __str__(self):
         return f"{self.nombre} (Valor: {self.valor})"
 
+    def __repr__(self):
+        return self.__str__()
+
+def normalizar_nombre(nombre):
+    """Nombre en minúsculas y sin tildes, para que "Barón" y "baron" sean la misma carta."""
+    descompuesto = unicodedata.normalize("NFKD", nombre.strip().lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+class Registro:
+    """
+    Definición de una baraja cargada desde un fichero JSON, con las tablas de
+    consulta precalculadas para que las reglas trabajen con ids enteros.
+    """
+    def __init__(self, definicion):
+        self.cartas = tuple(Carta(i, d["nombre"], d["valor"], d["descripcion"],
+                                  d.get("imagen", "images/default_card.png"))
+                            for i, d in enumerate(definicion["cartas"]))
+        self.copias = tuple(d["copias"] for d in definicion["cartas"])
+        # Nombre del efecto de cada carta (ver efectos.EFECTOS_POR_NOMBRE)
+        self.efectos = tuple(d.get("efecto", "ninguno") for d in definicion["cartas"])
+        self.nombre_a_id = {}
+        for carta in self.cartas:
+            self.nombre_a_id[carta.nombre] = carta.id
+            self.nombre_a_id[normalizar_nombre(carta.nombre)] = carta.id
+        self.valor_por_id = tuple(carta.valor for carta in self.cartas)
+        cantidad_por_valor = [0] * (max(self.valor_por_id) + 1)
+        for carta, copias in zip(self.cartas, self.copias):
+            cantidad_por_valor[carta.valor] += copias
+        self.cantidad_por_valor = tuple(cantidad_por_valor)
+        self.baraja = tuple(carta for carta, copias in zip(self.cartas, self.copias)
+                            for _ in range(copias))
+
+    def id_por_nombre(self, nombre):
+        try:
+            return self.nombre_a_id[nombre]
+        except KeyError:
+            return self.nombre_a_id[normalizar_nombre(nombre)]
+
+    def crear_baraja(self):
+        return list(self.baraja)
+
+def cargar_registro(ruta):
+    with open(ruta, encoding="utf-8") as fichero:
+        return Registro(json.load(fichero))
+
+RUTA_DEFINICION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cartas.json")
+
+# Registro por defecto, construido una sola vez al importar el módulo
+REGISTRO = cargar_registro(RUTA_DEFINICION)
+CATALOGO = REGISTRO.cartas
+NOMBRE_A_ID = REGISTRO.nombre_a_id
+VALOR_POR_ID = REGISTRO.valor_por_id
+CANTIDAD_POR_VALOR = REGISTRO.cantidad_por_valor
+
+# Ids de las cartas con reglas propias
+ESPIA = REGISTRO.id_por_nombre("Espía")
+GUARDIA = REGISTRO.id_por_nombre("Guardia")
+SACERDOTE = REGISTRO.id_por_nombre("Sacerdote")
+BARON = REGISTRO.id_por_nombre("Barón")
+DONCELLA = REGISTRO.id_por_nombre("Doncella")
+PRINCIPE = REGISTRO.id_por_nombre("Príncipe")
+CHANCILLER = REGISTRO.id_por_nombre("Chanciller")
+REY = REGISTRO.id_por_nombre("Rey")
+CONDESA = REGISTRO.id_por_nombre("Condesa")
+PRINCESA = REGISTRO.id_por_nombre("Princesa")
+
+def carta_por_id(id_carta):
+    return CATALOGO[id_carta]
+
+def id_por_nombre(nombre):
+    return REGISTRO.id_por_nombre(nombre)
+
 def crear_baraja():
-    cartas = []
-    # Espía (2)
-    for _ in range(2):
-        cartas.append(Carta("Espía", 0, "Efecto del Espía", "images/Espia.png"))
-    
-    # Guardia (5)
-    for _ in range(5):
-        cartas.append(Carta("Guardia", 1, "Adivinar la mano de otro jugador", "images/Guardia.png"))
-    
-    # Sacerdote (2)
-    for _ in range(2):
-        cartas.append(Carta("Sacerdote", 2, "Mirar la mano de otro jugador", "images/Sacerdote.png"))
-    
-    # Barón (2)
-    for _ in range(2):
-        cartas.append(Carta("Barón", 3, "Comparar cartas con otro jugador", "images/Baron.png"))
-    
-    # Doncella (2)
-    for _ in range(2):
-        cartas.append(Carta("Doncella", 4, "Protección hasta el siguiente turno", "images/Doncella.png"))
-    
-    # Príncipe (2)
-    for _ in range(2):
-        cartas.append(Carta("Príncipe", 5, "Obliga a otro jugador a descartar su mano", "images/Principe.png"))
-    
-    # Chanciller (2)
-    for _ in range(2):
-        cartas.append(Carta("Chanciller", 6, "Roba dos cartas y elige una", "images/Chanciller.png"))
-
-    # Rey (1)
-    cartas.append(Carta("Rey", 7, "Intercambia mano con otro jugador", "images/Rey.png"))
-    
-    # Condesa (1)
-    cartas.append(Carta("Condesa", 8, "Sin efecto adicional", "images/Condesa.png"))
-    
-    # Princesa (1)
-    cartas.append(Carta("Princesa", 9, "Si se juega, el jugador queda eliminado", "images/Princesa.png"))
-    
-    return cartas
-
-def barajar(baraja):
-    random.shuffle(baraja)
+    """Devuelve una baraja nueva (sin barajar) con referencias a las cartas del catálogo."""
+    return REGISTRO.crear_baraja()
+
+def barajar(baraja, rng=random):
+    """Baraja en el sitio con `rng` (un random.Random con semilla para poder reproducir la partida)."""
+    rng.shuffle(baraja)
     return baraja
+
+class Mazo:
+    """
+    Mazo de robo sobre un buffer circular de tamaño fijo: robar por arriba y
+    devolver cartas al fondo cuesta O(1) y no hay realojamientos durante la partida.
+    """
+    __slots__ = ("_buffer", "_cabeza", "_num")
+
+    def __init__(self, cartas=(), capacidad=None):
+        cartas = list(cartas)
+        capacidad = max(capacidad or 0, len(cartas), 1)
+        self._buffer = cartas + [None] * (capacidad - len(cartas))
+        self._cabeza = 0
+        self._num = len(cartas)
+
+    def __len__(self):
+        return self._num
+
+    def __bool__(self):
+        return self._num > 0
+
+    def __iter__(self):
+        # De la carta superior a la del fondo
+        capacidad = len(self._buffer)
+        for i in range(self._num):
+            yield self._buffer[(self._cabeza + i) % capacidad]
+
+    def __getitem__(self, indice):
+        if indice < 0:
+            indice += self._num
+        if not 0 <= indice < self._num:
+            raise IndexError("Índice fuera del mazo")
+        return self._buffer[(self._cabeza + indice) % len(self._buffer)]
+
+    def __repr__(self):
+        return f"Mazo({list(self)!r})"
+
+    @property
+    def restantes(self):
+        return self._num
+
+    def robar(self):
+        """Saca la carta superior del mazo."""
+        if not self._num:
+            raise IndexError("El mazo está vacío")
+        carta = self._buffer[self._cabeza]
+        self._buffer[self._cabeza] = None
+        self._cabeza = (self._cabeza + 1) % len(self._buffer)
+        self._num -= 1
+        return carta
+
+    def poner_al_fondo(self, carta):
+        """Coloca una carta debajo de todas las demás."""
+        if self._num == len(self._buffer):
+            self._ampliar()
+        self._buffer[(self._cabeza + self._num) % len(self._buffer)] = carta
+        self._num += 1
+
+    def barajar(self, rng=random):
+        cartas = list(self)
+        rng.shuffle(cartas)
+        self.reiniciar(cartas)
+        return self
+
+    def copiar(self):
+        copia = Mazo.__new__(Mazo)
+        copia._buffer = self._buffer[:]
+        copia._cabeza = self._cabeza
+        copia._num = self._num
+        return copia
+
+    def reiniciar(self, cartas):
+        """Vuelve a llenar el mazo reutilizando su buffer."""
+        cartas = list(cartas)
+        if len(cartas) > len(self._buffer):
+            self._buffer = cartas
+        else:
+            self._buffer[:len(cartas)] = cartas
+            for i in range(len(cartas), len(self._buffer)):
+                self._buffer[i] = None
+        self._cabeza = 0
+        self._num = len(cartas)
+
+    def _ampliar(self):
+        self._buffer = list(self) + [None] * len(self._buffer)
+        self._cabeza = 0
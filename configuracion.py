@@ -0,0 +1,84 @@
+# configuracion.py
+# Pantalla de configuración de la partida. Está separada de interfaz.py para que el
+# primer frame solo necesite los widgets básicos: el resto de pantallas (y sus
+# importaciones) se cargan después, al navegar o en frames ociosos.
+from kivy.uix.screenmanager import Screen
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.button import Button
+from kivy.uix.textinput import TextInput
+from kivy.uix.togglebutton import ToggleButton
+from kivy.graphics import Color, Rectangle
+from kivy.core.window import Window
+from jugadores import Jugador
+
+# -----------------------------
+# Pantalla de configuración (SetupScreen)
+# Ahora se pide primero el número de jugadores y luego, en el mismo layout, se
+# solicitan los nombres de cada uno.
+# -----------------------------
+class SetupScreen(Screen):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.names_inputs = []
+        with self.canvas.before:
+            Color(rgba=(0.95, 0.9, 0.8, 1))
+            self.rect = Rectangle(size=Window.size, pos=self.pos)
+        self.bind(size=self._update_rect, pos=self._update_rect)
+        self.layout = BoxLayout(orientation='vertical', padding=20, spacing=20)
+        self.add_widget(self.layout)
+        self.build_initial_ui()
+
+    def _update_rect(self, *args):
+        self.rect.size = self.size
+        self.rect.pos = self.pos
+
+    def build_initial_ui(self):
+        self.layout.clear_widgets()
+        self.layout.add_widget(Label(text="Bienvenido al Juego de Cartas", font_size='30sp', color=(0.2,0.1,0,1)))
+        self.layout.add_widget(Label(text="Ingresa el número de jugadores (mínimo 2):", color=(0.2,0.1,0,1)))
+        self.num_input = TextInput(text='', multiline=False, input_filter='int', hint_text="Número de jugadores")
+        self.layout.add_widget(self.num_input)
+        start_button = Button(text="Siguiente", size_hint=(0.5, 0.3), pos_hint={'center_x': 0.5},
+                              background_color=(0.6, 0.4, 0.2, 1), color=(1,1,1,1))
+        start_button.bind(on_press=self.create_name_inputs)
+        self.layout.add_widget(start_button)
+
+    def create_name_inputs(self, instance):
+        num_str = self.num_input.text.strip()
+        if not num_str.isdigit() or int(num_str) < 2:
+            from popups import aviso
+            aviso("Error", "Ingrese un número válido (mínimo 2).", color=(1,0,0,1))
+            return
+        num = int(num_str)
+        self.layout.clear_widgets()
+        self.names_inputs = []
+        self.bot_toggles = []
+        self.layout.add_widget(Label(text="Ingresa el nombre de cada jugador:", font_size='24sp', color=(0.2,0.1,0,1)))
+        for i in range(num):
+            row = BoxLayout(orientation='horizontal', size_hint=(1, None), height=40, spacing=10)
+            ti = TextInput(text=f"Jugador {i+1}", multiline=False)
+            # Marcar "IA" para que el jugador lo controle el bot
+            bot_toggle = ToggleButton(text="IA", size_hint=(None, 1), width=60,
+                                      background_color=(0.6, 0.4, 0.2, 1), color=(1,1,1,1))
+            self.names_inputs.append(ti)
+            self.bot_toggles.append(bot_toggle)
+            row.add_widget(ti)
+            row.add_widget(bot_toggle)
+            self.layout.add_widget(row)
+        confirm_button = Button(text="Iniciar Juego", size_hint=(0.5, 0.3), pos_hint={'center_x': 0.5},
+                                  background_color=(0.6, 0.4, 0.2, 1), color=(1,1,1,1))
+        confirm_button.bind(on_press=self.start_game)
+        self.layout.add_widget(confirm_button)
+
+    def start_game(self, instance):
+        entries = [(ti.text.strip(), toggle.state == 'down')
+                   for ti, toggle in zip(self.names_inputs, self.bot_toggles) if ti.text.strip()]
+        if len(entries) < 2:
+            from popups import aviso
+            aviso("Error", "Debe haber al menos 2 nombres.", color=(1,0,0,1))
+            return
+        players = [Jugador(name, es_bot) for name, es_bot in entries]
+        game_screen = self.manager.get_screen('game')
+        game_screen.start_game(players)
+        self.manager.current = 'game'
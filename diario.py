@@ -0,0 +1,524 @@
+# diario.py
+# Diario de escritura anticipada de las partidas en curso: si el proceso (la app de
+# Kivy o un servidor) muere a mitad de una ronda, al volver a arrancar recupera las
+# partidas abiertas en lugar de perderlas.
+#
+# El diario es una serie de segmentos diario-NNNNNN.log. Cada segmento empieza con
+# una instantánea de todas las partidas abiertas y sigue con registros:
+#   INICIO       mesa u32 + partida serializada (recién repartida)
+#   ACCION       mesa u32 + acción en 2 bytes (formato de repeticion.py)
+#   FIN          mesa u32 + ganador u8
+#   INSTANTANEA  número de partidas u32 + (mesa u32 + partida serializada) por partida
+# y cada registro va precedido de longitud u32, crc32 u32 y tipo u8. Al recuperar se
+# carga la instantánea del último segmento válido y se aplican los registros
+# siguientes hasta el final o hasta el primero incompleto (una escritura cortada).
+#
+# Escritura:
+#   - Los registros se acumulan en memoria y confirmar() los escribe con un solo
+#     fsync (confirmación en grupo): con miles de mesas cada fsync cubre cientos de
+#     acciones. Lo registrado desde el último confirmar() se puede perder. El
+#     servidor confirma desde una tarea periódica y la app de Kivy despierta a un
+#     único hilo escritor, que agrupa las peticiones que llegan mientras escribe.
+#   - Cada `instantanea_cada` registros (o tantos como partidas abiertas, si son
+#     más) se abre un segmento nuevo con una instantánea y se borran los
+#     anteriores, así que recuperar solo tiene que cargar la instantánea y aplicar
+#     la cola de registros que la sigue.
+#
+# La partida recuperada tiene el mismo mazo, manos, descartes e historial. Su
+# generador se vuelve a crear con la semilla, así que el orden de las cartas que se
+# devuelvan con el Chanciller a partir de ahí puede no coincidir con el que habría
+# salido sin la caída (el historial guarda igualmente el orden real).
+#
+# Uso: python diario.py [mesas] [segundos] [directorio]  prueba de rendimiento y de recuperación
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
+
+import repeticion
+from bot import acciones, aplicar, avanzar
+from cartas import CATALOGO, Mazo
+from jugadores import Jugador
+from partida import Partida
+
+PREFIJO = "diario-"
+EXTENSION = ".log"
+INTERVALO = 0.01           # Segundos entre confirmaciones del servidor
+INSTANTANEA_CADA = 5000    # Registros entre instantáneas: acota lo que hay que volver a aplicar al recuperar
+
+MESA_LOCAL = 0             # La app de Kivy solo tiene una partida abierta: siempre es esta mesa
+
+INICIO, ACCION, FIN, INSTANTANEA = 1, 2, 3, 4
+NINGUNO = 0xFF
+
+REGISTRO = struct.Struct('>IIB')   # longitud del cuerpo, crc32 de tipo + cuerpo, tipo
+MESA = struct.Struct('>I')
+PARTIDA = struct.Struct('>BIHBB')  # jugadores, semilla, turno, actual, Chanciller pendiente
+CLAVE = struct.Struct('>I')
+# Bits del estado de cada jugador
+ELIMINADO, PROTEGIDO, BOT = 1, 2, 4
+
+
+# -----------------------------
+# Serialización de una partida
+# -----------------------------
+def _cantidad(cantidad, que):
+    """Las cantidades ocupan un byte: una mayor desalinearía el resto del registro aunque su CRC sea válido."""
+    if cantidad > 0xFF:
+        raise ValueError(f"No caben {cantidad} {que} en el diario (máximo 255).")
+    return bytes((cantidad,))
+
+
+def _lista(ids):
+    return _cantidad(len(ids), "ids de carta") + bytes(ids)
+
+
+def serializar(partida, claves=()):
+    """Estado completo de la partida (y las claves de sus asientos, si las hay) en unos pocos bytes."""
+    jugadores = partida.jugadores
+    actual = jugadores.index(partida.current_player) if partida.current_player is not None else NINGUNO
+    pendiente = partida.chanciller_pendiente.id if partida.chanciller_pendiente is not None else NINGUNO
+    partes = [PARTIDA.pack(len(jugadores), partida.semilla, partida.turn, actual, pendiente)]
+    for jugador in jugadores:
+        estado = ((ELIMINADO if jugador.eliminado else 0) | (PROTEGIDO if jugador.protegido else 0)
+                  | (BOT if jugador.es_bot else 0))
+        # Recortado a 255 bytes sin partir un carácter, para que se pueda decodificar al recuperar
+        nombre = jugador.nombre.encode('utf-8')[:255].decode('utf-8', 'ignore').encode('utf-8')
+        partes.append(bytes((estado, len(nombre))) + nombre + _lista([carta.id for carta in jugador.mano]))
+    partes.append(_lista([carta.id for carta in partida.deck]))
+    partes.append(_lista([carta.id for carta in partida.discard_pile]))
+    partes.append(_cantidad(len(partida.historial), "acciones"))
+    partes.extend(repeticion.codificar_accion(accion) for accion in partida.historial)
+    partes.append(_cantidad(len(claves), "claves"))
+    partes.extend(CLAVE.pack(clave) for clave in claves)
+    return b''.join(partes)
+
+
+def restaurar(datos, posicion=0):
+    """Partida serializada en `posicion`. Devuelve (partida, claves, posición siguiente)."""
+    def lista():
+        nonlocal posicion
+        cantidad = datos[posicion]
+        ids = bytes(datos[posicion + 1:posicion + 1 + cantidad])
+        posicion += 1 + cantidad
+        return [CATALOGO[i] for i in ids]
+
+    num_jugadores, semilla, turno, actual, pendiente = PARTIDA.unpack_from(datos, posicion)
+    posicion += PARTIDA.size
+    jugadores = []
+    for _ in range(num_jugadores):
+        estado, longitud = datos[posicion], datos[posicion + 1]
+        nombre = bytes(datos[posicion + 2:posicion + 2 + longitud]).decode('utf-8')
+        posicion += 2 + longitud
+        jugador = Jugador(nombre, bool(estado & BOT))
+        jugador.eliminado = bool(estado & ELIMINADO)
+        jugador.protegido = bool(estado & PROTEGIDO)
+        jugador.mano.extend(lista())
+        jugadores.append(jugador)
+
+    partida = Partida.__new__(Partida)
+    partida.jugadores = jugadores
+    partida.semilla = semilla
+    partida.rng = random.Random(semilla)
+    partida.deck = Mazo(lista())
+    partida.turn = turno
+    partida.current_player = None if actual == NINGUNO else jugadores[actual]
+    partida.discard_pile = lista()
+    partida.chanciller_pendiente = None if pendiente == NINGUNO else CATALOGO[pendiente]
+    partida._jugadas = None
+    partida.historial = []
+    for _ in range(datos[posicion]):
+        partida.historial.append(repeticion.decodificar_accion(datos[posicion + 1], datos[posicion + 2]))
+        posicion += 2
+    posicion += 1
+    claves = []
+    for _ in range(datos[posicion]):
+        claves.append(CLAVE.unpack_from(datos, posicion + 1)[0])
+        posicion += CLAVE.size
+    return partida, claves, posicion + 1
+
+
+def turno_por_empezar(partida):
+    """
+    True si el jugador actual ya ha jugado (o aún no hay turno) y falta iniciar el
+    siguiente. El servidor lo inicia justo después de cada acción; la interfaz, al
+    pulsar "Siguiente turno".
+    """
+    if partida.chanciller_pendiente is not None:
+        return False
+    return partida.current_player is None or len(partida.current_player.mano) < 2
+
+
+# -----------------------------
+# Lectura de segmentos
+# -----------------------------
+def _registros(datos):
+    """Registros (tipo, cuerpo) válidos del segmento, hasta el primero incompleto o corrupto."""
+    registros, posicion = [], 0
+    while posicion + REGISTRO.size <= len(datos):
+        longitud, crc, tipo = REGISTRO.unpack_from(datos, posicion)
+        inicio = posicion + REGISTRO.size
+        cuerpo = datos[inicio:inicio + longitud]
+        if len(cuerpo) < longitud or zlib.crc32(bytes((tipo,)) + cuerpo) != crc:
+            break
+        registros.append((tipo, cuerpo))
+        posicion = inicio + longitud
+    return registros
+
+
+def _registro(tipo, cuerpo):
+    return REGISTRO.pack(len(cuerpo), zlib.crc32(bytes((tipo,)) + cuerpo), tipo) + cuerpo
+
+
+class Diario:
+    """
+    :param directorio: Carpeta de los segmentos (se crea si no existe).
+    :param instantanea_cada: Registros tras los que se escribe una instantánea en un segmento nuevo
+        (como mínimo; con más partidas abiertas que eso, una por partida).
+    """
+
+    def __init__(self, directorio, instantanea_cada=INSTANTANEA_CADA):
+        os.makedirs(directorio, exist_ok=True)
+        self.directorio = directorio
+        self.instantanea_cada = instantanea_cada
+        self.partidas = {}       # mesa -> (partida, claves) de las partidas abiertas
+        self._escritas = {}      # mesa -> acciones de su historial ya registradas
+        self._pendiente = bytearray()
+        self._rotacion = None    # (registros del segmento actual, instantánea del siguiente)
+        self._desde_instantanea = 0
+        self._bloqueo = threading.Lock()     # Protege lo pendiente
+        self._escritura = threading.Lock()   # Una sola confirmación a la vez
+        self._despertar = threading.Event()  # Hay confirmaciones pedidas al hilo escritor
+        self._escritor = None                # Hilo escritor, se crea con la primera petición
+        self._cerrando = False
+        self._archivo = None
+        self._segmento = 0
+
+        self.registros = 0
+        self.confirmaciones = 0
+        self.bytes_escritos = 0
+        self.tiempos_fsync = deque(maxlen=100000)  # Segundos de las últimas confirmaciones con datos
+
+    # -----------------------------
+    # Recuperación
+    # -----------------------------
+    def _segmentos(self):
+        numeros = []
+        for nombre in os.listdir(self.directorio):
+            if nombre.startswith(PREFIJO) and nombre.endswith(EXTENSION):
+                try:
+                    numeros.append(int(nombre[len(PREFIJO):-len(EXTENSION)]))
+                except ValueError:
+                    pass
+        return sorted(numeros)
+
+    def _ruta(self, numero):
+        return os.path.join(self.directorio, f"{PREFIJO}{numero:06d}{EXTENSION}")
+
+    def abrir(self):
+        """
+        Recupera las partidas abiertas del último segmento válido y empieza uno nuevo
+        con su instantánea. Devuelve {mesa: (partida, claves)}.
+        """
+        segmentos = self._segmentos()
+        for numero in reversed(segmentos):
+            with open(self._ruta(numero), 'rb') as archivo:
+                registros = _registros(memoryview(archivo.read()))
+            # Un segmento sin instantánea completa es uno que se estaba creando al caer
+            if registros and registros[0][0] == INSTANTANEA:
+                self._recuperar(registros)
+                break
+        self._segmento = segmentos[-1] if segmentos else 0
+        self._nuevo_segmento(self._instantanea())
+        return dict(self.partidas)
+
+    def _recuperar(self, registros):
+        for tipo, cuerpo in registros:
+            if tipo == INSTANTANEA:
+                self.partidas.clear()
+                posicion = MESA.size
+                for _ in range(MESA.unpack_from(cuerpo)[0]):
+                    mesa, = MESA.unpack_from(cuerpo, posicion)
+                    partida, claves, posicion = restaurar(cuerpo, posicion + MESA.size)
+                    self.partidas[mesa] = (partida, claves)
+                continue
+            mesa, = MESA.unpack_from(cuerpo)
+            if tipo == INICIO:
+                partida, claves, _ = restaurar(cuerpo, MESA.size)
+                self.partidas[mesa] = (partida, claves)
+            elif tipo == ACCION and mesa in self.partidas:
+                partida = self.partidas[mesa][0]
+                if turno_por_empezar(partida):
+                    avanzar(partida)
+                repeticion.aplicar_accion(partida, repeticion.decodificar_accion(cuerpo[4], cuerpo[5]))
+            elif tipo == FIN:
+                self.partidas.pop(mesa, None)
+        for mesa, (partida, _) in self.partidas.items():
+            self._escritas[mesa] = len(partida.historial)
+
+    # -----------------------------
+    # Registro
+    # -----------------------------
+    def _agregar(self, datos, cantidad=1):
+        """Añade `cantidad` registros ya codificados. La instantánea se toma después, con ellos incluidos."""
+        with self._bloqueo:
+            self._pendiente += datos
+        self.registros += cantidad
+        self._desde_instantanea += cantidad
+        # Con muchas partidas abiertas la instantánea cuesta más: se espacian en proporción
+        if self._desde_instantanea >= max(self.instantanea_cada, len(self.partidas)):
+            self.rotar()
+
+    def iniciar(self, mesa, partida, claves=()):
+        """Registra una partida nueva, ya repartida."""
+        self.partidas[mesa] = (partida, list(claves))
+        self._escritas[mesa] = len(partida.historial)
+        self._agregar(_registro(INICIO, MESA.pack(mesa) + serializar(partida, claves)))
+
+    def actualizar(self, mesa):
+        """Registra las acciones del historial de la partida que aún no estaban en el diario."""
+        partida = self.partidas[mesa][0]
+        nuevas = partida.historial[self._escritas[mesa]:]
+        if not nuevas:
+            return
+        self._escritas[mesa] = len(partida.historial)
+        prefijo = MESA.pack(mesa)
+        self._agregar(b''.join(_registro(ACCION, prefijo + repeticion.codificar_accion(accion)) for accion in nuevas),
+                      len(nuevas))
+
+    def terminar(self, mesa, ganador=None):
+        """La partida ha terminado (o se ha abandonado): ya no hay que recuperarla."""
+        if self.partidas.pop(mesa, None) is None:
+            return
+        del self._escritas[mesa]
+        self._agregar(_registro(FIN, MESA.pack(mesa) + bytes((NINGUNO if ganador is None else ganador,))))
+
+    def _instantanea(self):
+        partes = [MESA.pack(len(self.partidas))]
+        for mesa, (partida, claves) in self.partidas.items():
+            partes.append(MESA.pack(mesa) + serializar(partida, claves))
+        return _registro(INSTANTANEA, b''.join(partes))
+
+    def rotar(self):
+        """Las próximas confirmaciones escriben en un segmento nuevo que empieza con una instantánea."""
+        instantanea = self._instantanea()
+        # Lo que aún no se hubiera registrado ya está en la instantánea
+        for mesa, (partida, _) in self.partidas.items():
+            self._escritas[mesa] = len(partida.historial)
+        with self._bloqueo:
+            anteriores, self._pendiente = self._pendiente, bytearray()
+            if self._rotacion is not None:
+                # Aún no se había confirmado la rotación anterior: basta con la nueva
+                anteriores = self._rotacion[0] + anteriores
+            self._rotacion = (anteriores, instantanea)
+        self._desde_instantanea = 0
+
+    # -----------------------------
+    # Escritura
+    # -----------------------------
+    def _nuevo_segmento(self, instantanea):
+        self._segmento += 1
+        archivo = open(self._ruta(self._segmento), 'wb')
+        archivo.write(instantanea)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+        self._sincronizar_directorio()
+        if self._archivo is not None:
+            self._archivo.close()
+        self._archivo = archivo
+        self.bytes_escritos += len(instantanea)
+        # Con la instantánea ya en disco los segmentos anteriores sobran
+        for numero in self._segmentos():
+            if numero < self._segmento:
+                os.remove(self._ruta(numero))
+
+    def _sincronizar_directorio(self):
+        try:
+            descriptor = os.open(self.directorio, os.O_RDONLY)
+        except OSError:
+            return  # Windows: no se puede abrir un directorio
+        try:
+            os.fsync(descriptor)
+        except OSError:
+            pass
+        finally:
+            os.close(descriptor)
+
+    def confirmar(self):
+        """Escribe lo pendiente con un fsync. Se puede llamar desde otro hilo. Devuelve los bytes escritos."""
+        with self._escritura:
+            with self._bloqueo:
+                datos, self._pendiente = self._pendiente, bytearray()
+                rotacion, self._rotacion = self._rotacion, None
+            if self._archivo is None or (not datos and rotacion is None):
+                return 0
+            inicio = time.perf_counter()
+            escritos = 0
+            if rotacion is not None:
+                anteriores, instantanea = rotacion
+                if anteriores:
+                    self._archivo.write(anteriores)
+                    escritos += len(anteriores)
+                self._nuevo_segmento(instantanea)
+            if datos:
+                self._archivo.write(datos)
+                self._archivo.flush()
+                os.fsync(self._archivo.fileno())
+                escritos += len(datos)
+            self.confirmaciones += 1
+            self.bytes_escritos += escritos
+            self.tiempos_fsync.append(time.perf_counter() - inicio)
+            return escritos
+
+    def confirmar_en_segundo_plano(self):
+        """
+        Pide una confirmación al hilo escritor, para no bloquear el hilo de la interfaz
+        con el fsync. Las peticiones que llegan mientras escribe se confirman juntas.
+        """
+        if self._escritor is None:
+            self._escritor = threading.Thread(target=self._escribir, name="diario", daemon=True)
+            self._escritor.start()
+        self._despertar.set()
+
+    def _escribir(self):
+        """Hilo escritor: confirma cada vez que se le despierta, hasta que se cierra el diario."""
+        while True:
+            self._despertar.wait()
+            self._despertar.clear()
+            if self._cerrando:
+                return
+            try:
+                self.confirmar()
+            except OSError as error:
+                # Lo pendiente se ha perdido, pero el hilo sigue para las siguientes confirmaciones
+                print(f"Diario: {error!r}", file=sys.stderr)
+
+    async def confirmar_periodicamente(self, intervalo=INTERVALO):
+        """Tarea asyncio que confirma cada `intervalo` segundos con el fsync fuera del bucle."""
+        import asyncio  # Solo lo usa el servidor: la app de Kivy no lo carga al arrancar
+        bucle = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(intervalo)
+            await bucle.run_in_executor(None, self.confirmar)
+
+    def cerrar(self):
+        if self._escritor is not None:
+            self._cerrando = True
+            self._despertar.set()
+            self._escritor.join()
+            self._escritor = None
+        self.confirmar()
+        with self._escritura:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+
+    def informe(self):
+        tiempos = sorted(self.tiempos_fsync)
+        if not tiempos:
+            return f"{self.registros} registros, sin confirmaciones"
+        p99 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))]
+        return (f"{self.registros} registros en {self.confirmaciones} confirmaciones "
+                f"({self.registros / self.confirmaciones:.0f} por fsync), {self.bytes_escritos / 1024:.0f} KB; "
+                f"fsync p50 {tiempos[len(tiempos) // 2] * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms")
+
+
+# -----------------------------
+# Prueba de rendimiento y de recuperación
+# -----------------------------
+def _nueva_partida(rng):
+    partida = Partida([Jugador(f"J{i}") for i in range(rng.randint(2, 4))], rng.getrandbits(32))
+    partida.repartir_inicial()
+    return partida
+
+
+def probar(num_mesas=5000, segundos=5.0, directorio=None, semilla=0):
+    """
+    Juega `num_mesas` partidas a la vez al azar, una acción por mesa y vuelta, con el
+    diario confirmando cada INTERVALO. Al final simula una caída (sin cerrar el
+    diario, con una escritura cortada al final) y comprueba que se recuperan todas
+    las partidas abiertas tal como estaban.
+    """
+    propio = directorio is None
+    directorio = directorio or tempfile.mkdtemp(prefix="diario-")
+    rng = random.Random(semilla)
+    diario = Diario(directorio)
+    diario.abrir()
+    mesas = {}
+    siguiente = 0
+    for _ in range(num_mesas):
+        mesas[siguiente] = _nueva_partida(rng)
+        diario.iniciar(siguiente, mesas[siguiente])
+        avanzar(mesas[siguiente])
+        siguiente += 1
+
+    acciones_jugadas = terminadas = 0
+    inicio = ultima = time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        for mesa in list(mesas):
+            partida = mesas[mesa]
+            aplicar(partida, rng.choice(acciones(partida)))
+            diario.actualizar(mesa)
+            acciones_jugadas += 1
+            ganador = avanzar(partida)
+            if ganador is not None:
+                diario.terminar(mesa, partida.jugadores.index(ganador))
+                del mesas[mesa]
+                terminadas += 1
+                # La mesa se vuelve a ocupar con otra partida
+                mesas[siguiente] = _nueva_partida(rng)
+                diario.iniciar(siguiente, mesas[siguiente])
+                avanzar(mesas[siguiente])
+                siguiente += 1
+            ahora = time.perf_counter()
+            if ahora - ultima >= INTERVALO:
+                diario.confirmar()
+                ultima = ahora
+    diario.confirmar()
+    duracion = time.perf_counter() - inicio
+
+    # Caída: el diario no se cierra y la última escritura queda a medias
+    diario._archivo.write(_registro(ACCION, MESA.pack(0) + b'\x00\x00')[:7])
+    diario._archivo.flush()
+    tamano = sum(os.path.getsize(diario._ruta(numero)) for numero in diario._segmentos())
+
+    inicio = time.perf_counter()
+    recuperado = Diario(directorio)
+    partidas = recuperado.abrir()
+    recuperacion = time.perf_counter() - inicio
+    if set(partidas) != set(mesas):
+        raise AssertionError("No se han recuperado las mismas mesas")
+    for mesa, (partida, _) in partidas.items():
+        if turno_por_empezar(partida):
+            avanzar(partida)
+        if serializar(partida) != serializar(mesas[mesa]):
+            raise AssertionError(f"La mesa {mesa} no coincide")
+    recuperado.cerrar()
+    if propio:
+        shutil.rmtree(directorio)
+    return {"acciones": acciones_jugadas, "terminadas": terminadas, "segundos": duracion,
+            "informe": diario.informe(), "bytes": tamano, "recuperacion": recuperacion,
+            "recuperadas": len(partidas)}
+
+
+def main():
+    num_mesas = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    directorio = sys.argv[3] if len(sys.argv) > 3 else None
+    resultado = probar(num_mesas, segundos, directorio)
+    print(f"{num_mesas} mesas a la vez: {resultado['acciones']} acciones en {resultado['segundos']:.1f} s "
+          f"({resultado['acciones'] / resultado['segundos']:.0f} acciones/s), "
+          f"{resultado['terminadas']} partidas terminadas")
+    print(f"Diario: {resultado['informe']}")
+    print(f"Caída simulada: {resultado['recuperadas']} partidas recuperadas en "
+          f"{resultado['recuperacion'] * 1000:.0f} ms desde {resultado['bytes'] / 1024:.0f} KB de diario")
+
+
+if __name__ == "__main__":
+    main()
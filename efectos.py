@@ -0,0 +1,167 @@
+# efectos.py
+# Tabla de efectos de carta indexada por id. El motor (Partida), los bots y la
+# interfaz consultan el mismo Efecto para saber qué necesita una carta y cómo se
+# resuelve; una carta nueva solo tiene que registrar su efecto aquí.
+from cartas import CATALOGO, REGISTRO, GUARDIA
+
+
+class Efecto:
+    """Interfaz común de los efectos. Por defecto la carta no hace nada."""
+    requiere_objetivo = False
+    requiere_adivinanza = False
+    incluye_propio = False  # El propio jugador puede ser objetivo
+
+    def objetivos(self, partida, jugador):
+        """Jugadores que pueden ser objetivo de la carta."""
+        if not self.requiere_objetivo:
+            return []
+        return [j for j in partida.jugadores
+                if (self.incluye_propio or j is not jugador) and not j.eliminado and not j.protegido]
+
+    def opciones(self, partida, jugador):
+        """Combinaciones (objetivo, adivinanza) válidas para jugar la carta."""
+        objetivos = self.objetivos(partida, jugador)
+        if not objetivos:
+            return [(None, None)]
+        if self.requiere_adivinanza:
+            return [(objetivo, adivinanza) for objetivo in objetivos for adivinanza in ADIVINANZAS]
+        return [(objetivo, None) for objetivo in objetivos]
+
+    def resolver(self, partida, jugador, carta, objetivo, adivinanza, resultado):
+        pass
+
+
+class EfectoGuardia(Efecto):
+    requiere_objetivo = True
+    requiere_adivinanza = True
+
+    def resolver(self, partida, jugador, carta, objetivo, adivinanza, resultado):
+        if adivinanza not in ADIVINANZAS:
+            raise ValueError("El Guardia debe nombrar una carta distinta del Guardia.")
+        if objetivo.mano.tiene(adivinanza):
+            if objetivo.mano.tiene(GUARDIA):
+                resultado.log(f"{objetivo.nombre} tiene un Guardia, no puede ser eliminado.")
+                return
+            resultado.log(f"¡Correcto! {objetivo.nombre} tenía {CATALOGO[adivinanza].nombre} y queda eliminado.")
+            partida.eliminar(objetivo, resultado)
+        else:
+            resultado.log("Adivinaste mal. No ocurre nada.")
+
+
+class EfectoSacerdote(Efecto):
+    requiere_objetivo = True
+
+    def resolver(self, partida, jugador, carta, objetivo, adivinanza, resultado):
+        if not objetivo.mano:
+            resultado.log(f"{objetivo.nombre} no tiene cartas en la mano")
+            return
+        resultado.revelada = objetivo.mano[0]
+        resultado.log(f"{jugador.nombre} vio la carta de {objetivo.nombre}")
+
+
+class EfectoBaron(Efecto):
+    requiere_objetivo = True
+
+    def resolver(self, partida, jugador, carta, objetivo, adivinanza, resultado):
+        if not jugador.mano or not objetivo.mano:
+            resultado.log("Uno de los jugadores no tiene cartas para comparar")
+            return
+        carta_jugador, carta_objetivo = jugador.mano[0], objetivo.mano[0]
+        resultado.comparacion = (carta_jugador, carta_objetivo)
+        resultado.log(f"Comparando cartas: {jugador.nombre}({carta_jugador.nombre}) "
+                      f"vs {objetivo.nombre}({carta_objetivo.nombre})")
+        if carta_jugador.valor > carta_objetivo.valor:
+            resultado.log(f"{objetivo.nombre} es eliminado")
+            partida.eliminar(objetivo, resultado)
+        elif carta_jugador.valor < carta_objetivo.valor:
+            resultado.log(f"{jugador.nombre} es eliminado")
+            partida.eliminar(jugador, resultado)
+        else:
+            resultado.log("Empate, nadie es eliminado")
+
+
+class EfectoDoncella(Efecto):
+    def resolver(self, partida, jugador, carta, objetivo, adivinanza, resultado):
+        jugador.protegido = True
+        resultado.log(f"{jugador.nombre} queda protegido por la Doncella.")
+
+
+class EfectoPrincipe(Efecto):
+    requiere_objetivo = True
+    incluye_propio = True
+
+    def resolver(self, partida, jugador, carta, objetivo, adivinanza, resultado):
+        if not objetivo.mano:
+            resultado.log(f"{objetivo.nombre} no tiene cartas para descartar")
+            return
+        descartada = objetivo.mano.pop(0)
+        partida.discard_pile.append(descartada)
+        resultado.descartada = descartada
+        if isinstance(TABLA[descartada.id], EfectoPrincesa):
+            resultado.log(f"{objetivo.nombre} descartó la Princesa y queda eliminado")
+            partida.eliminar(objetivo, resultado)
+        elif partida.robar_carta(objetivo):
+            resultado.log(f"{objetivo.nombre} descartó {descartada.nombre} y robó una nueva carta")
+        else:
+            resultado.log(f"{objetivo.nombre} descartó {descartada.nombre} pero no quedan cartas para robar")
+
+
+class EfectoChanciller(Efecto):
+    def resolver(self, partida, jugador, carta, objetivo, adivinanza, resultado):
+        robadas = 0
+        while robadas < 2 and partida.robar_carta(jugador):
+            robadas += 1
+        if robadas:
+            # El jugador debe elegir qué carta conservar con Partida.resolver_chanciller
+            partida.chanciller_pendiente = carta
+            resultado.pendiente = True
+            resultado.log(f"{jugador.nombre} roba {robadas} carta(s) con el Chanciller.")
+        else:
+            resultado.log("No quedan cartas que robar con el Chanciller.")
+
+
+class EfectoRey(Efecto):
+    requiere_objetivo = True
+
+    def resolver(self, partida, jugador, carta, objetivo, adivinanza, resultado):
+        if not jugador.mano or not objetivo.mano:
+            resultado.log("No hay suficientes cartas para intercambiar")
+            return
+        jugador.mano[0], objetivo.mano[0] = objetivo.mano[0], jugador.mano[0]
+        resultado.log(f"{jugador.nombre} intercambió cartas con {objetivo.nombre}")
+
+
+class EfectoPrincesa(Efecto):
+    def resolver(self, partida, jugador, carta, objetivo, adivinanza, resultado):
+        resultado.log(f"{jugador.nombre} jugó la Princesa y queda eliminado.")
+        partida.eliminar(jugador, resultado)
+
+
+# Efectos disponibles, por el nombre que usa el campo "efecto" de cartas.json
+EFECTOS_POR_NOMBRE = {
+    "ninguno": Efecto(),
+    "guardia": EfectoGuardia(),
+    "sacerdote": EfectoSacerdote(),
+    "baron": EfectoBaron(),
+    "doncella": EfectoDoncella(),
+    "principe": EfectoPrincipe(),
+    "chanciller": EfectoChanciller(),
+    "rey": EfectoRey(),
+    "princesa": EfectoPrincesa(),
+}
+
+
+def construir_tabla(registro):
+    """Tabla de efectos indexada por id de carta para un registro de cartas."""
+    return tuple(EFECTOS_POR_NOMBRE[nombre] for nombre in registro.efectos)
+
+
+# Tabla del registro por defecto: TABLA[carta.id] es el efecto de la carta
+TABLA = construir_tabla(REGISTRO)
+
+# Ids de las cartas que el Guardia puede nombrar
+ADIVINANZAS = tuple(carta.id for carta in CATALOGO if carta.id != GUARDIA)
+
+
+def efecto_de(carta):
+    return TABLA[carta.id]
@@ -0,0 +1,128 @@
+# estado.py
+# Codificación compacta de una partida en unas pocas palabras de 64 bits, para
+# usar el estado como clave de diccionarios (memoización, tablas de transposición).
+#
+# Disposición de los bits, del menos al más significativo:
+#   - recuento de cada carta en el mazo        (BITS_RECUENTO por id)
+#   - recuento de cada carta en los descartes  (BITS_RECUENTO por id)
+#   - índice del jugador actual (4 bits) y Chanciller pendiente (1 bit)
+#   - por jugador: hasta 3 cartas en mano (BITS_CARTA cada una, 0 = vacío),
+#     eliminado (1 bit) y protegido (1 bit)
+# El orden del mazo no se codifica: solo el multiconjunto de cartas restantes.
+from cartas import CATALOGO, REGISTRO
+
+BITS_RECUENTO = max(REGISTRO.copias).bit_length()
+BITS_CARTA = len(CATALOGO).bit_length()  # id + 1, para reservar el 0 como "sin carta"
+MAX_CARTAS_MANO = 3  # Dos en el turno normal, tres mientras se resuelve el Chanciller
+BITS_TURNO = 4
+
+_MASCARA_RECUENTO = (1 << BITS_RECUENTO) - 1
+_MASCARA_CARTA = (1 << BITS_CARTA) - 1
+_MASCARA_64 = (1 << 64) - 1
+
+
+class Estado:
+    """Estado codificado de una partida. Inmutable, comparable y con hash cacheado."""
+    __slots__ = ("palabras", "num_jugadores", "_hash")
+
+    def __init__(self, palabras, num_jugadores):
+        self.palabras = palabras
+        self.num_jugadores = num_jugadores
+        self._hash = hash(palabras)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, otro):
+        return isinstance(otro, Estado) and self.palabras == otro.palabras
+
+    def __repr__(self):
+        return f"Estado({', '.join(f'{p:#018x}' for p in self.palabras)})"
+
+    @property
+    def entero(self):
+        """El estado completo como un único entero."""
+        valor = 0
+        for i, palabra in enumerate(self.palabras):
+            valor |= palabra << (64 * i)
+        return valor
+
+    def campos(self):
+        """Decodifica el estado en un diccionario legible (para depurar)."""
+        valor = self.entero
+        num_cartas = len(CATALOGO)
+
+        def leer_recuentos(valor):
+            recuentos = []
+            for _ in range(num_cartas):
+                recuentos.append(valor & _MASCARA_RECUENTO)
+                valor >>= BITS_RECUENTO
+            return recuentos, valor
+
+        mazo, valor = leer_recuentos(valor)
+        descartes, valor = leer_recuentos(valor)
+        turno = valor & ((1 << BITS_TURNO) - 1)
+        valor >>= BITS_TURNO
+        chanciller = bool(valor & 1)
+        valor >>= 1
+        jugadores = []
+        for _ in range(self.num_jugadores):
+            mano = []
+            for _ in range(MAX_CARTAS_MANO):
+                codigo = valor & _MASCARA_CARTA
+                valor >>= BITS_CARTA
+                if codigo:
+                    mano.append(codigo - 1)
+            jugadores.append({"mano": mano, "eliminado": bool(valor & 1), "protegido": bool(valor & 2)})
+            valor >>= 2
+        return {"mazo": mazo, "descartes": descartes, "turno": turno,
+                "chanciller_pendiente": chanciller, "jugadores": jugadores}
+
+
+# Sumar 1 << (id * BITS_RECUENTO) por carta acumula directamente el recuento empaquetado
+_UNIDAD_RECUENTO = tuple(1 << (i * BITS_RECUENTO) for i in range(len(CATALOGO)))
+
+
+def _empaquetar_recuentos(cartas):
+    valor = 0
+    for carta in cartas:
+        valor += _UNIDAD_RECUENTO[carta.id]
+    return valor
+
+
+def codificar(partida):
+    """
+    Codifica el estado de la partida.
+    :param partida: Partida cuyo estado se quiere codificar.
+    :return: Estado hashable.
+    """
+    num_cartas = len(CATALOGO)
+    jugadores = partida.jugadores
+    desplazamiento = 0
+    valor = _empaquetar_recuentos(partida.deck)
+    desplazamiento += num_cartas * BITS_RECUENTO
+    valor |= _empaquetar_recuentos(partida.discard_pile) << desplazamiento
+    desplazamiento += num_cartas * BITS_RECUENTO
+
+    # Jugador al que le toca (o que está jugando si ya empezó su turno)
+    actual = (partida.turn - 1) % len(jugadores) if partida.current_player is not None else 0
+    valor |= actual << desplazamiento
+    desplazamiento += BITS_TURNO
+    valor |= (partida.chanciller_pendiente is not None) << desplazamiento
+    desplazamiento += 1
+
+    for jugador in jugadores:
+        # La mano se guarda ordenada: dos manos con las mismas cartas son el mismo estado
+        codigos = sorted(carta.id + 1 for carta in jugador.mano)
+        for i, codigo in enumerate(codigos):
+            valor |= codigo << (desplazamiento + i * BITS_CARTA)
+        desplazamiento += MAX_CARTAS_MANO * BITS_CARTA
+        valor |= (jugador.eliminado | jugador.protegido << 1) << desplazamiento
+        desplazamiento += 2
+
+    palabras = []
+    while desplazamiento > 0:
+        palabras.append(valor & _MASCARA_64)
+        valor >>= 64
+        desplazamiento -= 64
+    return Estado(tuple(palabras), len(jugadores))
@@ -0,0 +1,90 @@
+# eventos.py
+# Registro de eventos de la partida: un búfer circular acotado de eventos con tipo,
+# instante, turno, jugador y carta. Sustituye al texto del log que se concatenaba
+# en un Label y guarda el historial de la partida sin crecer sin límite.
+import time
+from collections import deque
+
+# Tipos de evento
+SISTEMA = "sistema"          # Inicio de partida, avisos de la interfaz
+TURNO = "turno"              # Comienza el turno de un jugador
+ROBO = "robo"                # Un jugador roba una carta
+JUGADA = "jugada"            # Un jugador juega una carta
+EFECTO = "efecto"            # Mensajes del efecto de una carta
+ELIMINACION = "eliminacion"  # Un jugador queda eliminado
+CAPACIDAD = 1000
+
+
+class Evento:
+    __slots__ = ("indice", "instante", "tipo", "turno", "jugador", "carta", "texto")
+
+    def __init__(self, indice, instante, tipo, turno, jugador, carta, texto):
+        self.indice = indice      # Posición del evento en toda la partida (no se reinicia al rotar)
+        self.instante = instante  # time.monotonic() al registrarlo
+        self.tipo = tipo
+        self.turno = turno
+        self.jugador = jugador    # Índice del jugador en la mesa, o None
+        self.carta = carta        # Id de la carta, o None
+        self.texto = texto
+
+    def __repr__(self):
+        return f"Evento({self.indice}, {self.tipo}, {self.texto!r})"
+
+
+class RegistroEventos:
+    """
+    Búfer circular de eventos: al llegar a `capacidad` se descartan los más antiguos.
+    :param capacidad: Número máximo de eventos guardados.
+    """
+
+    def __init__(self, capacidad=CAPACIDAD):
+        self.eventos = deque(maxlen=capacidad)
+        self.total = 0  # Eventos registrados desde el principio, incluidos los descartados
+        self._suscriptores = []
+
+    def __len__(self):
+        return len(self.eventos)
+
+    def __iter__(self):
+        return iter(self.eventos)
+
+    @property
+    def capacidad(self):
+        return self.eventos.maxlen
+
+    def agregar(self, tipo, texto, turno=None, jugador=None, carta=None):
+        evento = Evento(self.total, time.monotonic(), tipo, turno, jugador, carta, texto)
+        self.total += 1
+        self.eventos.append(evento)
+        for suscriptor in self._suscriptores:
+            suscriptor(evento)
+        return evento
+
+    def agregar_resultado(self, partida, resultado):
+        """Registra los mensajes de un partida.Resultado con su jugador y su carta."""
+        jugador = partida.jugadores.index(resultado.jugador)
+        carta = resultado.carta.id if resultado.carta is not None else None
+        for i, mensaje in enumerate(resultado.mensajes):
+            tipo = JUGADA if i == 0 and carta is not None else EFECTO
+            self.agregar(tipo, mensaje, partida.turn, jugador, carta)
+        for eliminado in resultado.eliminados:
+            self.agregar(ELIMINACION, f"{eliminado.nombre} queda fuera de la partida.", partida.turn,
+                         partida.jugadores.index(eliminado))
+
+    def desde(self, indice):
+        """Eventos con índice >= `indice` que siguen en el búfer."""
+        return [evento for evento in self.eventos if evento.indice >= indice]
+
+    def de_tipo(self, *tipos):
+        return [evento for evento in self.eventos if evento.tipo in tipos]
+
+    def limpiar(self):
+        self.eventos.clear()
+        self.total = 0
+
+    def suscribir(self, callback):
+        """`callback(evento)` se llama con cada evento nuevo."""
+        self._suscriptores.append(callback)
+
+    def desuscribir(self, callback):
+        self._suscriptores.remove(callback)
@@ -0,0 +1,135 @@
+# generar_assets.py
+# Paso de construcción de los recursos gráficos. A partir de las imágenes originales
+# de images/ genera, para cada tamaño al que la interfaz dibuja las cartas:
+#   - una variante reducida de cada imagen      images/generadas/<ancho>x<alto>/<nombre>.png
+#   - un atlas con todas las variantes           images/generadas/cartas-<ancho>x<alto>.png
+#   - un manifiesto con las regiones de cada atlas y las rutas de las variantes
+#                                                images/generadas/manifest.json
+# La interfaz (texturas.py) lee el manifiesto y usa el atlas del tamaño más cercano
+# al que se dibuja; si no se han generado los assets, reduce los originales al vuelo.
+#
+# Uso: python generar_assets.py [--paleta]
+#   --paleta  Cuantiza las imágenes a 256 colores (archivos bastante más pequeños).
+# Requiere Pillow, solo para generar los assets (la aplicación no lo necesita).
+import json
+import os
+import sys
+
+from PIL import Image
+
+from cartas import CATALOGO
+
+DIRECTORIO_SALIDA = 'images/generadas'
+RUTA_MANIFIESTO = os.path.join(DIRECTORIO_SALIDA, 'manifest.json')
+VERSION_MANIFIESTO = 1
+
+# Tamaños a los que se dibujan las cartas: cartas del Chanciller (150x200) y mazos,
+# popups y mano (200x300; la mano y los mazos usan el mayor)
+TAMANOS = [(150, 200), (200, 300)]
+
+IMAGEN_DEFECTO = 'images/default_card.png'
+IMAGENES_EXTRA = ['images/deck_back.png', IMAGEN_DEFECTO]
+
+
+def rutas_origen():
+    rutas = [carta.image_source for carta in CATALOGO] + IMAGENES_EXTRA
+    # Sin duplicados y solo las que existen (las que faltan usan la carta por defecto)
+    return [ruta for ruta in dict.fromkeys(rutas) if os.path.exists(ruta)]
+
+
+def potencia_de_dos(valor):
+    """Menor potencia de dos >= valor: las GPU antiguas no admiten texturas de otros tamaños."""
+    potencia = 1
+    while potencia < valor:
+        potencia *= 2
+    return potencia
+
+
+def reducir(imagen, tamano):
+    """Reduce la imagen para que quepa en `tamano` conservando la proporción."""
+    reducida = imagen.copy()
+    reducida.thumbnail(tamano, Image.LANCZOS)
+    return reducida
+
+
+def guardar(imagen, ruta, paleta):
+    if paleta:
+        imagen = imagen.quantize(256, method=Image.FASTOCTREE)
+    imagen.save(ruta, optimize=True)
+
+
+def generar_tamano(originales, tamano, paleta):
+    """Genera las variantes y el atlas de un tamaño. Devuelve su entrada del manifiesto."""
+    ancho, alto = tamano
+    nombre_tamano = f"{ancho}x{alto}"
+    directorio = os.path.join(DIRECTORIO_SALIDA, nombre_tamano)
+    os.makedirs(directorio, exist_ok=True)
+
+    columnas = min(len(originales), 4)
+    filas = (len(originales) + columnas - 1) // columnas
+    ancho_atlas, alto_atlas = potencia_de_dos(columnas * ancho), potencia_de_dos(filas * alto)
+    atlas = Image.new('RGBA', (ancho_atlas, alto_atlas), (0, 0, 0, 0))
+
+    variantes = {}
+    regiones = {}
+    for i, (ruta, original) in enumerate(originales.items()):
+        reducida = reducir(original, tamano)
+        ruta_variante = os.path.join(directorio, os.path.basename(ruta))
+        guardar(reducida, ruta_variante, paleta)
+        variantes[ruta] = ruta_variante
+
+        x, y = (i % columnas) * ancho, (i // columnas) * alto
+        atlas.paste(reducida, (x, y))
+        w, h = reducida.size
+        # Regiones con origen abajo a la izquierda, como las texturas de Kivy/OpenGL
+        regiones[ruta] = [x, alto_atlas - y - h, w, h]
+
+    ruta_atlas = os.path.join(DIRECTORIO_SALIDA, f"cartas-{nombre_tamano}.png")
+    guardar(atlas, ruta_atlas, paleta)
+    return nombre_tamano, {"tamano": [ancho, alto], "imagen": ruta_atlas, "regiones": regiones}, variantes
+
+
+def abrir_originales():
+    rutas = [carta.image_source for carta in CATALOGO] + IMAGENES_EXTRA
+    for ruta in dict.fromkeys(rutas):
+        if not os.path.exists(ruta):
+            print(f"Falta {ruta}: la interfaz usará la carta por defecto")
+    originales = {}
+    for ruta in rutas_origen():
+        try:
+            originales[ruta] = Image.open(ruta).convert('RGBA')
+        except OSError as error:
+            print(f"Se omite {ruta}: {error}")
+    if IMAGEN_DEFECTO not in originales:
+        print(f"Aviso: sin {IMAGEN_DEFECTO} las imágenes que faltan se verán como una carta lisa")
+    return originales
+
+
+def generar(paleta=False):
+    originales = abrir_originales()
+    manifiesto = {"version": VERSION_MANIFIESTO, "atlas": {}, "variantes": {}}
+    for tamano in TAMANOS:
+        nombre_tamano, atlas, variantes = generar_tamano(originales, tamano, paleta)
+        manifiesto["atlas"][nombre_tamano] = atlas
+        for ruta, ruta_variante in variantes.items():
+            manifiesto["variantes"].setdefault(ruta, {})[nombre_tamano] = ruta_variante
+    with open(RUTA_MANIFIESTO, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+    return manifiesto
+
+
+def main():
+    paleta = '--paleta' in sys.argv[1:]
+    manifiesto = generar(paleta)
+    total = 0
+    for nombre_tamano, atlas in manifiesto["atlas"].items():
+        tamano_archivo = os.path.getsize(atlas["imagen"])
+        total += tamano_archivo
+        print(f"{atlas['imagen']}: {len(atlas['regiones'])} imágenes, {tamano_archivo / 1024:.0f} KB")
+    originales = sum(os.path.getsize(ruta) for ruta in rutas_origen())
+    print(f"Atlas: {total / 1024:.0f} KB (originales: {originales / 1024:.0f} KB)")
+    print(f"Manifiesto: {RUTA_MANIFIESTO}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,27 @@
+from kivy.app import App
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout 
 from kivy.uix.label import Label 
 from kivy.uix.button import Button 
-from kivy.uix.textinput import TextInput 
 from kivy.uix.popup import Popup
 from kivy.uix.image import Image
 from kivy.uix.behaviors import ButtonBehavior
-from kivy.animation import Animation
 from kivy.graphics import Color, Rectangle
 from kivy.core.window import Window
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.relativelayout import RelativeLayout
-from jugadores import Jugador
-from partida import Partida
+from kivy.clock import Clock
+from kivy.metrics import dp
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from cartas import CATALOGO, CONDESA, PRINCESA
+from efectos import TABLA as EFECTOS, ADIVINANZAS
+from partida import Partida, Jugada
+from texturas import imagen, textura, IMAGEN_DEFECTO, IMAGEN_DORSO
+import animaciones
+import eventos
+from eventos import RegistroEventos
+from popups import GESTOR as popups, aviso, SeleccionObjetivo, CartaRevelada, Comparacion, DetallesCarta, Victoria
 
 # Nueva pantalla para el efecto del Guardia
 class GuardiaScreen(Screen):
@@ -98,12 +107,10 @@ class GuardiaScreen(Screen):
         self.guess_buttons_layout.clear_widgets()
         
         # Construir botones para la selección de jugador objetivo
-        targets = [j for j in self.game_screen.partida.jugadores 
-                   if j != self.jugador_actual and not j.eliminado and not j.protegido]
+        targets = self.game_screen.partida.objetivos_validos(self.carta, self.jugador_actual)
         if not targets:
-            self.game_screen.log("No hay objetivos disponibles para el Guardia.")
-            self.game_screen.next_button.disabled = False
             self.game_screen.manager.current = 'game'
+            self.game_screen.resolver_jugada(self.carta)
             return
             
         # Botones de jugadores aún más pequeños
@@ -120,17 +127,16 @@ class GuardiaScreen(Screen):
             self.target_buttons_layout.add_widget(btn)
             
         # Construir botones para la selección de carta
-        available_cards = ["Sacerdote", "Barón", "Doncella", "Príncipe", "Rey", 
-                         "Condesa", "Princesa", "Chanciller", "Espía"]
-        for card_name in available_cards:
+        available_cards = [CATALOGO[id_carta] for id_carta in ADIVINANZAS]
+        for card in available_cards:
             btn = Button(
-                text=card_name,
+                text=card.nombre,
                 size_hint=(1, None),
                 height=45,  # Altura reducida
                 background_color=(0.6, 0.4, 0.2, 1),
                 color=(1, 1, 1, 1)
             )
-            btn.bind(on_press=lambda instance, guess=card_name: self.select_guess(instance, guess))
+            btn.bind(on_press=lambda instance, guess=card.id: self.select_guess(instance, guess))
             self.guess_buttons_layout.add_widget(btn)
             
         self.confirm_btn.unbind(on_press=self.on_confirm)
@@ -156,140 +162,9 @@ class GuardiaScreen(Screen):
             self.game_screen.log("Debes seleccionar una carta para adivinar.")
             return
             
-        guess = self.selected_guess.lower()
-        target = self.selected_target
-        
-        if any(carta.nombre.lower() == guess for carta in target.mano):
-            if any(carta.nombre.lower() == "guardia" for carta in target.mano):
-                self.game_screen.log(f"{target.nombre} tiene un Guardia, no puede ser eliminado.")
-            else:
-                self.game_screen.log(f"¡Correcto! {target.nombre} tenía {guess} y queda eliminado.")
-                target.eliminado = True
-                target.mano.clear()
-        else:
-            self.game_screen.log("Adivinaste mal. No ocurre nada.")
-            
-        # Descartar la carta del Guardia
-        self.game_screen.complete_card_play(self.carta)
-        self.game_screen.next_button.disabled = False
         self.game_screen.manager.current = 'game'
+        self.game_screen.resolver_jugada(self.carta, self.selected_target, self.selected_guess)
 
-# Nueva pantalla para el efecto del Barón
-class BaronScreen(Screen):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.jugador_actual = None
-        self.carta = None
-        self.game_screen = None
-        
-        # Layout principal
-        self.layout = BoxLayout(orientation='vertical', padding=[20, 30, 20, 10], spacing=10)
-        self.add_widget(self.layout)
-        
-        # Sección de selección de jugador
-        self.player_section = BoxLayout(orientation='vertical', spacing=5, size_hint=(1, 0.4))
-        self.instruction_label = Label(
-            text="Selecciona un jugador para comparar cartas:",
-            size_hint=(1, 0.4),
-            font_size='18sp',
-            color=(0.2, 0.1, 0, 1)
-        )
-        self.player_section.add_widget(self.instruction_label)
-        
-        # Layout para los botones de jugadores
-        self.target_buttons_layout = BoxLayout(
-            orientation='horizontal',
-            spacing=10,
-            size_hint=(0.7, 0.6),
-            pos_hint={'center_x': 0.5}
-        )
-        self.player_section.add_widget(self.target_buttons_layout)
-        self.layout.add_widget(self.player_section)
-        
-        # Botón de confirmar
-        button_layout = BoxLayout(
-            orientation='vertical',
-            size_hint=(1, 0.15),
-            padding=[0, 0, 0, 10]
-        )
-        self.confirm_btn = Button(
-            text="Confirmar",
-            size_hint=(0.3, 0.7),
-            pos_hint={'center_x': 0.5},
-            background_color=(0.6, 0.4, 0.2, 1),
-            color=(1, 1, 1, 1)
-        )
-        button_layout.add_widget(self.confirm_btn)
-        self.layout.add_widget(button_layout)
-        
-        self.selected_target = None
-
-    def set_context(self, jugador_actual, carta, game_screen):
-        self.jugador_actual = jugador_actual
-        self.carta = carta
-        self.game_screen = game_screen
-        self.selected_target = None
-        self.build_ui()
-
-    def build_ui(self):
-        self.target_buttons_layout.clear_widgets()
-        
-        # Construir botones para la selección de jugador objetivo
-        targets = [j for j in self.game_screen.partida.jugadores 
-                   if j != self.jugador_actual and not j.eliminado and not j.protegido]
-        
-        if not targets:
-            self.game_screen.log("No hay objetivos disponibles para el Barón.")
-            self.game_screen.complete_card_play(self.carta)
-            self.game_screen.next_button.disabled = False
-            self.game_screen.manager.current = 'game'
-            return
-            
-        # Botones de jugadores
-        button_width = 1.0 / len(targets) if targets else 1
-        for target in targets:
-            btn = Button(
-                text=target.nombre,
-                size_hint=(button_width, 0.7),
-                pos_hint={'center_y': 0.5},
-                background_color=(0.6, 0.4, 0.2, 1),
-                color=(1, 1, 1, 1)
-            )
-            btn.bind(on_press=lambda instance, t=target: self.select_target(instance, t))
-            self.target_buttons_layout.add_widget(btn)
-            
-        self.confirm_btn.bind(on_press=self.on_confirm)
-
-    def select_target(self, instance, target):
-        self.selected_target = target
-        for child in self.target_buttons_layout.children:
-            child.background_color = (0.6, 0.4, 0.2, 1)
-        instance.background_color = (0, 1, 0, 1)
-
-    def on_confirm(self, instance):
-        if self.selected_target is None:
-            self.game_screen.log("Debes seleccionar un objetivo.")
-            return
-            
-        target = self.selected_target
-        if target.mano:
-            carta_jugador = [c for c in self.jugador_actual.mano if c != self.carta][0]
-            carta_objetivo = target.mano[0]
-            self.game_screen.log(f"Comparando cartas: {self.jugador_actual.nombre}({carta_jugador.nombre}) vs {target.nombre}({carta_objetivo.nombre})")
-            
-            if carta_jugador.valor > carta_objetivo.valor:
-                self.game_screen.log(f"{target.nombre} es eliminado")
-                target.eliminado = True
-            elif carta_jugador.valor < carta_objetivo.valor:
-                self.game_screen.log(f"{self.jugador_actual.nombre} es eliminado")
-                self.jugador_actual.eliminado = True
-            else:
-                self.game_screen.log("Empate, nadie es eliminado")
-        
-        # Descartar la carta del Barón
-        self.game_screen.complete_card_play(self.carta)
-        self.game_screen.next_button.disabled = False
-        self.game_screen.manager.current = 'game'
 # -----------------------------
 # Widget para representar una carta
 # -----------------------------
@@ -306,80 +181,21 @@ class CardWidget(ButtonBehavior, BoxLayout):
             Color(rgba=(0.8, 0.7, 0.6, 1))
             self.rect = Rectangle(pos=self.pos, size=self.size)
         self.bind(pos=self._update_rect, size=self._update_rect)
-        card_image = Image(source=carta.image_source, size_hint=(1, 0.7))
-        card_label = Label(text=carta.nombre, size_hint=(1, 0.3), font_size='18sp', color=(0.2, 0.1, 0, 1))
-        self.add_widget(card_image)
-        self.add_widget(card_label)
-
-    def _update_rect(self, *args):
-        self.rect.pos = self.pos
-        self.rect.size = self.size
+        self.image = imagen(carta.image_source, size_hint=(1, 0.7))
+        self.label = Label(text=carta.nombre, size_hint=(1, 0.3), font_size='18sp', color=(0.2, 0.1, 0, 1))
+        self.add_widget(self.image)
+        self.add_widget(self.label)
 
-# -----------------------------
-# Pantalla de configuración (SetupScreen)
-# Ahora se pide primero el número de jugadores y luego, en el mismo layout, se
-# solicitan los nombres de cada uno.
-# -----------------------------
-class SetupScreen(Screen):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.names_inputs = []
-        with self.canvas.before:
-            Color(rgba=(0.95, 0.9, 0.8, 1))
-            self.rect = Rectangle(size=Window.size, pos=self.pos)
-        self.bind(size=self._update_rect, pos=self._update_rect)
-        self.layout = BoxLayout(orientation='vertical', padding=20, spacing=20)
-        self.add_widget(self.layout)
-        self.build_initial_ui()
+    def asignar(self, carta):
+        """Reutiliza el widget para mostrar otra carta."""
+        self.carta = carta
+        self.image.texture = textura(carta.image_source)
+        self.label.text = carta.nombre
 
     def _update_rect(self, *args):
-        self.rect.size = self.size
         self.rect.pos = self.pos
+        self.rect.size = self.size
 
-    def build_initial_ui(self):
-        self.layout.clear_widgets()
-        self.layout.add_widget(Label(text="Bienvenido al Juego de Cartas", font_size='30sp', color=(0.2,0.1,0,1)))
-        self.layout.add_widget(Label(text="Ingresa el número de jugadores (mínimo 2):", color=(0.2,0.1,0,1)))
-        self.num_input = TextInput(text='', multiline=False, input_filter='int', hint_text="Número de jugadores")
-        self.layout.add_widget(self.num_input)
-        start_button = Button(text="Siguiente", size_hint=(0.5, 0.3), pos_hint={'center_x': 0.5},
-                              background_color=(0.6, 0.4, 0.2, 1), color=(1,1,1,1))
-        start_button.bind(on_press=self.create_name_inputs)
-        self.layout.add_widget(start_button)
-
-    def create_name_inputs(self, instance):
-        num_str = self.num_input.text.strip()
-        if not num_str.isdigit() or int(num_str) < 2:
-            popup = Popup(title="Error",
-                          content=Label(text="Ingrese un número válido (mínimo 2).", color=(1,0,0,1)),
-                          size_hint=(None, None), size=(300, 200))
-            popup.open()
-            return
-        num = int(num_str)
-        self.layout.clear_widgets()
-        self.names_inputs = []
-        self.layout.add_widget(Label(text="Ingresa el nombre de cada jugador:", font_size='24sp', color=(0.2,0.1,0,1)))
-        for i in range(num):
-            ti = TextInput(text=f"Jugador {i+1}", multiline=False, size_hint=(1, None), height=40)
-            self.names_inputs.append(ti)
-            self.layout.add_widget(ti)
-        confirm_button = Button(text="Iniciar Juego", size_hint=(0.5, 0.3), pos_hint={'center_x': 0.5},
-                                  background_color=(0.6, 0.4, 0.2, 1), color=(1,1,1,1))
-        confirm_button.bind(on_press=self.start_game)
-        self.layout.add_widget(confirm_button)
-
-    def start_game(self, instance):
-        names = [ti.text.strip() for ti in self.names_inputs if ti.text.strip()]
-        if len(names) < 2:
-            popup = Popup(title="Error",
-                          content=Label(text="Debe haber al menos 2 nombres.", color=(1,0,0,1)),
-                          size_hint=(None, None), size=(300, 200))
-            popup.open()
-            return
-        players = [Jugador(name) for name in names]
-        game_screen = self.manager.get_screen('game')
-        game_screen.start_game(players)
-        self.manager.current = 'game'
 class ChancillerScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -423,28 +239,23 @@ class ChancillerScreen(Screen):
         self.carta = carta
         self.game_screen = game_screen
         self.selected_card = None
-        self.cards_drawn = self.draw_two_cards()
-        self.cards_drawn.append(self.jugador_actual.mano.pop())  # Agregar la carta que ya tenía
+        # El motor ya ha robado las cartas: la mano contiene la carta propia y las robadas
+        self.cards_drawn = list(self.jugador_actual.mano)
         self.build_ui()
     
-    def draw_two_cards(self):
-        """Robar dos cartas del mazo."""
-        if len(self.game_screen.partida.deck) < 2:
-            return self.game_screen.partida.deck[:]
-        return [self.game_screen.partida.deck.pop(0) for _ in range(2)]
-    
     def build_ui(self):
         self.card_section.clear_widgets()
         
         positions = [{'center_x': 0.5, 'center_y': 0.5}, {'center_x': 0.2, 'center_y': 0.5}, {'center_x': 0.8, 'center_y': 0.5}]
         
         for i, card in enumerate(self.cards_drawn):
-            card_btn = Image(
-                source=card.image_source,
+            card_btn = imagen(
+                card.image_source,
                 size_hint=(None, None),
                 size=(150, 200),
                 pos_hint=positions[i]
             )
+            card_btn.carta = card
             card_btn.bind(
                 on_touch_down=lambda instance, touch, c=card: self.select_card(c) if instance.collide_point(*touch.pos) else None
             )
@@ -478,7 +289,7 @@ class ChancillerScreen(Screen):
         # Al seleccionar la carta, podemos cambiar su estilo visual (por ejemplo, bordes)
         for child in self.card_section.children:
             if isinstance(child, Image):
-                if child.source == card.image_source:
+                if child.carta == card:
                     child.opacity = 1  # Asegurarse de que la carta seleccionada esté completamente visible
                     child.size = (170, 220)  # Tamaño resaltado
                 else:
@@ -486,13 +297,13 @@ class ChancillerScreen(Screen):
     
     def on_confirm(self, instance):
         if self.selected_card is None:
-            popup = Popup(title="Error", content=Label(text="Debes seleccionar una carta para quedártela."),
-                          size_hint=(None, None), size=(300, 200))
-            popup.open()
+            aviso("Error", "Debes seleccionar una carta para quedártela.", color=(1, 1, 1, 1))
             return
         
-        self.jugador_actual.mano.append(self.selected_card)
         self.cards_drawn.remove(self.selected_card)
+        if len(self.cards_drawn) < 2:
+            self.return_cards(self.cards_drawn)
+            return
         
         self.ask_card_order()
     
@@ -515,8 +326,8 @@ class ChancillerScreen(Screen):
     
         # Crear botones de las cartas
         for card in self.cards_drawn:
-            card_btn = Image(
-                source=card.image_source,
+            card_btn = imagen(
+                card.image_source,
                 size_hint=(None, None),
                 size=(150, 200),  # Tamaño de las cartas
                 pos_hint={'center_y': 0.5}
@@ -553,18 +364,16 @@ class ChancillerScreen(Screen):
     
     def select_last_card(self, card):
         """Seleccionar la carta que irá en la última posición."""
+        self.order_popup.dismiss()
         self.cards_drawn.remove(card)
-        self.game_screen.partida.deck.append(card)
-        self.select_second_last_card()
+        self.return_cards(self.cards_drawn + [card])
     
-    def select_second_last_card(self):
-        remaining_card = self.cards_drawn[0]
-        self.game_screen.partida.deck.append(remaining_card)
-        self.order_popup.dismiss()
-        self.game_screen.log(f"{self.jugador_actual.nombre} ha devuelto las cartas al final del mazo.")
-        self.game_screen.complete_card_play(self.carta)
-        self.game_screen.next_button.disabled = False
+    def return_cards(self, devueltas):
+        """Devuelve las cartas al fondo del mazo en el orden indicado."""
+        resultado = self.game_screen.partida.resolver_chanciller(self.selected_card, devueltas)
+        self.game_screen.log_resultado(resultado)
         self.game_screen.manager.current = 'game'
+        self.game_screen.complete_card_play(self.carta)
 # -----------------------------
 # Pantalla del juego (GameScreen)
 # -----------------------------
@@ -579,6 +388,8 @@ class GameScreen(Screen):
         self.partida = None
         self.card_played = False  # Variable para controlar si se ha jugado una carta
         self.is_processing_effect = False  # Variable para controlar el estado de procesamiento
+        self.bot = None  # BotISMCTS, se crea con el primer turno de un jugador controlado por la IA
+        self.ultimo_resultado = None  # Resultado de la jugada en curso, para sus efectos de sonido
 
         # Layout principal (vertical)
         self.layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
@@ -606,11 +417,11 @@ class GameScreen(Screen):
         mazo_layout.pos_hint = {'center_x': 0.5}  # Centramos el contenedor de mazos
 
         # Mazo de robo
-        self.deck_widget = DeckWidget(callback=self.show_remaining_deck, size_hint=(None, None), size=(120, 150))
+        self.deck_widget = DeckWidget(callback=self.show_remaining_deck)  # 200x300, fijado por el propio widget
         mazo_layout.add_widget(self.deck_widget)
 
         # Mazo de descartes
-        self.discard_pile = DiscardPile(size_hint=(None, None), size=(120, 150))
+        self.discard_pile = DiscardPile()
         mazo_layout.add_widget(self.discard_pile)
 
         # Agregar el layout de mazos al layout principal
@@ -619,10 +430,13 @@ class GameScreen(Screen):
         # Layout de la mano del jugador
         self.hand_layout = BoxLayout(orientation='horizontal', size_hint=(1, 0.3), spacing=10)
         self.layout.add_widget(self.hand_layout)
+        self.hand_widgets = []  # CardWidgets de la mano, en orden
+        self.card_pool = []     # CardWidgets libres para reutilizar
 
-        # Log del juego
-        self.log_label = Label(text="Log del juego:", size_hint=(1, 0.4), font_size='18sp', color=(0.2, 0.1, 0, 1))
-        self.layout.add_widget(self.log_label)
+        # Log del juego: historial completo en un búfer circular, solo se dibujan las filas visibles
+        self.registro = RegistroEventos()
+        self.log_view = LogView(self.registro, size_hint=(1, 0.4))
+        self.layout.add_widget(self.log_view)
 
 
         # Botón de siguiente turno
@@ -644,659 +458,264 @@ class GameScreen(Screen):
     def start_game(self, players):
         self.partida = Partida(players)
         self.partida.repartir_inicial()
-        self.log_label.text = "Juego iniciado.\n"
+        self.anotar(inicio=True)
+        self.registro.limpiar()
+        self.log_view.reset()
+        self.log("Juego iniciado.")
+        self.next_turn()
+
+    def reanudar(self, partida):
+        """
+        Continúa una partida recuperada del diario. El diario se anota al completar
+        cada jugada, así que la partida siempre está a punto de empezar turno.
+        """
+        self.partida = partida
+        self.registro.limpiar()
+        self.log_view.reset()
+        if partida.discard_pile:
+            self.discard_pile.update_card(partida.discard_pile[-1])
+        self.log("Partida recuperada.")
         self.next_turn()
 
-    def log(self, message):
-        self.log_label.text += message + "\n"
+    def anotar(self, inicio=False, ganador=None):
+        """Anota la partida en el diario de la aplicación, si lo hay, y lo confirma en otro hilo."""
+        diario = getattr(App.get_running_app(), 'diario', None)
+        if diario is None:
+            return
+        # kivy_app ya lo ha importado al abrir el diario; arriba cargaría bot al crear la pantalla
+        from diario import MESA_LOCAL
+        if inicio:
+            diario.iniciar(MESA_LOCAL, self.partida)
+        elif ganador:
+            diario.terminar(MESA_LOCAL, self.partida.jugadores.index(ganador))
+        else:
+            diario.actualizar(MESA_LOCAL)
+        diario.confirmar_en_segundo_plano()
+
+    def log(self, message, tipo=eventos.SISTEMA, jugador=None, carta=None):
+        indice = self.partida.jugadores.index(jugador) if self.partida and jugador else None
+        self.registro.agregar(tipo, message, self.partida.turn if self.partida else None, indice,
+                              carta.id if carta else None)
+
+    def log_resultado(self, resultado):
+        self.registro.agregar_resultado(self.partida, resultado)
+        self.ultimo_resultado = resultado
+
+    def sonar(self, nombre):
+        """Dispara un efecto de sonido en el mezclador de la aplicación, si lo hay."""
+        mezclador = getattr(App.get_running_app(), 'mezclador', None)
+        if mezclador is not None:
+            mezclador.disparar(nombre)
 
     def show_remaining_deck(self):
         if self.partida and self.partida.deck:
             count = len(self.partida.deck)
-            content = BoxLayout(orientation='vertical', spacing=10, padding=10)
-            content.add_widget(Label(text=f"Cartas restantes en el mazo: {count}", font_size="20sp"))
-            popup = Popup(title="Mazo", content=content, size_hint=(None, None), size=(400, 200))
-            popup.open()
+            aviso("Mazo", f"Cartas restantes en el mazo: {count}", tamano=(400, 200), color=(1, 1, 1, 1), font_size="20sp")
         else:
-            popup = Popup(title="Mazo", content=Label(text="El mazo está vacío."), size_hint=(None, None), size=(300, 200))
-            popup.open()
+            aviso("Mazo", "El mazo está vacío.", color=(1, 1, 1, 1))
 
     def update_ui(self):
-        self.hand_layout.clear_widgets()
-        if self.partida and self.partida.current_player and not self.partida.current_player.eliminado:
-            self.info_label.text = f"Turno de: {self.partida.current_player.nombre}"
-            for carta in self.partida.current_player.mano:
-                card_widget = CardWidget(carta)
-                card_widget.opacity = 0
-                anim = Animation(opacity=1, duration=0.5)
-                anim.start(card_widget)
-                card_widget.bind(on_press=lambda instance, c=carta: self.show_card_details(c))
-                self.hand_layout.add_widget(card_widget)
+        cartas = []
+        jugador = self.partida.current_player if self.partida else None
+        if jugador and not jugador.eliminado:
+            self.info_label.text = f"Turno de: {jugador.nombre}"
+            # La mano de la IA no se muestra
+            if not jugador.es_bot:
+                cartas = list(jugador.mano)
+        self.render_hand(cartas)
+
+    def render_hand(self, cartas):
+        """
+        Muestra `cartas` en la mano comparándolas con lo que ya se ve: los widgets de
+        las cartas que siguen en la mano no se tocan, los huecos que cambian se
+        reasignan y los que sobran vuelven al pool.
+        """
+        anteriores = list(self.hand_widgets)
+        widgets = [None] * len(cartas)
+        # Primero se conservan los widgets que ya muestran la misma carta
+        for i, carta in enumerate(cartas):
+            for widget in anteriores:
+                if widget.carta is carta:
+                    widgets[i] = widget
+                    anteriores.remove(widget)
+                    break
+        # Los huecos nuevos reutilizan los widgets sobrantes o los del pool
+        for i, carta in enumerate(cartas):
+            if widgets[i] is not None:
+                continue
+            if anteriores:
+                widget = anteriores.pop()
+            elif self.card_pool:
+                widget = self.card_pool.pop()
+            else:
+                widget = CardWidget(carta)
+                widget.bind(on_press=lambda instance: self.show_card_details(instance.carta))
+            animaciones.restablecer(widget)
+            widget.asignar(carta)
+            widget.opacity = 0
+            animaciones.animar(widget, 0.5, opacity=1)
+            widgets[i] = widget
+        for widget in anteriores:
+            self.release_card_widget(widget)
+
+        # Solo se recoloca la mano si ha cambiado el orden o hay widgets nuevos
+        visibles = [w for w in reversed(self.hand_layout.children) if w in widgets]
+        if visibles != widgets:
+            for widget in widgets:
+                if widget.parent is not None:
+                    self.hand_layout.remove_widget(widget)
+            for widget in widgets:
+                self.hand_layout.add_widget(widget)
+        self.hand_widgets = widgets
+
+    def release_card_widget(self, widget):
+        animaciones.restablecer(widget)
+        if widget.parent is not None:
+            widget.parent.remove_widget(widget)
+        self.card_pool.append(widget)
 
     def next_turn(self, instance=None):
-        # Limpiar el log del juego al cambiar de turno  
-        self.log_label.text = "Log del juego:\n"
-
         # Si se presionó el botón y aún no se jugó una carta, se impide avanzar
         if instance is not None and self.partida and self.partida.current_player and not self.card_played:
-            popup = Popup(title="Alerta",
-                          content=Label(text="Debes jugar una carta antes de pasar al siguiente turno.", color=(1, 0, 0, 1)),
-                          size_hint=(None, None), size=(400, 200))
-            popup.open()
+            aviso("Alerta", "Debes jugar una carta antes de pasar al siguiente turno.", tamano=(400, 200), color=(1, 0, 0, 1))
             return
 
         if self.partida:
-            jugador = self.partida.siguiente_jugador()
-            # Se elimina la protección al inicio del turno
-            jugador.protegido = False
-            carta_roba = self.partida.robar_carta(jugador)
+            # Reiniciar el estado de la carta jugada para el nuevo turno
+            self.card_played = False
+            jugador, carta_roba = self.partida.iniciar_turno()
+            self.log(f"Turno de {jugador.nombre}", eventos.TURNO, jugador)
             if carta_roba:
-                self.log(f"{jugador.nombre} roba: {carta_roba}")
+                self.log(f"{jugador.nombre} roba: {carta_roba}", eventos.ROBO, jugador, carta_roba)
+                self.sonar('robo')
             else:
                 self.log("La baraja se ha agotado.")
 
+            if jugador.es_bot:
+                self.update_ui()
+                self.turno_bot()
+                return
+
             # Regla de la Condesa: si en la mano hay Condesa junto a Rey o Príncipe, se debe jugar la Condesa
-            if any(carta.nombre == "Condesa" for carta in jugador.mano) and \
-               any(carta.nombre in ["Rey", "Príncipe"] for carta in jugador.mano):
-                for carta in jugador.mano:
-                    if carta.nombre == "Condesa":
-                        self.log(f"{jugador.nombre} debe jugar la Condesa obligatoriamente.")
-                        self.play_card(carta)
-                        return
+            if self.partida.debe_jugar_condesa(jugador):
+                condesa = next(carta for carta in jugador.mano if carta.id == CONDESA)
+                self.log(f"{jugador.nombre} debe jugar la Condesa obligatoriamente.", eventos.EFECTO, jugador, condesa)
+                self.update_ui()
+                self.play_card(condesa)
+                return
 
             # Actualizar la UI
             self.update_ui()
 
-        # Reiniciar el estado de la carta jugada para el siguiente turno
-        self.card_played = False
-
-    def elegir_jugador(self, carta):
+    def turno_bot(self):
         """
-        Maneja la selección de un objetivo para el efecto de una carta
+        Pide su decisión al bot sin bloquear la interfaz: la búsqueda corre en otros
+        procesos y el resultado vuelve al hilo de Kivy con Clock.schedule_once.
         """
+        if self.bot is None:
+            # Se importa aquí: bot arrastra multiprocessing y solo hace falta si hay jugadores IA
+            from bot import BotISMCTS
+            self.bot = BotISMCTS()
+        self.card_played = True
         self.next_button.disabled = True
-        if carta.nombre == "Guardia":
-            self.show_guardia_screen(self.partida.current_player, carta)
-        elif carta.nombre == "Sacerdote":
-            # Obtener jugadores válidos como objetivo
-            targets = [j for j in self.partida.jugadores if j != self.partida.current_player and not j.eliminado and not j.protegido]
-            
-            if not targets:
-                self.log("No hay objetivos válidos para el Sacerdote")
-                self.card_played = True
-                self.next_button.disabled = False
-                self.complete_card_play(carta)
-                return
-                
-            content = BoxLayout(orientation='vertical', spacing=10, padding=10)
-            content.add_widget(Label(text="Selecciona un jugador para ver su carta:", font_size='18sp'))
-            
-            # Layout para los botones
-            buttons_layout = GridLayout(cols=2, spacing=10, padding=10)
-
-            # Crear el popup antes de los botones para poder referenciarlo
-            selection_popup = Popup(
-                title='Efecto del Sacerdote',
-                content=content,
-                size_hint=(0.8, 0.8),
-                auto_dismiss=False
-            )
-            
-            for target in targets:
-                btn = Button(
-                    text=target.nombre,
-                    size_hint_y=None,
-                    height=40,
-                    background_color=(0.6, 0.4, 0.2, 1),
-                    color=(1,1,1,1)
-                )
-                def create_callback(t=target, p=selection_popup):
-                    def on_press(instance):
-                        p.dismiss()  # Cerrar el popup usando la referencia correcta
-                        # Mostrar la carta del objetivo
-                        self.show_target_card(self.partida.current_player, t, carta)
-                    return on_press
-                btn.bind(on_press=create_callback())
-                buttons_layout.add_widget(btn)
-            
-            content.add_widget(buttons_layout)
-            selection_popup.open()
-        elif carta.nombre == "Barón":
-            # Mostrar popup para seleccionar objetivo para el Barón
-            targets = [j for j in self.partida.jugadores if j != self.partida.current_player and not j.eliminado and not j.protegido]
-            if not targets:
-                self.log("No hay objetivos válidos para el Barón")
-                self.card_played = True
-                self.next_button.disabled = False
-                self.complete_card_play(carta)
-                return
-            
-            content = BoxLayout(orientation='vertical', spacing=10, padding=10)
-            content.add_widget(Label(text="Selecciona un jugador para comparar cartas:", font_size='18sp'))
-            
-            # Layout para los botones
-            buttons_layout = GridLayout(cols=2, spacing=10, padding=10)
-
-            # Crear el popup antes de los botones para poder referenciarlo
-            baron_popup = Popup(
-                title='Efecto del Barón',
-                content=content,
-                size_hint=(0.8, 0.8),
-                auto_dismiss=False
-            )
-            
-            for target in targets:
-                btn = Button(
-                    text=target.nombre,
-                    size_hint_y=None,
-                    height=40,
-                    background_color=(0.6, 0.4, 0.2, 1),
-                    color=(1,1,1,1)
-                )
-                def create_callback(t=target, p=baron_popup):
-                    def on_press(instance):
-                        p.dismiss()  # Cerrar el popup usando la referencia correcta
-                        self.compare_hands(self.partida.current_player, t, carta)
-                    return on_press
-                btn.bind(on_press=create_callback())
-                buttons_layout.add_widget(btn)
-            
-            content.add_widget(buttons_layout)
-            baron_popup.open()
-        elif carta.nombre == "Príncipe":
-            self.show_principe_popup(self.partida.current_player, carta)
-        elif carta.nombre == "Rey":
-            self.show_rey_popup(self.partida.current_player, carta)
+        self.info_label.text = f"Turno de: {self.partida.current_player.nombre} (pensando...)"
+        partida = self.partida
+
+        def al_terminar(decision):
+            Clock.schedule_once(lambda dt: self.aplicar_decision_bot(partida, decision))
+
+        self.bot.pensar(partida, al_terminar)
+
+    def aplicar_decision_bot(self, partida, decision):
+        if partida is not self.partida:
+            return  # La partida se reinició mientras el bot pensaba
+        if isinstance(decision, Jugada):
+            self.sonar('jugada')
+            self.resolver_jugada(decision.carta, decision.objetivo, decision.adivinanza)
         else:
-            # Para cartas sin efecto que requieren selección de objetivo
-            self.complete_card_play(carta)
-        
-        # Marcar que se jugó una carta
-        self.card_played = True
+            conservada, devueltas = decision
+            resultado = self.partida.resolver_chanciller(conservada, devueltas)
+            self.log_resultado(resultado)
+            self.complete_card_play(None)
+
+    def cerrar_bot(self):
+        if self.bot is not None:
+            self.bot.cerrar()
+            self.bot = None
 
-    def on_target_selected(self, jugador, carta, target):
+    def elegir_jugador(self, carta):
         """
-        Maneja la selección de un objetivo para el efecto de una carta
+        Muestra el popup para seleccionar el objetivo del efecto de una carta
         """
-        if target:
-            if carta.nombre == "Guardia":
-                self.show_guardia_screen(jugador, carta)
-            elif carta.nombre == "Sacerdote":
-                self.show_target_card(self.partida.current_player, target, carta)
-                self.complete_card_play(carta)
-            elif carta.nombre == "Barón":
-                self.compare_hands(jugador, target, carta)
-            elif carta.nombre == "Príncipe":
-                self.discard_and_draw(target, carta)
-            elif carta.nombre == "Rey":
-                self.swap_hands(jugador, target, carta)
-            
-            # Marcar que se jugó una carta
-            self.card_played = True
-            
-        else:
-            self.log("Debes seleccionar un objetivo.")
+        targets = self.partida.objetivos_validos(carta)
+        if not targets:
+            self.resolver_jugada(carta)
+            return
+
+        popups.abrir(SeleccionObjetivo, carta=carta, objetivos=targets,
+                     al_elegir=lambda target: self.resolver_jugada(carta, target))
 
     def show_guardia_screen(self, jugador, carta):
         guardia_screen = self.manager.get_screen('guardia')
         guardia_screen.set_context(jugador, carta, self)
         self.manager.current = 'guardia'
 
-    def show_sacerdote_popup(self, jugador, carta):
+    def show_chanciller_screen(self, jugador, carta):
+        chanciller_screen = self.manager.get_screen('chanciller')
+        chanciller_screen.set_context(jugador, carta, self)
+        self.manager.current = 'chanciller'
+
+    def resolver_jugada(self, carta, objetivo=None, adivinanza=None):
         """
-        Muestra el popup para seleccionar el objetivo del Sacerdote
+        Resuelve la jugada en el motor de la partida y muestra su resultado
         """
-        content = BoxLayout(orientation='vertical')
-        label = Label(text="Selecciona un jugador para ver su carta:")
-        content.add_widget(label)
-        
-        # Marcar que se jugó una carta inmediatamente
-        self.card_played = True
-        
-        # Crear botones para cada jugador que no sea el actual y no esté eliminado o protegido
-        target_buttons = GridLayout(cols=2, spacing=10, padding=10)
-        for target in self.partida.jugadores:
-            if target != jugador and not target.eliminado and not target.protegido:
-                btn = Button(
-                    text=target.nombre,
-                    size_hint_y=None,
-                    height=40,
-                    background_color=(0.6, 0.4, 0.2, 1),
-                    color=(1,1,1,1)
-                )
-                def create_callback(t=target, p=popup):
-                    def on_press(instance):
-                        p.dismiss()
-                        self.show_target_card(jugador, t, carta)
-                    return on_press
-                btn.bind(on_press=create_callback())
-                target_buttons.add_widget(btn)
-        
-        content.add_widget(target_buttons)
-        
-        # Si no hay objetivos válidos
-        if not target_buttons.children:
-            self.log("No hay objetivos válidos para el Sacerdote")
+        resultado = self.partida.jugar_carta(carta, objetivo, adivinanza)
+        self.log_resultado(resultado)
+        self.discard_pile.update_card(self.partida.discard_pile[-1])
+
+        if resultado.pendiente and resultado.jugador.es_bot:
+            self.turno_bot()
+        elif resultado.pendiente:
+            self.show_chanciller_screen(resultado.jugador, carta)
+        elif resultado.revelada and resultado.jugador.es_bot:
+            # La carta vista por la IA no se enseña al resto de jugadores
+            self.complete_card_play(carta)
+        elif resultado.revelada:
+            self.show_target_card(resultado)
+        elif resultado.comparacion:
+            self.compare_hands(resultado)
+        else:
             self.complete_card_play(carta)
-            return
-        
-        popup = Popup(
-            title='Efecto del Sacerdote',
-            content=content,
-            size_hint=(0.8, 0.8),
-            auto_dismiss=False
-        )
-        popup.open()
 
-    def show_target_card(self, jugador, target, carta):
+    def show_target_card(self, resultado):
         """Muestra la carta del jugador objetivo en un popup con imagen y efectos visuales."""
-        if not target.mano:
-            self.log(f"{target.nombre} no tiene cartas en la mano")
-            self.complete_card_play(carta)
-            return
-        
-        carta_objetivo = target.mano[0]
-        
-        content = BoxLayout(orientation='vertical', spacing=10, padding=20)
-        
-        # Fondo semitransparente
-        with content.canvas.before:
-            Color(0, 0, 0, 0.5)
-            content.rect = Rectangle(size=content.size, pos=content.pos)
-        content.bind(size=lambda instance, value: setattr(content.rect, 'size', value))
-        content.bind(pos=lambda instance, value: setattr(content.rect, 'pos', value))
-        
-        # Imagen de la carta centrada
-        card_image = Image(source=carta_objetivo.image_source, size_hint=(None, None), size=(200, 300), pos_hint={'center_x': 0.5})
-        content.add_widget(card_image)
-        
-        # Solo mostrar el nombre del jugador
-        info_label = Label(text=target.nombre, color=(1, 1, 1, 1), font_size='20sp', bold=True)
-        content.add_widget(info_label)
-        
-        # Botón de cerrar con efectos visuales
-        close_btn = Button(
-            text="Continuar",
-            size_hint=(None, None),
-            size=(200, 50),
-            pos_hint={'center_x': 0.5},
-            background_color=(0.8, 0.2, 0.2, 1),
-            color=(1, 1, 1, 1)
-        )
-        
-        def on_press_effect(instance):
-            instance.background_color = (1, 0.5, 0.5, 1)
-        
-        def on_release_effect(instance):
-            instance.background_color = (0.8, 0.2, 0.2, 1)
-        
-        close_btn.bind(on_press=on_press_effect)
-        close_btn.bind(on_release=on_release_effect)
-        content.add_widget(close_btn)
-        
-        popup = Popup(title=f'Carta de {target.nombre}', content=content, size_hint=(0.8, 0.8), auto_dismiss=False, background_color=(0, 0, 0, 0))
-        
-        def on_close(instance):
-            popup.dismiss()
-            self.log(f"{jugador.nombre} vio la carta de {target.nombre}")
+        def on_close():
             self.manager.current = 'game'
-            self.complete_card_play(carta)
-        
-        close_btn.bind(on_press=on_close)
-        popup.open()
+            self.complete_card_play(resultado.carta)
+
+        popups.abrir(CartaRevelada, objetivo=resultado.objetivo, carta=resultado.revelada, al_cerrar=on_close)
 
     # Nueva función para mostrar el popup de victoria con animaciones
     def show_winner_popup(self, ganador):
         """Muestra una animación con el ganador y un botón para reiniciar la partida."""
-        content = BoxLayout(orientation='vertical', spacing=10, padding=20)
-        
-        # Fondo semitransparente para mejorar visibilidad
-        with content.canvas.before:
-            Color(0.95, 0.9, 0.8, 1)
-            content.rect = Rectangle(size=content.size, pos=content.pos)
-        content.bind(size=lambda instance, value: setattr(content.rect, 'size', value))
-        content.bind(pos=lambda instance, value: setattr(content.rect, 'pos', value))
-        
-        # Animación del nombre del ganador
-        winner_label = Label(text=f"¡{ganador.nombre} ha ganado!", font_size='24sp', bold=True, color=(1, 1, 0, 1))
-        anim = Animation(font_size=30, duration=0.5) + Animation(font_size=24, duration=0.5)
-        anim.repeat = True
-        anim.start(winner_label)
-        content.add_widget(winner_label)
-    
-        # Botón para reiniciar la partida
-        restart_btn = Button(
-            text="Jugar de nuevo",
-            size_hint=(None, None),
-            size=(200, 50),
-            pos_hint={'center_x': 0.5},
-            background_color=(0.2, 0.6, 0.2, 1),
-            color=(1, 1, 1, 1)
-        )
-        
-        def restart_game(instance):
-            popup.dismiss()
-            setup_screen = self.manager.get_screen('setup')
-            setup_screen.build_initial_ui()  # Reiniciar la interfaz de selección de jugadores
-            self.manager.current = 'setup'
-        
-        restart_btn.bind(on_press=restart_game)
-        content.add_widget(restart_btn)
-        
-        popup = Popup(title='¡Victoria!', content=content, size_hint=(0.8, 0.8), auto_dismiss=False, background_color=(0, 0, 0, 0))
-        popup.open()
-
-
-    def show_baron_popup(self, jugador, carta):
-        targets = [j for j in self.partida.jugadores if j != jugador and not j.eliminado and not j.protegido]
-        if not targets:
-            self.log("No hay objetivos disponibles para el Barón.")
-            self.complete_card_play(carta)
-            return
-        
-        content = BoxLayout(orientation='vertical')
-        label = Label(text="Selecciona un jugador para comparar cartas:")
-        content.add_widget(label)
-        
-        # Crear botones para cada jugador que no sea el actual y no esté eliminado o protegido
-        target_buttons = GridLayout(cols=2, spacing=10, padding=10)
-        for target in targets:
-            btn = Button(
-                text=target.nombre,
-                size_hint_y=None,
-                height=40,
-                background_color=(0.6, 0.4, 0.2, 1),
-                color=(1,1,1,1)
-            )
-            def create_callback(t=target, p=popup):
-                def on_press(instance):
-                    p.dismiss()  # Cerrar el popup usando la referencia correcta
-                    self.compare_hands(jugador, t, carta)
-                return on_press
-            btn.bind(on_press=create_callback())
-            target_buttons.add_widget(btn)
-        
-        content.add_widget(target_buttons)
-        
-        # Si no hay objetivos válidos
-        if not target_buttons.children:
-            self.log("No hay objetivos válidos para el Barón")
-            self.card_played = True  # Marcar que se jugó la carta aunque no haya efecto
-            self.complete_card_play(carta)
-            return
-        
-        popup = Popup(
-            title='Efecto del Barón',
-            content=content,
-            size_hint=(0.8, 0.8),
-            auto_dismiss=False
-        )
-        popup.open()
-
-    def baron_selected(self, jugador, target, carta):
-        if target.mano:
-            carta_jugador = [c for c in jugador.mano if c != carta][0]  # La otra carta en la mano
-            carta_objetivo = target.mano[0]
-            self.log(f"Comparando cartas: {jugador.nombre}({carta_jugador.nombre}) vs {target.nombre}({carta_objetivo.nombre})")
-            if carta_jugador.valor > carta_objetivo.valor:
-                self.log(f"{target.nombre} es eliminado")
-                target.eliminado = True
-            elif carta_jugador.valor < carta_objetivo.valor:
-                self.log(f"{jugador.nombre} es eliminado")
-                jugador.eliminado = True
-            else:
-                self.log("Empate, nadie es eliminado")
-        else:
-            self.log(f"{target.nombre} no tiene cartas para comparar")
-        self.card_played = True
-        self.complete_card_play(carta)
-
-    def show_principe_popup(self, jugador, carta):
-        """
-        Muestra el popup para seleccionar el objetivo del Príncipe
-        """
-        # Obtener todos los jugadores no eliminados como objetivos válidos (incluyendo al jugador actual)
-        targets = [j for j in self.partida.jugadores if not j.eliminado and not j.protegido]
-        
-        if not targets:
-            self.log("No hay objetivos válidos para el Príncipe")
-            self.card_played = True
-            self.next_button.disabled = False
-            self.complete_card_play(carta)
-            return
-            
-        content = BoxLayout(orientation='vertical', spacing=10, padding=10)
-        content.add_widget(Label(text="Selecciona un jugador para descartar su carta:", font_size='18sp'))
-        
-        # Layout para los botones
-        buttons_layout = GridLayout(cols=2, spacing=10, padding=10)
-
-        # Crear el popup antes de los botones para poder referenciarlo
-        principe_popup = Popup(
-            title='Efecto del Príncipe',
-            content=content,
-            size_hint=(0.8, 0.8),
-            auto_dismiss=False
-        )
-
-        for target in targets:
-            btn = Button(
-                text=target.nombre,
-                size_hint_y=None,
-                height=40,
-                background_color=(0.6, 0.4, 0.2, 1),
-                color=(1,1,1,1)
-            )
-            def create_callback(t=target, p=principe_popup):
-                def on_press(instance):
-                    p.dismiss()  # Cerrar el popup usando la referencia correcta
-                    self.descartar_y_robar(t, carta)
-                return on_press
-            btn.bind(on_press=create_callback())
-            buttons_layout.add_widget(btn)
-        
-        content.add_widget(buttons_layout)
-        principe_popup.open()
-
-    def descartar_y_robar(self, target, carta):
-        """
-        Descarta la carta del objetivo y le hace robar una nueva
-        """
-        if not target.mano:
-            self.log(f"{target.nombre} no tiene cartas para descartar")
-            self.complete_card_play(carta)
-            return
-            
-        # Obtener la carta a descartar
-        carta_descartada = target.mano[0]
-        
-        # Si descarta la Princesa, el jugador es eliminado
-        if carta_descartada.nombre == "Princesa":
-            self.log(f"{target.nombre} descartó la Princesa y queda eliminado")
-            target.eliminado = True
-            target.mano = []
-            self.complete_card_play(carta)
-            return
-            
-        # Descartar la carta actual
-        target.mano = []
-        self.discard_pile.update_card(carta_descartada)
-        
-        # Robar una nueva carta si quedan en el mazo
-        if self.partida.deck:
-            nueva_carta = self.partida.deck.pop(0)
-            target.mano = [nueva_carta]
-            self.log(f"{target.nombre} descartó {carta_descartada.nombre} y robó una nueva carta")
-        else:
-            self.log(f"{target.nombre} descartó {carta_descartada.nombre} pero no quedan cartas para robar")
-            
-        self.complete_card_play(carta)
-
-    def show_rey_popup(self, jugador, carta):
-        targets = [j for j in self.partida.jugadores if j != jugador and not j.eliminado and not j.protegido]
-        if not targets:
-            self.log("No hay objetivos disponibles para el Rey.")
-            self.complete_card_play(carta)
-            return
-        content = BoxLayout(orientation='vertical', spacing=10, padding=10)
-        content.add_widget(Label(text="Selecciona un jugador para intercambiar cartas:", font_size='18sp'))
-        
-        # Layout para los botones
-        target_buttons = GridLayout(cols=2, spacing=10, padding=10)
+        popups.abrir(Victoria, ganador=ganador, al_reiniciar=self.restart_game)
 
-        # Crear el popup antes de los botones para poder referenciarlo
-        rey_popup = Popup(
-            title='Efecto del Rey',
-            content=content,
-            size_hint=(0.8, 0.8),
-            auto_dismiss=False
-        )
-        
-        for target in targets:
-            btn = Button(
-                text=target.nombre,
-                size_hint_y=None,
-                height=40,
-                background_color=(0.6, 0.4, 0.2, 1),
-                color=(1,1,1,1)
-            )
-            def create_callback(t=target, p=rey_popup):
-                def on_press(instance):
-                    p.dismiss()  # Cerrar el popup usando la referencia correcta
-                    self.intercambiar_cartas(jugador, t, carta)
-                return on_press
-            btn.bind(on_press=create_callback())
-            target_buttons.add_widget(btn)
-        
-        content.add_widget(target_buttons)
-        rey_popup.open()
+    def restart_game(self):
+        setup_screen = self.manager.get_screen('setup')
+        setup_screen.build_initial_ui()  # Reiniciar la interfaz de selección de jugadores
+        self.manager.current = 'setup'
 
-    def intercambiar_cartas(self, jugador, target, carta):
+    def compare_hands(self, resultado):
         """
-        Intercambia las cartas entre dos jugadores
+        Muestra el resultado de la comparación de cartas del Barón
         """
-        if not target.mano:
-            self.log(f"{target.nombre} no tiene cartas para intercambiar")
-            self.complete_card_play(carta)
-            return
-            
-        # Obtener las cartas a intercambiar (excluyendo la carta Rey que se está jugando)
-        carta_jugador = [c for c in jugador.mano if c != carta][0] if jugador.mano else None
-        carta_target = target.mano[0] if target.mano else None
-        
-        if not carta_jugador or not carta_target:
-            self.log("No hay suficientes cartas para intercambiar")
-            self.complete_card_play(carta)
-            return
-            
-        # Realizar el intercambio
-        jugador.mano = [carta_target]
-        target.mano = [carta_jugador]
-        
-        self.log(f"{jugador.nombre} intercambió cartas con {target.nombre}")
-        self.complete_card_play(carta)
-
-    def show_baron_screen(self, jugador, carta):
-        content = BoxLayout(orientation='vertical')
-        label = Label(text="Selecciona un jugador para comparar manos:")
-        content.add_widget(label)
-        
-        # Crear botones para cada jugador que no sea el actual y no esté eliminado o protegido
-        target_buttons = GridLayout(cols=2, spacing=10, padding=10)
-        for target in self.partida.jugadores:
-            if target != jugador and not target.eliminado and not target.protegido:
-                btn = Button(
-                    text=target.nombre,
-                    size_hint_y=None,
-                    height=40,
-                    background_color=(0.6, 0.4, 0.2, 1),
-                    color=(1,1,1,1)
-                )
-                def create_callback(t=target, p=popup):
-                    def on_press(instance):
-                        p.dismiss()  # Cerrar el popup usando la referencia correcta
-                        self.on_target_selected(jugador, carta, t)
-                    return on_press
-                btn.bind(on_press=create_callback())
-                target_buttons.add_widget(btn)
-        
-        content.add_widget(target_buttons)
-        
-        # Si no hay objetivos válidos
-        if not target_buttons.children:
-            self.log("No hay objetivos válidos para el Barón")
-            self.card_played = True  # Marcar que se jugó la carta aunque no haya efecto
-            self.complete_card_play(carta)
-            return
-        
-        popup = Popup(
-            title='Efecto del Barón',
-            content=content,
-            size_hint=(0.8, 0.8),
-            auto_dismiss=False
-        )
-        popup.open()
+        popups.abrir(Comparacion, resultado=resultado, al_cerrar=lambda: self.complete_card_play(resultado.carta))
 
-    def compare_hands(self, jugador, target, carta):
+    def remove_widget_after_anim(self, widget):
         """
-        Compara las cartas de dos jugadores para el efecto del Barón
+        Callback para devolver al pool un widget después de que termine su animación
         """
-        # Obtener las cartas de ambos jugadores
-        carta_jugador = jugador.mano[0] if jugador.mano else None
-        carta_target = target.mano[0] if target.mano else None
-        
-        if not carta_jugador or not carta_target:
-            self.log("Uno de los jugadores no tiene cartas para comparar")
-            return
-        
-        # Mostrar las cartas
-        content = BoxLayout(orientation='vertical', spacing=10, padding=10)
-        content.add_widget(Label(text=f"Carta de {jugador.nombre}: {carta_jugador.nombre} ({carta_jugador.valor})", font_size='18sp'))
-        content.add_widget(Label(text=f"Carta de {target.nombre}: {carta_target.nombre} ({carta_target.valor})", font_size='18sp'))
-        
-        # Determinar el ganador
-        if carta_jugador.valor > carta_target.valor:
-            content.add_widget(Label(text=f"{target.nombre} es eliminado del juego", font_size='20sp', color=(1, 0, 0, 1)))
-            target.eliminado = True
-        elif carta_jugador.valor < carta_target.valor:
-            content.add_widget(Label(text=f"{jugador.nombre} es eliminado del juego", font_size='20sp', color=(1, 0, 0, 1)))
-            jugador.eliminado = True
-        else:
-            content.add_widget(Label(text="¡Empate! Nadie es eliminado", font_size='20sp'))
-        
-        # Crear y mostrar el popup
-        popup = Popup(
-            title='Resultado de la comparación',
-            content=content,
-            size_hint=(0.8, 0.4),
-            auto_dismiss=True
-        )
-        
-        # Botón para cerrar
-        close_button = Button(
-            text="Cerrar",
-            size_hint=(None, None),
-            size=(100, 50),
-            pos_hint={'center_x': 0.5}
-        )
-        
-        def on_close(instance):
-            popup.dismiss()
-            self.card_played = True
-            self.next_button.disabled = False
-            self.complete_card_play(carta)
-        
-        close_button.bind(on_press=on_close)
-        content.add_widget(close_button)
-        
-        popup.open()
-
-    def remove_widget_after_anim(self, animation, widget):
-        """
-        Callback para remover un widget después de que termine su animación
-        """
-        if widget in self.hand_layout.children:
-            self.hand_layout.remove_widget(widget)
+        self.release_card_widget(widget)
 
     def play_card(self, carta):
         """
@@ -1306,59 +725,45 @@ class GameScreen(Screen):
             return
         
         self.card_played = True
-        jugador = self.partida.current_player
-        
-        # Remover la carta de la mano del jugador
-        if carta in jugador.mano:
-            jugador.mano.remove(carta)
+        self.next_button.disabled = True
+        self.sonar('jugada')
         
         # Animar la carta hacia el mazo de descartes
         card_widget = None
-        for widget in self.hand_layout.children:
-            if isinstance(widget, CardWidget) and widget.carta == carta:
+        for widget in self.hand_widgets:
+            if widget.carta == carta:
                 card_widget = widget
                 break
         
         if card_widget:
-            # Obtener la posición del mazo de descartes
-            discard_pos = self.discard_pile.pos
-            
-            # Crear la animación
-            anim = Animation(opacity=0, duration=0.3)
-            anim.bind(on_complete=self.remove_widget_after_anim)
-            anim.start(card_widget)
-        
-        # Agregar la carta al mazo de descartes
-        self.partida.discard_pile.append(carta)
-        self.discard_pile.update_card(carta)
-        
-        # Manejar el efecto de la carta
-        if carta.nombre in ["Guardia", "Sacerdote", "Barón", "Príncipe", "Rey"]:
+            # Deja de ser un hueco de la mano; vuelve al pool al acabar la animación
+            self.hand_widgets.remove(card_widget)
+            # Se desvanece y encoge (opacidad y escala en el canvas, sin recolocar la mano)
+            animaciones.animar(card_widget, 0.3, opacity=0, escala=0.8, al_terminar=self.remove_widget_after_anim)
+        
+        # Manejar el efecto de la carta según lo que necesite
+        efecto = EFECTOS[carta.id]
+        if efecto.requiere_adivinanza:
+            self.show_guardia_screen(self.partida.current_player, carta)
+        elif efecto.requiere_objetivo:
             self.elegir_jugador(carta)
-        elif carta.nombre == "Chanciller":
-            chanciller_screen = self.manager.get_screen('chanciller')
-            chanciller_screen.set_context(self.partida.current_player, carta, self)
-            self.manager.current = 'chanciller'
         else:
-            self.complete_card_play(carta)
+            self.resolver_jugada(carta)
 
-    def confirm_play_card(self, carta, popup):
+    def show_condesa_rule(self):
+        aviso("Regla de la Condesa", "Si tienes la Condesa y el Rey o el Príncipe,\ndebes jugar la Condesa.",
+              tamano=(400, 200))
+
+    def confirm_play_card(self, carta, dialogo):
         """
         Confirma jugar una carta después de ver sus detalles
         """
         # Verificar la regla de la Condesa
-        tiene_condesa = any(carta.nombre == "Condesa" for carta in self.partida.current_player.mano)
-        tiene_rey_o_principe = any(carta.nombre in ["Rey", "Príncipe"] for carta in self.partida.current_player.mano)
-        
-        if tiene_condesa and tiene_rey_o_principe and carta.nombre != "Condesa":
-            error_popup = Popup(title="Regla de la Condesa",
-                            content=Label(text="Si tienes la Condesa y el Rey o el Príncipe,\ndebes jugar la Condesa.",
-                                        color=(0.2,0.1,0,1)),
-                            size_hint=(None, None), size=(400, 200))
-            error_popup.open()
+        if not self.partida.puede_jugar(self.partida.current_player, carta):
+            self.show_condesa_rule()
             return
 
-        popup.dismiss()
+        dialogo.cerrar()
         self.play_card(carta)
 
     def show_card_details(self, carta):
@@ -1367,80 +772,15 @@ class GameScreen(Screen):
         """
         # Si ya se ha jugado una carta, no permitir jugar otra
         if self.card_played:
-            popup = Popup(title='Aviso',
-                        content=Label(text='Ya has jugado una carta.',
-                                    color=(0.2,0.1,0,1)),
-                        size_hint=(None, None), size=(400, 200))
-            popup.open()
+            aviso('Aviso', 'Ya has jugado una carta.', tamano=(400, 200))
             return
 
         # Verificar la regla de la Condesa
-        tiene_condesa = any(carta.nombre == "Condesa" for carta in self.partida.current_player.mano)
-        tiene_rey_o_principe = any(carta.nombre in ["Rey", "Príncipe"] for carta in self.partida.current_player.mano)
-        
-        if tiene_condesa and tiene_rey_o_principe and carta.nombre != "Condesa":
-            popup = Popup(title="Regla de la Condesa",
-                        content=Label(text="Si tienes la Condesa y el Rey o el Príncipe,\ndebes jugar la Condesa.",
-                                    color=(0.2,0.1,0,1)),
-                        size_hint=(None, None), size=(400, 200))
-            popup.open()
+        if not self.partida.puede_jugar(self.partida.current_player, carta):
+            self.show_condesa_rule()
             return
 
-        content = BoxLayout(orientation='vertical', spacing=5, padding=5)
-        
-        # Layout principal
-        card_layout = BoxLayout(orientation='vertical', size_hint=(1, 0.7))
-        card_image = Image(
-            source=carta.image_source,
-            size_hint=(None, None),
-            size=(180, 270),
-            pos_hint={'center_x': 0.5, 'center_y': 0.5}
-        )
-        card_layout.add_widget(card_image)
-        content.add_widget(card_layout)
-        
-        # Solo la descripción
-        content.add_widget(Label(
-            text=carta.descripcion,
-            font_size='16sp',
-            color=(0.2,0.1,0,1),
-            size_hint=(1, 0.2)
-        ))
-        
-        # Layout para botones
-        btn_layout = BoxLayout(orientation='horizontal', spacing=10, size_hint_y=None, height=40)
-        
-        # Botón de retroceso
-        back_btn = Button(
-            text="Volver",
-            background_color=(0.8, 0.3, 0.2, 1),
-            color=(1,1,1,1)
-        )
-        btn_layout.add_widget(back_btn)
-        
-        # Botón de jugar
-        play_btn = Button(
-            text="Jugar",
-            background_color=(0.6, 0.4, 0.2, 1),
-            color=(1,1,1,1)
-        )
-        btn_layout.add_widget(play_btn)
-        
-        content.add_widget(btn_layout)
-        
-        popup = Popup(
-            title="Detalles de la carta",
-            content=content,
-            size_hint=(None, None),
-            size=(300, 450),
-            auto_dismiss=False
-        )
-        
-        # Vincular botones
-        back_btn.bind(on_press=popup.dismiss)
-        play_btn.bind(on_press=lambda inst: self.confirm_play_card(carta, popup))
-        
-        popup.open()
+        popups.abrir(DetallesCarta, carta=carta, al_jugar=self.confirm_play_card)
 
     def complete_card_play(self, carta):
         """
@@ -1449,29 +789,69 @@ class GameScreen(Screen):
         # Asegurarse de que la carta se marque como jugada
         self.card_played = True
         
-        # Si es la princesa, el jugador queda eliminado
-        if carta.nombre == "Princesa":
-            jugador = self.partida.current_player
-            jugador.eliminado = True
-            self.log(f"{jugador.nombre} jugó la Princesa y queda eliminado")
-            
-            # Descartar las cartas restantes del jugador eliminado
-            for carta_restante in jugador.mano:
-                self.partida.discard_pile.append(carta_restante)
-                self.discard_pile.update_card(carta_restante)
-            jugador.mano.clear()
-        
         # Habilitar el botón de siguiente turno
         self.next_button.disabled = False
+
+        # Sonido de las eliminaciones de la jugada (la Princesa tiene el suyo)
+        resultado, self.ultimo_resultado = self.ultimo_resultado, None
+        if resultado is not None and resultado.eliminados:
+            princesa = any(c is not None and c.id == PRINCESA for c in (resultado.carta, resultado.descartada))
+            self.sonar('princesa' if princesa else 'eliminacion')
         
         # Actualizar la interfaz
         self.update_ui()
         
         # Verificar si hay ganador
         ganador = self.partida.determinar_ganador()
+        self.anotar(ganador=ganador)
         if ganador:
             self.show_winner_popup(ganador)
 
+# -----------------------------
+# Historial de la partida
+# -----------------------------
+COLORES_EVENTO = {
+    eventos.TURNO: (0.4, 0.2, 0, 1),
+    eventos.ELIMINACION: (0.8, 0, 0, 1),
+}
+
+
+class LogView(RecycleView):
+    """
+    Muestra un RegistroEventos con un RecycleView: solo se crean y colocan las filas
+    visibles, así que el historial puede ser largo sin coste de dibujo.
+    """
+    def __init__(self, registro, **kwargs):
+        super().__init__(**kwargs)
+        self.registro = registro
+        self.viewclass = 'Label'
+        layout = RecycleBoxLayout(orientation='vertical', default_size=(None, dp(26)),
+                                  default_size_hint=(1, None), size_hint_y=None)
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        # Los eventos de un mismo frame se vuelcan juntos
+        self._pendientes = []
+        self._volcar = Clock.create_trigger(self._volcar_pendientes)
+        registro.suscribir(self._al_registrar)
+
+    def _al_registrar(self, evento):
+        self._pendientes.append(evento)
+        self._volcar()
+
+    def _volcar_pendientes(self, dt):
+        filas = [{'text': e.texto, 'font_size': '18sp', 'color': COLORES_EVENTO.get(e.tipo, (0.2, 0.1, 0, 1)),
+                  'bold': e.tipo == eventos.TURNO} for e in self._pendientes]
+        self._pendientes = []
+        data = self.data + filas
+        # Mismo límite que el búfer del registro
+        self.data = data[-self.registro.capacidad:]
+        self.scroll_y = 0  # Seguir el último mensaje
+
+    def reset(self):
+        self._pendientes = []
+        self.data = []
+
+
 # -----------------------------
 # Widget para el mazo de descartes
 # -----------------------------
@@ -1485,8 +865,7 @@ class DiscardPile(BoxLayout):
         self.spacing = 5
         
         # Crear un widget de imagen con una imagen por defecto
-        self.image = Image(source='images/default_card.png', size_hint=(1, 1))
-        self.image.bind(on_error=self.on_image_error)
+        self.image = imagen(IMAGEN_DEFECTO, size_hint=(1, 1))
         self.add_widget(self.image)
         
         # Añadir una etiqueta para el nombre de la carta
@@ -1497,16 +876,13 @@ class DiscardPile(BoxLayout):
         )
         self.add_widget(self.label)
 
-    def on_image_error(self, instance, *args):
-        # Si la imagen no se puede cargar, usar la imagen por defecto
-        instance.source = 'images/default_card.png'
-        
     def update_card(self, carta):
+        # Las imágenes que no existen ya se resuelven a la carta por defecto en la caché
         if carta:
-            self.image.source = carta.image_source
+            self.image.texture = textura(carta.image_source)
             self.label.text = carta.nombre
         else:
-            self.image.source = 'images/default_card.png'
+            self.image.texture = textura(IMAGEN_DEFECTO)
             self.label.text = ''
 
 # Mazo que se baraja y del que se reparten las cartas
@@ -1521,8 +897,7 @@ class DeckWidget(ButtonBehavior, BoxLayout):
         self.spacing = 5
         
         # Usar la imagen del dorso de la carta
-        self.image = Image(source='images/deck_back.png', size_hint=(1, 1))
-        self.image.bind(on_error=self.on_image_error)
+        self.image = imagen(IMAGEN_DORSO, size_hint=(1, 1))
         self.add_widget(self.image)
         
         # Añadir una etiqueta para indicar que es el mazo
@@ -1533,10 +908,6 @@ class DeckWidget(ButtonBehavior, BoxLayout):
         )
         self.add_widget(self.label)
 
-    def on_image_error(self, instance, *args):
-        # Si la imagen no se puede cargar, usar la imagen por defecto
-        instance.source = 'images/default_card.png'
-
     def on_press(self):
         if self.callback:
             self.callback()
\ No newline at end of file
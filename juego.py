@@ -1,6 +1,6 @@
 # juego.py
 
-from cartas import crear_baraja, barajar
+from cartas import crear_baraja, barajar, Mazo
 import sys
 
 class Jugador:
@@ -41,7 +41,7 @@ def repartir_cartas(jugadores, baraja, numero_cartas=1):
     """
     Reparte un número de cartas a cada jugador.
     :param jugadores: Lista de objetos Jugador.
-    :param baraja: Lista de objetos Carta (baraja ya barajada).
+    :param baraja: Mazo ya barajado.
     :param numero_cartas: Número de cartas a repartir a cada jugador (por defecto 1).
     """
     for jugador in jugadores:
@@ -49,7 +49,7 @@ def repartir_cartas(jugadores, baraja, numero_cartas=1):
             if not baraja:
                 print("La baraja se ha quedado sin cartas.")
                 sys.exit(1)
-            carta = baraja.pop(0)  # Se saca la carta de la parte superior
+            carta = baraja.robar()  # Se saca la carta de la parte superior
             jugador.recibir_carta(carta)
 
 def main():
@@ -66,8 +66,7 @@ def main():
     jugadores = crear_jugadores(numero_jugadores)
 
     # Crear y barajar la baraja
-    baraja = crear_baraja()
-    barajar(baraja)
+    baraja = Mazo(barajar(crear_baraja()))
 
     # Repartir 1 carta a cada jugador
     repartir_cartas(jugadores, baraja, numero_cartas=1)
@@ -1,11 +1,97 @@
 # jugadores.py
 
+def bit(id_carta):
+    """Bit que representa a una carta en la máscara de una mano."""
+    return 1 << id_carta
+
+
+class Mano(list):
+    """
+    Lista de cartas que mantiene una máscara de bits con los ids que contiene,
+    para que las comprobaciones de reglas (Condesa, Princesa...) sean O(1).
+    """
+    __slots__ = ("mascara",)
+
+    def __init__(self, cartas=()):
+        super().__init__(cartas)
+        self._recalcular()
+
+    def _recalcular(self):
+        mascara = 0
+        for carta in self:
+            mascara |= 1 << carta.id
+        self.mascara = mascara
+
+    def tiene(self, id_carta):
+        return bool(self.mascara >> id_carta & 1)
+
+    def tiene_alguna(self, mascara):
+        return bool(self.mascara & mascara)
+
+    def __contains__(self, carta):
+        # Las cartas son instancias únicas del catálogo: basta con mirar su bit
+        return bool(self.mascara >> carta.id & 1)
+
+    def copy(self):
+        return Mano(self)
+
+    def __iadd__(self, cartas):
+        self.extend(cartas)
+        return self
+
+    def append(self, carta):
+        super().append(carta)
+        self.mascara |= 1 << carta.id
+
+    def extend(self, cartas):
+        super().extend(cartas)
+        self._recalcular()
+
+    def insert(self, indice, carta):
+        super().insert(indice, carta)
+        self.mascara |= 1 << carta.id
+
+    def remove(self, carta):
+        super().remove(carta)
+        self._recalcular()
+
+    def pop(self, indice=-1):
+        carta = super().pop(indice)
+        self._recalcular()
+        return carta
+
+    def clear(self):
+        super().clear()
+        self.mascara = 0
+
+    def __setitem__(self, indice, valor):
+        super().__setitem__(indice, valor)
+        self._recalcular()
+
+    def __delitem__(self, indice):
+        super().__delitem__(indice)
+        self._recalcular()
+
+
 class Jugador:
-    def __init__(self, nombre):
+    __slots__ = ("nombre", "mano", "eliminado", "protegido", "es_bot")
+
+    def __init__(self, nombre, es_bot=False):
         self.nombre = nombre
-        self.mano = []      # Lista de cartas
+        self.mano = Mano()      # Lista de cartas
         self.eliminado = False
         self.protegido = False
+        self.es_bot = es_bot    # Lo controla la IA (bot.BotISMCTS)
 
     def mostrar_mano(self):
         return ', '.join(str(carta) for carta in self.mano)
+
+    def copiar(self):
+        """Copia el estado del jugador; las cartas son inmutables y se comparten."""
+        copia = Jugador.__new__(Jugador)
+        copia.nombre = self.nombre
+        copia.mano = Mano(self.mano)
+        copia.eliminado = self.eliminado
+        copia.protegido = self.protegido
+        copia.es_bot = self.es_bot
+        return copia
@@ -1,31 +1,155 @@
+import time
+INICIO = time.perf_counter()  # Antes de importar Kivy, para medir el arranque completo
+
+import importlib
+import os
 from musica import MusicPlayer
+from mezclador import Mezclador
 from kivy.app import App
+from kivy.clock import Clock
 from kivy.uix.screenmanager import ScreenManager
 from kivy.uix.floatlayout import FloatLayout
-from interfaz import SetupScreen, GameScreen, GuardiaScreen, ChancillerScreen
+from configuracion import SetupScreen
+import texturas
+import perfil
+from kivy.logger import Logger
+
+# Tiempo máximo desde que arranca el proceso hasta el primer frame, en milisegundos
+PRESUPUESTO_ARRANQUE_MS = 1500
+
+# Pantallas que se construyen la primera vez que se navega a ellas: nombre -> (módulo, clase)
+PANTALLAS_DIFERIDAS = {
+    'game': ('interfaz', 'GameScreen'),
+    'guardia': ('interfaz', 'GuardiaScreen'),
+    'chanciller': ('interfaz', 'ChancillerScreen'),
+}
+
+
+class GestorPantallas(ScreenManager):
+    """
+    ScreenManager que crea las pantallas diferidas al pedirlas por primera vez
+    (get_screen, o al cambiar `current`), importando su módulo en ese momento.
+    :param diferidas: Diccionario nombre -> (módulo, clase).
+    """
+
+    def __init__(self, diferidas=None, **kwargs):
+        super().__init__(**kwargs)
+        self.diferidas = dict(diferidas or {})
+        self.al_importar = []  # callback(clase) para cada pantalla diferida, antes de construirla
+
+    def get_screen(self, name):
+        if name in self.diferidas and not self.has_screen(name):
+            self.crear(name)
+        return super().get_screen(name)
+
+    def crear(self, name):
+        modulo, nombre_clase = self.diferidas.pop(name)
+        inicio = time.perf_counter()
+        clase = getattr(importlib.import_module(modulo), nombre_clase)
+        for callback in self.al_importar:
+            callback(clase)
+        screen = clase(name=name)
+        self.add_widget(screen)
+        Logger.info(f"Pantallas: '{name}' creada en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        return screen
+
+    def precargar(self, *args):
+        """Construye una pantalla pendiente por frame mientras la interfaz está ociosa."""
+        if self.diferidas:
+            self.crear(next(iter(self.diferidas)))
+            Clock.schedule_once(self.precargar)
+
 
 class CardGameApp(App):
     def build(self):
+        inicio_build = time.perf_counter()
         from kivy.core.window import Window
         Window.clearcolor = (0.95, 0.9, 0.8, 1)  # Color pergamino
 
-        # Iniciar reproductor de música
+        # Decodificar las imágenes de las cartas en segundo plano mientras se configura la partida
+        texturas.precargar()
+
+        # Iniciar reproductor de música (el archivo se carga en otro hilo)
         self.music_player = MusicPlayer()
         self.music_player.play_music("assets/music/love_letters_theme.mp3")  # Ajusta la ruta
+        # Efectos de sonido: los clips se cargan ya, en el mismo hilo que la música
+        self.mezclador = Mezclador(self.music_player.audio)
 
-        # Crear el gestor de pantallas
-        sm = ScreenManager()
+        # Crear el gestor de pantallas: solo la de configuración se construye al arrancar
+        sm = GestorPantallas(PANTALLAS_DIFERIDAS)
         sm.add_widget(SetupScreen(name='setup'))
-        sm.add_widget(GameScreen(name='game'))
-        sm.add_widget(GuardiaScreen(name='guardia'))
-        sm.add_widget(ChancillerScreen(name='chanciller'))
 
         # Agregar el botón de volumen en la capa superior
         root_layout = FloatLayout()
         root_layout.add_widget(sm)
         root_layout.add_widget(self.music_player.create_volume_button())  # Agrega el botón mejorado
 
+        # Instrumentación opcional (CHANCILLER_PERFIL=1)
+        self.perfilador = None
+        if perfil.activado():
+            self.perfilador = perfil.Perfilador()
+            self.perfilador.iniciar(sm, root_layout)
+
+        self.diario = None  # Diario de la partida en curso, se abre tras el primer frame
+        self.screen_manager = sm
+        self.tiempos_arranque = {'imports': (inicio_build - INICIO) * 1000,
+                                 'build': (time.perf_counter() - inicio_build) * 1000}
         return root_layout  # Retorna el layout con el botón agregado
 
+    def on_start(self):
+        # El primer callback programado se ejecuta en el primer frame
+        Clock.schedule_once(self.primer_frame)
+
+    def primer_frame(self, dt):
+        total = (time.perf_counter() - INICIO) * 1000
+        mensaje = (f"Arranque: primer frame a los {total:.0f} ms "
+                   f"(imports {self.tiempos_arranque['imports']:.0f} ms, build {self.tiempos_arranque['build']:.0f} ms, "
+                   f"presupuesto {PRESUPUESTO_ARRANQUE_MS} ms)")
+        if total > PRESUPUESTO_ARRANQUE_MS:
+            Logger.warning(mensaje)
+        else:
+            Logger.info(mensaje)
+        self.recuperar_partida()
+        # Con la configuración ya en pantalla, construir el resto en frames ociosos
+        Clock.schedule_once(self.screen_manager.precargar, 0.5)
+
+    def recuperar_partida(self):
+        """
+        Abre el diario de la partida en curso y, si la app se cerró a mitad de una
+        partida, vuelve a ella.
+        """
+        inicio = time.perf_counter()
+        from diario import Diario, MESA_LOCAL
+        try:
+            self.diario = Diario(os.path.join(self.user_data_dir, 'diario'))
+            partida = self.diario.abrir().get(MESA_LOCAL)
+        except OSError as error:
+            Logger.warning(f"Diario: no disponible ({error})")
+            self.diario = None
+            return
+        if partida is None:
+            return
+        game_screen = self.screen_manager.get_screen('game')
+        game_screen.reanudar(partida[0])
+        self.screen_manager.current = 'game'
+        Logger.info(f"Diario: partida recuperada en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    def on_stop(self):
+        # Cerrar los procesos de búsqueda del bot (si llegó a crearse la pantalla de juego)
+        if self.screen_manager.has_screen('game'):
+            self.screen_manager.get_screen('game').cerrar_bot()
+        # Detener la música y terminar el hilo de carga de audio
+        self.mezclador.registrar_informe()
+        self.mezclador.detener()
+        self.music_player.audio.cerrar()
+        if self.diario is not None:
+            self.diario.cerrar()
+        import popups
+        informe = popups.GESTOR.informe()
+        if informe:
+            Logger.info("Popups:\n" + informe)
+        if self.perfilador:
+            Logger.info(f"Perfil: traza guardada en {self.perfilador.exportar()}")
+
 if __name__ == '__main__':
     CardGameApp().run()
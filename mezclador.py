@@ -0,0 +1,165 @@
+# mezclador.py
+# Mezclador de efectos de sonido de la partida (robar, jugar, eliminación, Princesa).
+# Al arrancar se cargan en el hilo del servicio de audio unas pocas copias de cada
+# clip, de modo que disparar un efecto solo reinicia un Sound ya decodificado. Como
+# mucho suenan `voces` efectos a la vez: si no queda voz libre se roba la de menor
+# prioridad (y, a igual prioridad, la más antigua). Mientras suena algún efecto la
+# música se atenúa.
+#
+# Se mide la latencia de cada disparo, desde la llamada hasta que el proveedor de
+# audio informa de que el clip avanza (get_pos() > 0), no solo hasta que vuelve
+# sound.play(). La posición se consulta una vez por frame, así que la resolución es
+# de un frame. Con proveedores que no informan de la posición el disparo no se mide
+# (Mezclador.informe() dice cuántos).
+import time
+from collections import deque
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+EFECTOS = {
+    'robo': 'assets/sfx/robo.wav',
+    'jugada': 'assets/sfx/jugada.wav',
+    'eliminacion': 'assets/sfx/eliminacion.wav',
+    'princesa': 'assets/sfx/princesa.wav',
+}
+# Al quedarse sin voces se roba antes la de menor prioridad
+PRIORIDADES = {'robo': 0, 'jugada': 1, 'eliminacion': 2, 'princesa': 3}
+VOCES = 6          # Efectos que pueden sonar a la vez
+COPIAS = 2         # Instancias cargadas de cada clip (un Sound no se solapa consigo mismo)
+ATENUACION = 0.4   # Volumen relativo de la música mientras suenan efectos
+MUESTRAS_LATENCIA = 500
+LIMITE_MEDIDA = 1.0  # Segundos tras los que se deja de esperar a que el clip avance
+
+
+class Voz:
+    __slots__ = ("nombre", "sound", "prioridad", "inicio")
+
+    def __init__(self, nombre, sound, prioridad, inicio):
+        self.nombre = nombre
+        self.sound = sound
+        self.prioridad = prioridad
+        self.inicio = inicio
+
+
+class Mezclador:
+    """
+    :param audio: ServicioAudio que carga los clips y cuya música se atenúa.
+    :param efectos: Diccionario nombre -> ruta del clip.
+    :param voces: Número máximo de efectos sonando a la vez.
+    :param copias: Instancias precargadas de cada clip.
+    :param atenuacion: Factor de volumen de la música mientras suena algún efecto.
+    """
+
+    def __init__(self, audio, efectos=EFECTOS, voces=VOCES, copias=COPIAS, atenuacion=ATENUACION):
+        self.audio = audio
+        self.max_voces = voces
+        self.atenuacion = atenuacion
+        self._clips = {nombre: [] for nombre in efectos}  # nombre -> Sounds ya cargados
+        self._voces = []  # Voces sonando, de la más antigua a la más reciente
+
+        self.disparos = 0
+        self.perdidos = 0   # Disparos sin clip cargado o sin voz que robar
+        self.robadas = 0
+        self.sin_medir = 0  # Disparos cuya posición no llegó a avanzar
+        self.latencias = deque(maxlen=MUESTRAS_LATENCIA)  # ms
+        self._midiendo = {}  # Sound -> instante del disparo, hasta que empieza a sonar
+        self._sondeo = None
+
+        for nombre, ruta in efectos.items():
+            for _ in range(copias):
+                audio.cargar(ruta, lambda sound, nombre=nombre: self._agregar(nombre, sound))
+
+    def _agregar(self, nombre, sound):
+        if sound is None:
+            return
+        sound.bind(on_stop=self._al_terminar)
+        self._clips[nombre].append(sound)
+
+    def disparar(self, nombre, volumen=1.0):
+        """Hace sonar el efecto `nombre`. Devuelve False si no se ha podido reproducir."""
+        inicio = time.perf_counter()
+        self.disparos += 1
+        clips = self._clips.get(nombre)
+        if not clips:
+            self.perdidos += 1  # Aún cargándose, o el archivo no existe
+            return False
+        prioridad = PRIORIDADES.get(nombre, 0)
+
+        sound = next((clip for clip in clips if clip.state != 'play'), None)
+        if sound is None:
+            # Todas las copias del clip suenan: se reinicia la más antigua
+            voz = next(voz for voz in self._voces if voz.nombre == nombre)
+            self._robar(voz)
+            sound = voz.sound
+        elif len(self._voces) >= self.max_voces:
+            voz = min(self._voces, key=lambda voz: (voz.prioridad, voz.inicio))
+            if voz.prioridad > prioridad:
+                self.perdidos += 1  # Todo lo que suena es más importante
+                return False
+            self._robar(voz)
+
+        sound.volume = self.audio.volumen * volumen
+        sound.play()
+        self._voces.append(Voz(nombre, sound, prioridad, inicio))
+        self.audio.atenuar(self.atenuacion)
+        self._midiendo[sound] = inicio  # Un disparo nuevo del mismo Sound sustituye al anterior
+        if self._sondeo is None:
+            self._sondeo = Clock.schedule_interval(self._sondear, 0)
+        return True
+
+    def _sondear(self, dt):
+        """Cada frame: anota la latencia de los clips que ya han empezado a avanzar."""
+        ahora = time.perf_counter()
+        for sound, inicio in list(self._midiendo.items()):
+            if sound.state == 'play' and sound.get_pos() > 0:
+                self.latencias.append((ahora - inicio) * 1000)
+            elif sound.state == 'play' and ahora - inicio < LIMITE_MEDIDA:
+                continue
+            elif sound.state == 'play':
+                self.sin_medir += 1
+            # Parado antes de avanzar (robado o clip muy corto): no hay medida
+            del self._midiendo[sound]
+        if not self._midiendo:
+            self._sondeo = None
+            return False
+
+    def _robar(self, voz):
+        # Se quita antes de parar para que _al_terminar no la procese otra vez
+        self._voces.remove(voz)
+        voz.sound.stop()
+        self.robadas += 1
+
+    def _al_terminar(self, sound):
+        self._voces = [voz for voz in self._voces if voz.sound is not sound]
+        if not self._voces:
+            self.audio.atenuar(1.0)
+
+    def detener(self):
+        if self._sondeo is not None:
+            self._sondeo.cancel()
+            self._sondeo = None
+        self._midiendo.clear()
+        for voz in list(self._voces):
+            self._voces.remove(voz)
+            voz.sound.stop()
+        self.audio.atenuar(1.0)
+
+    def informe(self):
+        if not self.disparos:
+            return ""
+        latencias = sorted(self.latencias)
+        texto = f"{self.disparos} disparos, {self.perdidos} perdidos, {self.robadas} voces robadas"
+        if latencias:
+            media = sum(latencias) / len(latencias)
+            p95 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))]
+            texto += (f"; latencia hasta sonar media {media:.1f} ms, p95 {p95:.1f} ms, peor {latencias[-1]:.1f} ms "
+                      f"(resolución de un frame)")
+        if self.sin_medir:
+            texto += f"; {self.sin_medir} sin medir (el proveedor no informa de la posición)"
+        return texto
+
+    def registrar_informe(self):
+        informe = self.informe()
+        if informe:
+            Logger.info(f"Mezclador: {informe}")
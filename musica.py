@@ -1,33 +1,41 @@
-from kivy.core.audio import SoundLoader
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.slider import Slider
 from kivy.uix.label import Label
 from kivy.uix.popup import Popup
 
+from audio import ServicioAudio
+
 class MusicPlayer:
     def __init__(self):
-        self.sound = None
         self.volume = 1.0  # Volumen inicial
+        # La carga, la lista de reproducción y los efectos los gestiona el servicio de audio
+        self.audio = ServicioAudio(volumen=self.volume)
+
+    @property
+    def sound(self):
+        """Pista que suena en este momento (None mientras se carga)."""
+        return self.audio.actual
 
     def play_music(self, file_path, loop=True):
-        """Reproduce música en bucle si loop=True."""
-        self.sound = SoundLoader.load(file_path)
-        if self.sound:
-            self.sound.loop = loop
-            self.sound.volume = self.volume
-            self.sound.play()
+        """
+        Reproduce música en bucle si loop=True. El archivo se carga en el hilo del
+        servicio de audio; la reproducción empieza cuando está listo.
+        """
+        self.audio.reproducir_lista([file_path], bucle=loop)
+
+    def play_playlist(self, file_paths, loop=True):
+        """Reproduce varias pistas seguidas, con fundido cruzado entre ellas."""
+        self.audio.reproducir_lista(file_paths, bucle=loop)
 
     def stop_music(self):
         """Detiene la música si está en reproducción."""
-        if self.sound:
-            self.sound.stop()
+        self.audio.detener()
 
     def set_volume(self, volume, slider=None, label=None, mute_button=None):
         """Ajusta el volumen de la música y actualiza la interfaz."""
         self.volume = volume
-        if self.sound:
-            self.sound.volume = volume
+        self.audio.ajustar_volumen(volume)
 
         # Actualizar la etiqueta con el porcentaje de volumen
         if label:
@@ -1,19 +1,86 @@
 # partida.py
-from cartas import crear_baraja, barajar
+import random
+from collections import namedtuple
+
+from cartas import crear_baraja, barajar, Mazo, REGISTRO, PRINCIPE, REY, CONDESA
+from efectos import TABLA as EFECTOS
+from estado import codificar
+from jugadores import bit
+
+# Una jugada completa: carta jugada, jugador objetivo y carta nombrada con el Guardia
+Jugada = namedtuple("Jugada", "carta objetivo adivinanza")
+
+BIT_CONDESA = bit(CONDESA)
+BIT_REY_O_PRINCIPE = bit(REY) | bit(PRINCIPE)
+
+
+class Resultado:
+    """Describe lo ocurrido al resolver una jugada para que la interfaz lo muestre."""
+
+    def __init__(self, jugador, carta, objetivo=None, adivinanza=None):
+        self.jugador = jugador
+        self.carta = carta
+        self.objetivo = objetivo
+        self.adivinanza = adivinanza  # Id de la carta nombrada con el Guardia
+        self.mensajes = []
+        self.eliminados = []
+        self.revelada = None      # Carta vista con el Sacerdote
+        self.comparacion = None   # (carta del jugador, carta del objetivo) del Barón
+        self.descartada = None    # Carta descartada por efecto del Príncipe
+        self.pendiente = False    # El Chanciller espera a que el jugador elija
+
+    def log(self, mensaje):
+        self.mensajes.append(mensaje)
+
 
 class Partida:
-    def __init__(self, jugadores):
+    """
+    :param jugadores: Jugadores en orden de mesa.
+    :param semilla: Semilla del generador de la partida; sin ella se elige una al azar.
+        Con la misma semilla y el mismo historial la partida se reproduce igual
+        (ver repeticion.py).
+    """
+
+    def __init__(self, jugadores, semilla=None):
         self.jugadores = jugadores
-        self.deck = crear_baraja()
-        barajar(self.deck)
+        self.semilla = random.getrandbits(32) if semilla is None else semilla
+        self.rng = random.Random(self.semilla)
+        self.deck = Mazo(barajar(crear_baraja(), self.rng))
         self.turn = 0
         self.current_player = None
         self.discard_pile = []  # Pila de descarte para las cartas jugadas
+        self.chanciller_pendiente = None  # Carta Chanciller a la espera de resolver
+        self._jugadas = None  # (turno, jugadas legales) calculadas para el turno actual
+        # Acciones jugadas: (id_carta, indice_objetivo, adivinanza) o, al resolver el
+        # Chanciller, (id_conservada, (ids devueltos en orden))
+        self.historial = []
+
+    def copiar(self):
+        """Copia independiente del estado de la partida (las cartas se comparten)."""
+        copia = Partida.__new__(Partida)
+        # El generador se comparte: las simulaciones sobre copias usan el suyo propio
+        copia.semilla = self.semilla
+        copia.rng = self.rng
+        copia.historial = self.historial[:]
+        copia.jugadores = [jugador.copiar() for jugador in self.jugadores]
+        copia.deck = self.deck.copiar()
+        copia.turn = self.turn
+        copia.current_player = None
+        if self.current_player is not None:
+            copia.current_player = copia.jugadores[self.jugadores.index(self.current_player)]
+        copia.discard_pile = self.discard_pile[:]
+        copia.chanciller_pendiente = self.chanciller_pendiente
+        copia._jugadas = None
+        return copia
+
+    def estado(self):
+        """Estado compacto y hashable de la partida (ver estado.codificar)."""
+        return codificar(self)
 
     def repartir_inicial(self):
         for jugador in self.jugadores:
             if self.deck:
-                jugador.mano.append(self.deck.pop(0))
+                jugador.mano.append(self.deck.robar())
 
     def siguiente_jugador(self):
         # Selecciona al siguiente jugador que no esté eliminado
@@ -26,7 +93,7 @@ class Partida:
 
     def robar_carta(self, jugador):
         if self.deck:
-            carta = self.deck.pop(0)
+            carta = self.deck.robar()
             jugador.mano.append(carta)
             return carta
         return None
@@ -34,6 +101,135 @@ class Partida:
     def hay_baraja(self):
         return bool(self.deck)
 
+    def iniciar_turno(self):
+        """Pasa al siguiente jugador activo, le quita la protección y le hace robar."""
+        jugador = self.siguiente_jugador()
+        jugador.protegido = False
+        return jugador, self.robar_carta(jugador)
+
+    # -----------------------------
+    # Reglas
+    # -----------------------------
+    def debe_jugar_condesa(self, jugador):
+        """Regla de la Condesa: con el Rey o el Príncipe en la mano se debe jugar la Condesa."""
+        mascara = jugador.mano.mascara
+        return bool(mascara & BIT_CONDESA and mascara & BIT_REY_O_PRINCIPE)
+
+    def puede_jugar(self, jugador, carta):
+        if not jugador.mano.tiene(carta.id):
+            return False
+        return carta.id == CONDESA or not self.debe_jugar_condesa(jugador)
+
+    def jugadas_legales(self):
+        """
+        Jugadas válidas del jugador actual en este turno. Se calculan una vez por
+        turno y se reutilizan hasta que se juega una carta.
+        """
+        if self._jugadas is not None and self._jugadas[0] == self.turn:
+            return self._jugadas[1]
+        jugador = self.current_player
+        jugadas = []
+        if jugador is not None and self.chanciller_pendiente is None:
+            vistas = 0
+            for carta in jugador.mano:
+                # Dos copias de la misma carta dan las mismas jugadas
+                if vistas & bit(carta.id) or not self.puede_jugar(jugador, carta):
+                    continue
+                vistas |= bit(carta.id)
+                for objetivo, adivinanza in EFECTOS[carta.id].opciones(self, jugador):
+                    jugadas.append(Jugada(carta, objetivo, adivinanza))
+        self._jugadas = (self.turn, jugadas)
+        return jugadas
+
+    def jugar(self, jugada):
+        return self.jugar_carta(jugada.carta, jugada.objetivo, jugada.adivinanza)
+
+    def objetivos_validos(self, carta, jugador=None):
+        """Jugadores que pueden ser objetivo de la carta jugada por `jugador`."""
+        return EFECTOS[carta.id].objetivos(self, jugador or self.current_player)
+
+    def cartas_no_vistas(self, jugador):
+        """
+        Recuento por id de las cartas que `jugador` no puede ver: las manos de los
+        rivales y el mazo. Es la base para determinizar la información oculta.
+        """
+        recuentos = list(REGISTRO.copias)
+        for carta in jugador.mano:
+            recuentos[carta.id] -= 1
+        for carta in self.discard_pile:
+            recuentos[carta.id] -= 1
+        return recuentos
+
+    def eliminar(self, jugador, resultado):
+        """Elimina al jugador y descarta las cartas que le quedaban."""
+        jugador.eliminado = True
+        self.discard_pile.extend(jugador.mano)
+        jugador.mano.clear()
+        resultado.eliminados.append(jugador)
+
+    # -----------------------------
+    # Acciones
+    # -----------------------------
+    def jugar_carta(self, carta, objetivo=None, adivinanza=None):
+        """
+        Juega una carta del jugador actual y resuelve su efecto.
+        :param carta: Carta de la mano del jugador actual.
+        :param objetivo: Jugador objetivo, si la carta lo necesita y hay alguno válido.
+        :param adivinanza: Id de la carta que se intenta adivinar con el Guardia.
+        :return: Resultado con los mensajes y efectos producidos.
+        """
+        jugador = self.current_player
+        if self.chanciller_pendiente is not None:
+            raise ValueError("Hay un Chanciller pendiente de resolver.")
+        if not self.puede_jugar(jugador, carta):
+            raise ValueError(f"{jugador.nombre} no puede jugar {carta}.")
+        efecto = EFECTOS[carta.id]
+        objetivos = efecto.objetivos(self, jugador)
+        if objetivos and objetivo not in objetivos:
+            raise ValueError(f"Objetivo no válido para {carta.nombre}.")
+        if not objetivos:
+            objetivo = None
+
+        jugador.mano.remove(carta)
+        self.discard_pile.append(carta)
+        self._jugadas = None
+        self.historial.append((carta.id, None if objetivo is None else self.jugadores.index(objetivo),
+                               adivinanza if efecto.requiere_adivinanza else None))
+        resultado = Resultado(jugador, carta, objetivo, adivinanza if efecto.requiere_adivinanza else None)
+        resultado.log(f"{jugador.nombre} juega: {carta}")
+
+        if efecto.requiere_objetivo and objetivo is None:
+            resultado.log(f"No hay objetivos válidos para {carta.nombre}.")
+        else:
+            efecto.resolver(self, jugador, carta, objetivo, adivinanza, resultado)
+        return resultado
+
+    def resolver_chanciller(self, conservada, devueltas):
+        """
+        Completa el Chanciller: el jugador se queda `conservada` y el resto va al fondo del mazo.
+        :param devueltas: Cartas devueltas, en el orden en que se colocan al fondo.
+        """
+        jugador = self.current_player
+        restantes = list(jugador.mano)
+        if conservada not in restantes:
+            raise ValueError("La carta conservada no está en la mano.")
+        restantes.remove(conservada)
+        for carta in devueltas:
+            if carta not in restantes:
+                raise ValueError("Solo se pueden devolver las cartas robadas.")
+            restantes.remove(carta)
+        if restantes:
+            raise ValueError("Hay que devolver todas las cartas salvo una.")
+
+        jugador.mano[:] = [conservada]
+        for carta in devueltas:
+            self.deck.poner_al_fondo(carta)
+        self.chanciller_pendiente = None
+        self.historial.append((conservada.id, tuple(carta.id for carta in devueltas)))
+        resultado = Resultado(jugador, None)
+        resultado.log(f"{jugador.nombre} ha devuelto las cartas al final del mazo.")
+        return resultado
+
     def determinar_ganador(self):
         activos = [j for j in self.jugadores if not j.eliminado]
         if len(activos) == 1:
@@ -0,0 +1,162 @@
+# perfil.py
+# Instrumentación opcional del cliente Kivy: mide la duración de cada frame, de los
+# métodos de GameScreen que más trabajo hacen, de los callbacks que la aplicación
+# programa en el Clock y de las transiciones de pantalla. Muestra un resumen en
+# pantalla y exporta una traza JSON que se abre en chrome://tracing (o en
+# https://ui.perfetto.dev).
+#
+# Los métodos se sustituyen en su clase (MEDIDOS), no en el Clock ni en la instancia:
+# así los bind() y los Clock.schedule_* que se hagan después reciben un método ligado
+# normal, ya medido, y el Clock mantiene su referencia débil y su unschedule. Los
+# módulos que se importan al crear una pantalla diferida se instrumentan justo antes
+# de construirla.
+#
+# Se activa con la variable de entorno CHANCILLER_PERFIL=1; la traza se guarda al
+# cerrar la aplicación en CHANCILLER_PERFIL_SALIDA (por defecto perfil-<fecha>.json).
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from kivy.clock import Clock
+from kivy.uix.label import Label
+
+METODOS_GAME_SCREEN = ('update_ui', 'play_card', 'complete_card_play', 'next_turn', 'resolver_jugada')
+# (módulo, clase, métodos, categoría) que se miden
+MEDIDOS = (
+    ('interfaz', 'GameScreen', METODOS_GAME_SCREEN, 'metodo'),
+    ('interfaz', 'GameScreen', ('aplicar_decision_bot',), 'clock'),
+    ('interfaz', 'LogView', ('_volcar_pendientes',), 'clock'),
+    ('animaciones', 'Animador', ('_paso',), 'clock'),
+    ('audio', 'ServicioAudio', ('_vigilar',), 'clock'),
+    ('mezclador', 'Mezclador', ('_sondear',), 'clock'),
+)
+MAX_EVENTOS = 200000  # Eventos de la traza que se conservan (los más antiguos se descartan)
+
+
+def activado():
+    return os.environ.get('CHANCILLER_PERFIL', '') not in ('', '0')
+
+
+class Perfilador:
+    def __init__(self, max_eventos=MAX_EVENTOS):
+        self.eventos = deque(maxlen=max_eventos)
+        self.inicio = time.perf_counter()
+        self.frames = deque(maxlen=120)  # Duraciones de los últimos frames, en segundos
+        self._pid = os.getpid()
+        self._originales = {}
+        self.overlay = None
+
+    # -----------------------------
+    # Registro
+    # -----------------------------
+    def _ts(self, instante):
+        return (instante - self.inicio) * 1e6  # Microsegundos, como espera el formato de Chrome
+
+    def registrar(self, nombre, categoria, inicio, fin, **args):
+        """Añade un evento completo ("X") a la traza. `inicio` y `fin` son de time.perf_counter()."""
+        evento = {"name": nombre, "cat": categoria, "ph": "X", "ts": self._ts(inicio),
+                  "dur": (fin - inicio) * 1e6, "pid": self._pid, "tid": threading.get_ident()}
+        if args:
+            evento["args"] = args
+        self.eventos.append(evento)
+
+    def marca(self, nombre, categoria, **args):
+        """Evento instantáneo ("i")."""
+        self.eventos.append({"name": nombre, "cat": categoria, "ph": "i", "s": "p",
+                             "ts": self._ts(time.perf_counter()), "pid": self._pid,
+                             "tid": threading.get_ident(), "args": args})
+
+    def medir(self, nombre, categoria='metodo'):
+        """Decorador que registra la duración de cada llamada."""
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    return funcion(*args, **kwargs)
+                finally:
+                    self.registrar(nombre, categoria, inicio, time.perf_counter())
+            return envoltura
+        return decorador
+
+    # -----------------------------
+    # Instrumentación
+    # -----------------------------
+    def instrumentar_clases(self, *args):
+        """Sustituye en su clase los métodos de MEDIDOS cuyo módulo ya está importado (una sola vez)."""
+        for modulo, nombre_clase, nombres, categoria in MEDIDOS:
+            if modulo not in sys.modules:
+                continue
+            clase = getattr(sys.modules[modulo], nombre_clase)
+            for nombre in nombres:
+                if (clase, nombre) in self._originales:
+                    continue
+                original = clase.__dict__.get(nombre)
+                self._originales[clase, nombre] = original
+                setattr(clase, nombre, self.medir(f"{nombre_clase}.{nombre}", categoria)(getattr(clase, nombre)))
+
+    def restaurar_clases(self):
+        for (clase, nombre), original in self._originales.items():
+            if original is None:
+                delattr(clase, nombre)  # El método era heredado
+            else:
+                setattr(clase, nombre, original)
+        self._originales = {}
+
+    def instrumentar_pantallas(self, screen_manager):
+        """Mide cada transición desde que cambia la pantalla hasta que termina la animación."""
+        inicio = [None]
+
+        def al_cambiar(manager, actual):
+            inicio[0] = time.perf_counter()
+            self.marca(f"pantalla: {actual}", 'pantalla')
+
+        def al_completar(transicion):
+            if inicio[0] is not None:
+                self.registrar(f"transición a {screen_manager.current}", 'pantalla', inicio[0], time.perf_counter())
+                inicio[0] = None
+
+        screen_manager.bind(current=al_cambiar)
+        screen_manager.transition.bind(on_complete=al_completar)
+
+    def _al_frame(self, dt):
+        ahora = time.perf_counter()
+        self.frames.append(dt)
+        self.registrar('frame', 'frame', ahora - dt, ahora)
+
+    # -----------------------------
+    # Arranque, overlay y exportación
+    # -----------------------------
+    def iniciar(self, screen_manager, raiz=None):
+        # Antes de que se construyan las pantallas diferidas, para que sus bind() usen los métodos medidos
+        self.instrumentar_clases()
+        screen_manager.al_importar.append(self.instrumentar_clases)
+        self.instrumentar_pantallas(screen_manager)
+        Clock.schedule_interval(self._al_frame, 0)
+        if raiz is not None:
+            self.overlay = Label(size_hint=(None, None), size=(260, 40), pos_hint={'x': 0, 'top': 1},
+                                 color=(1, 0, 0, 1), font_size='13sp')
+            raiz.add_widget(self.overlay)
+            Clock.schedule_interval(self._actualizar_overlay, 0.5)
+
+    def resumen(self):
+        if not self.frames:
+            return {"fps": 0.0, "media_ms": 0.0, "peor_ms": 0.0}
+        media = sum(self.frames) / len(self.frames)
+        return {"fps": 1 / media if media else 0.0, "media_ms": media * 1000, "peor_ms": max(self.frames) * 1000}
+
+    def _actualizar_overlay(self, dt):
+        datos = self.resumen()
+        self.overlay.text = f"{datos['fps']:.0f} fps  media {datos['media_ms']:.1f} ms  peor {datos['peor_ms']:.1f} ms"
+
+    def exportar(self, ruta=None):
+        """Guarda la traza en formato Chrome Trace Event. Devuelve la ruta."""
+        if ruta is None:
+            ruta = os.environ.get('CHANCILLER_PERFIL_SALIDA') or time.strftime('perfil-%Y%m%d-%H%M%S.json')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": list(self.eventos), "displayTimeUnit": "ms"}, f)
+        return ruta
@@ -0,0 +1,280 @@
+# popups.py
+# Gestor de ventanas emergentes. Cada tipo de diálogo se construye una sola vez (la
+# primera vez que se usa) y en las siguientes aperturas solo se reasignan textos,
+# texturas, listas de objetivos y callbacks. Los callbacks se sueltan al cerrar el
+# diálogo para no mantener vivas pantallas o partidas anteriores.
+#
+# El gestor mide cuánto tarda en construirse cada diálogo y cuánto pasa desde que se
+# pide abrirlo hasta el siguiente frame (GESTOR.informe()).
+import time
+from collections import defaultdict
+
+from kivy.clock import Clock
+from kivy.graphics import Color, Rectangle
+from kivy.logger import Logger
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
+
+import animaciones
+from texturas import imagen, textura
+
+COLOR_TEXTO = (0.2, 0.1, 0, 1)
+COLOR_ERROR = (1, 0, 0, 1)
+
+
+def _fondo(widget, color):
+    """Rectángulo de color detrás del widget que sigue su tamaño y posición."""
+    with widget.canvas.before:
+        Color(*color)
+        widget.rect = Rectangle(size=widget.size, pos=widget.pos)
+    widget.bind(size=lambda instance, value: setattr(instance.rect, 'size', value),
+                pos=lambda instance, value: setattr(instance.rect, 'pos', value))
+
+
+class Dialogo:
+    """Popup persistente. Las subclases construyen el árbol en `construir` y lo rellenan en `preparar`."""
+
+    def __init__(self):
+        self.callbacks = {}
+        self.popup = self.construir()
+        self.popup.bind(on_dismiss=self._al_cerrar)
+
+    def construir(self):
+        raise NotImplementedError
+
+    def preparar(self, **datos):
+        pass
+
+    def abrir(self, **datos):
+        self.preparar(**datos)
+        self.popup.open()
+
+    def cerrar(self, *args):
+        self.popup.dismiss()
+
+    def responder(self, nombre, *args):
+        """Cierra el diálogo y llama al callback `nombre`."""
+        callback = self.callbacks.get(nombre)
+        self.cerrar()
+        if callback:
+            callback(*args)
+
+    def _al_cerrar(self, *args):
+        self.callbacks = {}
+
+
+class Aviso(Dialogo):
+    def construir(self):
+        self.label = Label(color=COLOR_TEXTO)
+        return Popup(content=self.label, size_hint=(None, None))
+
+    def preparar(self, titulo, texto, tamano=(300, 200), color=COLOR_TEXTO, font_size='15sp'):
+        self.popup.title = titulo
+        self.popup.size = tamano
+        self.label.text = texto
+        self.label.color = color
+        self.label.font_size = font_size
+
+
+class SeleccionObjetivo(Dialogo):
+    """Lista de jugadores objetivo; los botones se reutilizan entre aperturas."""
+
+    def construir(self):
+        content = BoxLayout(orientation='vertical', spacing=10, padding=10)
+        self.label = Label(font_size='18sp')
+        content.add_widget(self.label)
+        self.buttons_layout = GridLayout(cols=2, spacing=10, padding=10)
+        content.add_widget(self.buttons_layout)
+        self.buttons = []
+        return Popup(content=content, size_hint=(0.8, 0.8), auto_dismiss=False)
+
+    def preparar(self, carta, objetivos, al_elegir):
+        self.popup.title = f'Efecto del {carta.nombre}'
+        self.label.text = f"Selecciona un jugador objetivo para {carta.nombre}:"
+        self.callbacks = {'elegir': al_elegir}
+        while len(self.buttons) < len(objetivos):
+            btn = Button(size_hint_y=None, height=40, background_color=(0.6, 0.4, 0.2, 1), color=(1, 1, 1, 1))
+            btn.bind(on_press=self._elegir)
+            self.buttons.append(btn)
+        self.buttons_layout.clear_widgets()
+        for btn, objetivo in zip(self.buttons, objetivos):
+            btn.text = objetivo.nombre
+            btn.objetivo = objetivo
+            self.buttons_layout.add_widget(btn)
+
+    def _elegir(self, instance):
+        self.responder('elegir', instance.objetivo)
+
+    def _al_cerrar(self, *args):
+        super()._al_cerrar()
+        for btn in self.buttons:
+            btn.objetivo = None
+
+
+class CartaRevelada(Dialogo):
+    """Carta vista con el Sacerdote."""
+
+    def construir(self):
+        content = BoxLayout(orientation='vertical', spacing=10, padding=20)
+        # Fondo semitransparente
+        _fondo(content, (0, 0, 0, 0.5))
+        self.card_image = imagen('images/default_card.png', size_hint=(None, None), size=(200, 300),
+                                 pos_hint={'center_x': 0.5})
+        content.add_widget(self.card_image)
+        self.label = Label(color=(1, 1, 1, 1), font_size='20sp', bold=True)
+        content.add_widget(self.label)
+        close_btn = Button(text="Continuar", size_hint=(None, None), size=(200, 50), pos_hint={'center_x': 0.5},
+                           background_color=(0.8, 0.2, 0.2, 1), color=(1, 1, 1, 1))
+        close_btn.bind(on_press=self._on_press_effect, on_release=self._on_release_effect)
+        close_btn.bind(on_press=lambda instance: self.responder('cerrar'))
+        content.add_widget(close_btn)
+        return Popup(content=content, size_hint=(0.8, 0.8), auto_dismiss=False, background_color=(0, 0, 0, 0))
+
+    @staticmethod
+    def _on_press_effect(instance):
+        instance.background_color = (1, 0.5, 0.5, 1)
+
+    @staticmethod
+    def _on_release_effect(instance):
+        instance.background_color = (0.8, 0.2, 0.2, 1)
+
+    def preparar(self, objetivo, carta, al_cerrar):
+        self.popup.title = f'Carta de {objetivo.nombre}'
+        self.card_image.texture = textura(carta.image_source, (200, 300))
+        self.label.text = objetivo.nombre
+        self.callbacks = {'cerrar': al_cerrar}
+
+
+class Comparacion(Dialogo):
+    """Resultado de la comparación del Barón."""
+
+    def construir(self):
+        content = BoxLayout(orientation='vertical', spacing=10, padding=10)
+        self.label_jugador = Label(font_size='18sp')
+        self.label_objetivo = Label(font_size='18sp')
+        self.label_resultado = Label(font_size='20sp')
+        close_button = Button(text="Cerrar", size_hint=(None, None), size=(100, 50), pos_hint={'center_x': 0.5})
+        close_button.bind(on_press=lambda instance: self.responder('cerrar'))
+        for widget in (self.label_jugador, self.label_objetivo, self.label_resultado, close_button):
+            content.add_widget(widget)
+        return Popup(title='Resultado de la comparación', content=content, size_hint=(0.8, 0.4),
+                     auto_dismiss=False)
+
+    def preparar(self, resultado, al_cerrar):
+        jugador, target = resultado.jugador, resultado.objetivo
+        carta_jugador, carta_target = resultado.comparacion
+        self.label_jugador.text = f"Carta de {jugador.nombre}: {carta_jugador.nombre} ({carta_jugador.valor})"
+        self.label_objetivo.text = f"Carta de {target.nombre}: {carta_target.nombre} ({carta_target.valor})"
+        if resultado.eliminados:
+            self.label_resultado.text = f"{resultado.eliminados[0].nombre} es eliminado del juego"
+            self.label_resultado.color = COLOR_ERROR
+        else:
+            self.label_resultado.text = "¡Empate! Nadie es eliminado"
+            self.label_resultado.color = (1, 1, 1, 1)
+        self.callbacks = {'cerrar': al_cerrar}
+
+
+class DetallesCarta(Dialogo):
+    def construir(self):
+        content = BoxLayout(orientation='vertical', spacing=5, padding=5)
+        card_layout = BoxLayout(orientation='vertical', size_hint=(1, 0.7))
+        self.card_image = imagen('images/default_card.png', size_hint=(None, None), size=(180, 270),
+                                 pos_hint={'center_x': 0.5, 'center_y': 0.5})
+        card_layout.add_widget(self.card_image)
+        content.add_widget(card_layout)
+        self.label = Label(font_size='16sp', color=COLOR_TEXTO, size_hint=(1, 0.2))
+        content.add_widget(self.label)
+
+        btn_layout = BoxLayout(orientation='horizontal', spacing=10, size_hint_y=None, height=40)
+        back_btn = Button(text="Volver", background_color=(0.8, 0.3, 0.2, 1), color=(1, 1, 1, 1))
+        back_btn.bind(on_press=self.cerrar)
+        play_btn = Button(text="Jugar", background_color=(0.6, 0.4, 0.2, 1), color=(1, 1, 1, 1))
+        # El callback decide si se puede jugar y cierra el diálogo él mismo
+        play_btn.bind(on_press=lambda instance: self.callbacks['jugar'](self.carta, self))
+        btn_layout.add_widget(back_btn)
+        btn_layout.add_widget(play_btn)
+        content.add_widget(btn_layout)
+        self.carta = None
+        return Popup(title="Detalles de la carta", content=content, size_hint=(None, None), size=(300, 450),
+                     auto_dismiss=False)
+
+    def preparar(self, carta, al_jugar):
+        self.carta = carta
+        self.card_image.texture = textura(carta.image_source, (180, 270))
+        self.label.text = carta.descripcion
+        self.callbacks = {'jugar': al_jugar}
+
+    def _al_cerrar(self, *args):
+        super()._al_cerrar()
+        self.carta = None
+
+
+class Victoria(Dialogo):
+    def construir(self):
+        content = BoxLayout(orientation='vertical', spacing=10, padding=20)
+        # Fondo para mejorar visibilidad
+        _fondo(content, (0.95, 0.9, 0.8, 1))
+        self.winner_label = Label(font_size='24sp', bold=True, color=(1, 1, 0, 1))
+        content.add_widget(self.winner_label)
+        restart_btn = Button(text="Jugar de nuevo", size_hint=(None, None), size=(200, 50),
+                             pos_hint={'center_x': 0.5}, background_color=(0.2, 0.6, 0.2, 1), color=(1, 1, 1, 1))
+        restart_btn.bind(on_press=lambda instance: self.responder('reiniciar'))
+        content.add_widget(restart_btn)
+        return Popup(title='¡Victoria!', content=content, size_hint=(0.8, 0.8), auto_dismiss=False,
+                     background_color=(0, 0, 0, 0))
+
+    def preparar(self, ganador, al_reiniciar):
+        self.winner_label.text = f"¡{ganador.nombre} ha ganado!"
+        # Pulso con la escala del canvas: animar font_size obligaría a rasterizar el texto en cada frame
+        animaciones.animar(self.winner_label, 1.0, curva='in_out_sine', escala=1.25, ida_y_vuelta=True, repetir=True)
+        self.callbacks = {'reiniciar': al_reiniciar}
+
+    def _al_cerrar(self, *args):
+        super()._al_cerrar()
+        animaciones.restablecer(self.winner_label)
+
+
+class GestorPopups:
+    def __init__(self):
+        self._dialogos = {}
+        self.construccion = {}                # nombre -> ms que tardó en construirse
+        self.aperturas = defaultdict(list)    # nombre -> ms hasta el siguiente frame en cada apertura
+
+    def obtener(self, clase):
+        dialogo = self._dialogos.get(clase)
+        if dialogo is None:
+            inicio = time.perf_counter()
+            dialogo = self._dialogos[clase] = clase()
+            self.construccion[clase.__name__] = (time.perf_counter() - inicio) * 1000
+        return dialogo
+
+    def abrir(self, clase, **datos):
+        inicio = time.perf_counter()
+        dialogo = self.obtener(clase)
+        dialogo.abrir(**datos)
+        Clock.schedule_once(lambda dt: self._registrar(clase.__name__, inicio))
+        return dialogo
+
+    def _registrar(self, nombre, inicio):
+        latencia = (time.perf_counter() - inicio) * 1000
+        self.aperturas[nombre].append(latencia)
+        Logger.debug(f"Popups: {nombre} abierto en {latencia:.1f} ms")
+
+    def informe(self):
+        lineas = []
+        for nombre, construccion in self.construccion.items():
+            aperturas = self.aperturas.get(nombre, [])
+            media = sum(aperturas) / len(aperturas) if aperturas else 0.0
+            lineas.append(f"{nombre}: construcción {construccion:.1f} ms, "
+                          f"apertura media {media:.1f} ms ({len(aperturas)} aperturas)")
+        return "\n".join(lineas)
+
+
+GESTOR = GestorPopups()
+
+
+def aviso(titulo, texto, tamano=(300, 200), color=COLOR_TEXTO, font_size='15sp'):
+    return GESTOR.abrir(Aviso, titulo=titulo, texto=texto, tamano=tamano, color=color, font_size=font_size)
@@ -0,0 +1,426 @@
+# protocolo.py
+# Formato binario de los mensajes entre el servidor (servidor.py) y sus clientes.
+#
+# Cada mensaje es una trama:
+#   longitud   u16  bytes que siguen (versión + tipo + cuerpo)
+#   versión    u8   VERSION; las tramas de otra versión se rechazan
+#   tipo       u8   código del mensaje (TIPOS), o TIPO_JSON en modo depuración
+#   cuerpo          campos del mensaje: ids de carta, asientos y códigos en un byte
+#
+# En modo depuración el cuerpo es el propio mensaje en JSON, con la misma trama, así
+# que el lector no necesita saber en qué modo está el otro extremo.
+#
+# Los mensajes son diccionarios con "tipo" (ver servidor.py); el estado de la mesa
+# viaja en mensajes "delta" (ver sincronizacion.py). La decodificación lee
+# con struct.unpack_from sobre un memoryview de la trama, sin copiar el cuerpo.
+#
+# Uso: python protocolo.py [iteraciones]  comprueba ida y vuelta y tramas corruptas.
+import asyncio
+import json
+import random
+import struct
+import sys
+
+VERSION = 2
+NINGUNO = 0xFF     # Objetivo, adivinanza, asiento... ausente
+NINGUN_TICK = 0xFFFF
+CONSERVAR = 0xFE   # Marca de objetivo de la acción del Chanciller (carta que se conserva)
+
+TIPO_JSON = 0
+TIPOS = {"unirse": 1, "accion": 2, "mesa": 3, "delta": 4, "error": 5, "fin": 6, "ack": 7, "reconectar": 8,
+         "observar": 9}
+NOMBRES_TIPO = {codigo: nombre for nombre, codigo in TIPOS.items()}
+
+# Códigos de error que envía el servidor
+ACCION_NO_VALIDA = 1
+MAL_FORMADO = 2
+INESPERADO = 3
+TEXTOS_ERROR = {ACCION_NO_VALIDA: "Acción no válida.", MAL_FORMADO: "Mensaje mal formado.",
+                INESPERADO: "Mensaje inesperado."}
+
+LONGITUD = struct.Struct('>H')
+CABECERA = struct.Struct('>BB')
+MAX_TRAMA = 0xFFFF
+MESA = struct.Struct('>IBI')              # mesa, asiento, clave
+RECONEXION = struct.Struct('>IBIH')       # mesa, asiento, clave, tick
+DELTA = struct.Struct('>HBH')             # tick, tick - base + 1 (0 sin base), campos presentes
+TICK = struct.Struct('>H')                # Una mesa es una sola partida: no llega a 65535 ticks
+IDENTIFICADOR = struct.Struct('>I')
+TURNO = struct.Struct('>H')
+
+# Bits de los campos presentes en un delta, en el orden en que aparecen
+CAMPOS_DELTA = ("turno", "actual", "mazo", "mano", "jugadores", "descartes", "conocidas", "acciones", "jugada")
+# Bits del estado de cada jugador en el delta
+ELIMINADO, PROTEGIDO = 1, 2
+
+
+class ErrorProtocolo(ValueError):
+    pass
+
+
+def _byte(valor):
+    return NINGUNO if valor is None else valor
+
+
+def _valor(byte):
+    return None if byte == NINGUNO else byte
+
+
+def _tick(tick):
+    return NINGUN_TICK if tick is None else tick
+
+
+def _valor_tick(tick):
+    return None if tick == NINGUN_TICK else tick
+
+
+# -----------------------------
+# Acciones: [carta, objetivo, adivinanza] o [carta] (Chanciller) en tres bytes
+# -----------------------------
+def _codificar_accion(accion):
+    if len(accion) == 1:
+        return bytes((accion[0], CONSERVAR, NINGUNO))
+    carta, objetivo, adivinanza = accion
+    return bytes((carta, _byte(objetivo), _byte(adivinanza)))
+
+
+def _decodificar_accion(datos, posicion):
+    carta, objetivo, adivinanza = datos[posicion:posicion + 3]
+    if objetivo == CONSERVAR:
+        return [carta]
+    return [carta, _valor(objetivo), _valor(adivinanza)]
+
+
+def _codificar_lista(valores):
+    return bytes((len(valores),)) + bytes(valores)
+
+
+def _codificar_texto(texto):
+    datos = texto.encode('utf-8')[:255]
+    return bytes((len(datos),)) + datos
+
+
+class _Lector:
+    """Recorre un memoryview con una posición; los errores de lectura son ErrorProtocolo."""
+    __slots__ = ("datos", "posicion")
+
+    def __init__(self, datos):
+        self.datos = datos
+        self.posicion = 0
+
+    def struct(self, formato):
+        valores = formato.unpack_from(self.datos, self.posicion)
+        self.posicion += formato.size
+        return valores
+
+    def byte(self):
+        if self.posicion >= len(self.datos):
+            raise ErrorProtocolo("Trama truncada.")
+        valor = self.datos[self.posicion]
+        self.posicion += 1
+        return valor
+
+    def bytes(self, cantidad):
+        fin = self.posicion + cantidad
+        if fin > len(self.datos):
+            raise ErrorProtocolo("Trama truncada.")
+        vista = self.datos[self.posicion:fin]
+        self.posicion = fin
+        return vista
+
+    def lista(self):
+        return self.bytes(self.byte()).tolist()
+
+    def texto(self):
+        return bytes(self.bytes(self.byte())).decode('utf-8')
+
+    def fin(self):
+        if self.posicion != len(self.datos):
+            raise ErrorProtocolo("Sobran bytes en la trama.")
+
+
+# -----------------------------
+# Cuerpos de cada tipo de mensaje
+# -----------------------------
+def _cuerpo(mensaje):
+    tipo = mensaje["tipo"]
+    if tipo == "unirse":
+        return _codificar_texto(mensaje["nombre"])
+    if tipo == "accion":
+        return _codificar_accion(mensaje["accion"])
+    if tipo == "mesa":
+        return MESA.pack(mensaje["mesa"], _byte(mensaje["asiento"]), mensaje["clave"]) + bytes(
+            (len(mensaje["nombres"]),)) + b''.join(_codificar_texto(nombre) for nombre in mensaje["nombres"])
+    if tipo == "delta":
+        return _cuerpo_delta(mensaje)
+    if tipo == "error":
+        return bytes((mensaje["codigo"],))
+    if tipo == "fin":
+        return bytes((_byte(mensaje["ganador"]),))
+    if tipo == "ack":
+        return TICK.pack(mensaje["tick"])
+    if tipo == "reconectar":
+        return RECONEXION.pack(mensaje["mesa"], mensaje["asiento"], mensaje["clave"], _tick(mensaje["tick"]))
+    if tipo == "observar":
+        return IDENTIFICADOR.pack(mensaje["mesa"])
+    raise ErrorProtocolo(f"Tipo de mensaje desconocido: {tipo}")
+
+
+def _cuerpo_delta(mensaje):
+    cambios = mensaje["cambios"]
+    presentes = 0
+    for bit, campo in enumerate(CAMPOS_DELTA):
+        if campo in cambios or (campo == "jugada" and mensaje["jugada"] is not None):
+            presentes |= 1 << bit
+    base = mensaje["base"]
+    partes = [DELTA.pack(mensaje["tick"], 0 if base is None else mensaje["tick"] - base + 1, presentes)]
+    if "turno" in cambios:
+        partes.append(TURNO.pack(cambios["turno"]))
+    if "actual" in cambios:
+        partes.append(bytes((_byte(cambios["actual"]),)))
+    if "mazo" in cambios:
+        partes.append(bytes((cambios["mazo"],)))
+    if "mano" in cambios:
+        partes.append(_codificar_lista(cambios["mano"]))
+    if "jugadores" in cambios:
+        partes.append(bytes((len(cambios["jugadores"]),)))
+        for asiento, eliminado, protegido, cartas in cambios["jugadores"]:
+            estado = (ELIMINADO if eliminado else 0) | (PROTEGIDO if protegido else 0)
+            partes.append(bytes((asiento, estado, cartas)))
+    if "descartes" in cambios:
+        desde, nuevos = cambios["descartes"]
+        partes.append(bytes((desde,)) + _codificar_lista(nuevos))
+    if "conocidas" in cambios:
+        partes.append(bytes((len(cambios["conocidas"]),)))
+        partes.extend(bytes(conocida) for conocida in cambios["conocidas"])
+    if "acciones" in cambios:
+        partes.append(bytes((len(cambios["acciones"]),)))
+        partes.extend(_codificar_accion(accion) for accion in cambios["acciones"])
+    if mensaje["jugada"] is not None:
+        partes.append(bytes(_byte(valor) for valor in mensaje["jugada"]))
+    return b''.join(partes)
+
+
+def _leer_cuerpo(tipo, lector):
+    if tipo == "unirse":
+        return {"tipo": tipo, "nombre": lector.texto()}
+    if tipo == "accion":
+        lector.bytes(3)
+        return {"tipo": tipo, "accion": _decodificar_accion(lector.datos, lector.posicion - 3)}
+    if tipo == "mesa":
+        mesa, asiento, clave = lector.struct(MESA)
+        return {"tipo": tipo, "mesa": mesa, "asiento": _valor(asiento), "clave": clave,
+                "nombres": [lector.texto() for _ in range(lector.byte())]}
+    if tipo == "delta":
+        return _leer_delta(lector)
+    if tipo == "error":
+        return {"tipo": tipo, "codigo": lector.byte()}
+    if tipo == "ack":
+        return {"tipo": tipo, "tick": lector.struct(TICK)[0]}
+    if tipo == "reconectar":
+        mesa, asiento, clave, tick = lector.struct(RECONEXION)
+        return {"tipo": tipo, "mesa": mesa, "asiento": asiento, "clave": clave, "tick": _valor_tick(tick)}
+    if tipo == "observar":
+        return {"tipo": tipo, "mesa": lector.struct(IDENTIFICADOR)[0]}
+    return {"tipo": tipo, "ganador": _valor(lector.byte())}
+
+
+def _leer_delta(lector):
+    tick, atraso, presentes = lector.struct(DELTA)
+    if presentes >> len(CAMPOS_DELTA):
+        raise ErrorProtocolo("Campos desconocidos en el delta.")
+    presente = {campo: bool(presentes >> bit & 1) for bit, campo in enumerate(CAMPOS_DELTA)}
+    cambios = {}
+    if presente["turno"]:
+        cambios["turno"] = lector.struct(TURNO)[0]
+    if presente["actual"]:
+        cambios["actual"] = _valor(lector.byte())
+    if presente["mazo"]:
+        cambios["mazo"] = lector.byte()
+    if presente["mano"]:
+        cambios["mano"] = lector.lista()
+    if presente["jugadores"]:
+        jugadores = []
+        for _ in range(lector.byte()):
+            asiento, estado, cartas = lector.bytes(3).tolist()
+            jugadores.append([asiento, bool(estado & ELIMINADO), bool(estado & PROTEGIDO), cartas])
+        cambios["jugadores"] = jugadores
+    if presente["descartes"]:
+        cambios["descartes"] = [lector.byte(), lector.lista()]
+    if presente["conocidas"]:
+        cambios["conocidas"] = [lector.bytes(2).tolist() for _ in range(lector.byte())]
+    if presente["acciones"]:
+        acciones = []
+        for _ in range(lector.byte()):
+            lector.bytes(3)
+            acciones.append(_decodificar_accion(lector.datos, lector.posicion - 3))
+        cambios["acciones"] = acciones
+    jugada = [_valor(valor) for valor in lector.bytes(4)] if presente["jugada"] else None
+    return {"tipo": "delta", "tick": tick, "base": tick - atraso + 1 if atraso else None, "cambios": cambios, "jugada": jugada}
+
+
+# -----------------------------
+# Tramas
+# -----------------------------
+def codificar(mensaje, depuracion=False):
+    """Trama completa (con su longitud) del mensaje. En depuración el cuerpo es JSON."""
+    if depuracion:
+        tipo, cuerpo = TIPO_JSON, json.dumps(mensaje, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    else:
+        try:
+            tipo, cuerpo = TIPOS[mensaje["tipo"]], _cuerpo(mensaje)
+        except (KeyError, TypeError, ValueError, struct.error) as error:
+            raise ErrorProtocolo(f"No se puede codificar {mensaje!r}: {error}") from error
+    longitud = CABECERA.size + len(cuerpo)
+    if longitud > MAX_TRAMA:
+        raise ErrorProtocolo("Mensaje demasiado largo.")
+    return LONGITUD.pack(longitud) + CABECERA.pack(VERSION, tipo) + cuerpo
+
+
+def decodificar(trama, admitir_json=True):
+    """
+    Mensaje de una trama sin el prefijo de longitud (bytes, bytearray o memoryview).
+    Cualquier trama mal formada produce ErrorProtocolo, y también una trama JSON
+    con admitir_json=False (el servidor solo las acepta en modo depuración).
+    """
+    datos = memoryview(trama)
+    if len(datos) < CABECERA.size:
+        raise ErrorProtocolo("Trama truncada.")
+    version, tipo = CABECERA.unpack_from(datos)
+    if version != VERSION:
+        raise ErrorProtocolo(f"Versión de protocolo no admitida: {version}")
+    lector = _Lector(datos[CABECERA.size:])
+    if tipo == TIPO_JSON:
+        if not admitir_json:
+            raise ErrorProtocolo("Mensajes JSON solo en modo depuración.")
+        return _decodificar_json(lector.datos)
+    if tipo not in NOMBRES_TIPO:
+        raise ErrorProtocolo(f"Tipo de mensaje desconocido: {tipo}")
+    try:
+        mensaje = _leer_cuerpo(NOMBRES_TIPO[tipo], lector)
+    except (struct.error, UnicodeDecodeError) as error:
+        raise ErrorProtocolo(str(error)) from error
+    lector.fin()
+    return mensaje
+
+
+def _decodificar_json(datos):
+    """Mensaje JSON de depuración; el cuerpo puede traer cualquier cosa, así que todo fallo es ErrorProtocolo."""
+    try:
+        mensaje = json.loads(bytes(datos).decode('utf-8'))
+    except (TypeError, ValueError, RecursionError) as error:  # JSONDecodeError y UnicodeDecodeError son ValueError
+        raise ErrorProtocolo(str(error)) from error
+    if not isinstance(mensaje, dict) or not isinstance(mensaje.get("tipo"), str) or mensaje["tipo"] not in TIPOS:
+        raise ErrorProtocolo("Mensaje JSON sin tipo válido.")
+    return mensaje
+
+
+async def leer_trama(reader):
+    """Siguiente trama del StreamReader (sin la longitud), o None si la conexión se cerró."""
+    try:
+        cabecera = await reader.readexactly(LONGITUD.size)
+        longitud, = LONGITUD.unpack(cabecera)
+        return memoryview(await reader.readexactly(longitud))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+# -----------------------------
+# Comprobación: ida y vuelta y tramas corruptas
+# -----------------------------
+def mensaje_al_azar(rng):
+    """Mensaje válido con valores al azar, para las comprobaciones."""
+    tipo = rng.choice(list(TIPOS))
+    asiento = rng.randrange(6)
+
+    def accion():
+        if rng.random() < 0.2:
+            return [rng.randrange(10)]
+        return [rng.randrange(10), rng.choice([None, rng.randrange(6)]), rng.choice([None, rng.randrange(10)])]
+
+    if tipo == "unirse":
+        return {"tipo": tipo, "nombre": rng.choice(["Ana", "Jugador 1", "Ñandú", ""])}
+    if tipo == "accion":
+        return {"tipo": tipo, "accion": accion()}
+    if tipo == "mesa":
+        return {"tipo": tipo, "mesa": rng.randrange(2 ** 32), "asiento": rng.choice([None, asiento]),
+                "clave": rng.randrange(2 ** 32), "nombres": [f"J{i}" for i in range(rng.randint(2, 6))]}
+    if tipo == "error":
+        return {"tipo": tipo, "codigo": rng.choice(list(TEXTOS_ERROR))}
+    if tipo == "fin":
+        return {"tipo": tipo, "ganador": rng.choice([None, asiento])}
+    if tipo == "ack":
+        return {"tipo": tipo, "tick": rng.randrange(2 ** 16 - 1)}
+    if tipo == "reconectar":
+        return {"tipo": tipo, "mesa": rng.randrange(2 ** 32), "asiento": asiento, "clave": rng.randrange(2 ** 32),
+                "tick": rng.choice([None, rng.randrange(2 ** 16 - 1)])}
+    if tipo == "observar":
+        return {"tipo": tipo, "mesa": rng.randrange(2 ** 32)}
+    jugadores = rng.randint(2, 6)
+    posibles = {
+        "turno": lambda: rng.randrange(2 ** 16),
+        "actual": lambda: rng.choice([None, rng.randrange(jugadores)]),
+        "mazo": lambda: rng.randrange(22),
+        "mano": lambda: [rng.randrange(10) for _ in range(rng.randint(0, 3))],
+        "jugadores": lambda: [[i, rng.random() < 0.3, rng.random() < 0.3, rng.randrange(4)]
+                              for i in sorted(rng.sample(range(jugadores), rng.randint(1, jugadores)))],
+        "descartes": lambda: [rng.randrange(21), [rng.randrange(10) for _ in range(rng.randint(0, 21))]],
+        "conocidas": lambda: [[i, rng.randrange(10)] for i in sorted(rng.sample(range(jugadores), rng.randint(0, 2)))],
+        "acciones": lambda: [accion() for _ in range(rng.randint(0, 20))],
+    }
+    tick = rng.randrange(256, 2 ** 16 - 1)
+    return {"tipo": tipo, "tick": tick, "base": rng.choice([None, tick - rng.randint(0, 254)]),
+            "cambios": {campo: generar() for campo, generar in posibles.items() if rng.random() < 0.5},
+            "jugada": rng.choice([None, [asiento, rng.randrange(10), rng.choice([None, 1]),
+                                         rng.choice([None, 3])]])}
+
+
+def comprobar(iteraciones=20000, semilla=0):
+    """Ida y vuelta en los dos modos y decodificación de tramas corruptas. Devuelve estadísticas."""
+    rng = random.Random(semilla)
+    tamanos = {modo: 0 for modo in ("binario", "json")}
+    rechazadas = 0
+    for _ in range(iteraciones):
+        mensaje = mensaje_al_azar(rng)
+        for modo, depuracion in (("binario", False), ("json", True)):
+            trama = codificar(mensaje, depuracion)
+            tamanos[modo] += len(trama)
+            decodificado = decodificar(memoryview(trama)[LONGITUD.size:])
+            if decodificado != mensaje:
+                raise AssertionError(f"Ida y vuelta distinta en {modo}: {mensaje!r} -> {decodificado!r}")
+
+        # Tramas corruptas: solo pueden producir ErrorProtocolo (o un mensaje, si siguen siendo válidas)
+        cuerpo = bytearray(codificar(mensaje, rng.random() < 0.2)[LONGITUD.size:])
+        for _ in range(rng.randint(1, 3)):
+            operacion = rng.randrange(3)
+            if operacion == 0 and cuerpo:
+                cuerpo[rng.randrange(len(cuerpo))] = rng.randrange(256)
+            elif operacion == 1 and cuerpo:
+                del cuerpo[rng.randrange(len(cuerpo)):]
+            else:
+                cuerpo.insert(rng.randrange(len(cuerpo) + 1), rng.randrange(256))
+        try:
+            decodificar(cuerpo)
+        except ErrorProtocolo:
+            rechazadas += 1
+
+    # JSON bien formado pero con tipos inesperados
+    for texto in (b'{"tipo":[1]}', b'{"tipo":{}}', b'{"tipo":null}', b'[1]', b'"accion"', b'[' * 50000, b'\xff'):
+        try:
+            decodificar(CABECERA.pack(VERSION, TIPO_JSON) + texto)
+        except ErrorProtocolo:
+            continue
+        raise AssertionError(f"Trama JSON aceptada: {texto[:20]!r}")
+    return tamanos, rechazadas
+
+
+def main():
+    iteraciones = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    tamanos, rechazadas = comprobar(iteraciones)
+    print(f"{iteraciones} mensajes: ida y vuelta correcta en binario y JSON")
+    print(f"Tamaño medio: binario {tamanos['binario'] / iteraciones:.1f} B, JSON {tamanos['json'] / iteraciones:.1f} B")
+    print(f"Tramas corruptas rechazadas con ErrorProtocolo: {rechazadas} de {iteraciones}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+# repeticion.py
+# Formato compacto de repeticiones y reproductor sin interfaz.
+#
+# Una partida queda determinada por su semilla (Partida(jugadores, semilla)) y por la
+# lista de acciones de Partida.historial, así que una repetición solo guarda eso y el
+# ganador:
+#   registro   jugadores u8, semilla u32, ganador u8 (NINGUNO si no terminó), acciones u8
+#   acción     2 bytes:
+#                jugar carta  carta << 4 | objetivo (0xF sin objetivo), adivinanza (0xFF sin ella)
+#                Chanciller   conservada << 4 | 0xE, devuelta1 << 4 | devuelta2 (0xF si falta)
+# Un corpus es un archivo con la cabecera MAGIA + versión y registros seguidos.
+#
+# El reproductor vuelve a jugar cada repetición con las reglas actuales y comprueba
+# que todas las acciones siguen siendo válidas y que gana el mismo jugador: sirve
+# para probar un cambio de reglas contra las partidas guardadas.
+#
+# Uso: python repeticion.py generar RUTA [partidas] [jugadores]  añade partidas al azar al corpus
+#      python repeticion.py RUTA [--procesos N]                  reproduce y compara un corpus
+import os
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bot import acciones, aplicar, avanzar
+from cartas import CATALOGO
+from jugadores import Jugador
+from partida import Partida
+
+MAGIA = b"CHRP"
+VERSION = 1
+REGISTRO = struct.Struct('>BIBB')  # jugadores, semilla, ganador, número de acciones
+NINGUNO = 0xFF
+SIN_OBJETIVO = 0xF
+CHANCILLER = 0xE  # En el lugar del objetivo: la acción resuelve el Chanciller
+LOTE = 2000       # Repeticiones por tarea al reproducir en varios procesos
+
+
+class Divergencia(ValueError):
+    """La repetición no se puede reproducir igual con las reglas actuales."""
+
+    def __init__(self, mensaje, indice=None):
+        super().__init__(mensaje if indice is None else f"Acción {indice}: {mensaje}")
+        self.indice = indice
+
+
+class Repeticion:
+    __slots__ = ("num_jugadores", "semilla", "acciones", "ganador")
+
+    def __init__(self, num_jugadores, semilla, acciones, ganador=None):
+        self.num_jugadores = num_jugadores
+        self.semilla = semilla
+        self.acciones = acciones  # Con el formato de Partida.historial
+        self.ganador = ganador    # Índice del ganador, o None
+
+    @classmethod
+    def de_partida(cls, partida, ganador=None):
+        """:param ganador: Jugador ganador (o None si la partida no ha terminado)."""
+        return cls(len(partida.jugadores), partida.semilla, list(partida.historial),
+                   None if ganador is None else partida.jugadores.index(ganador))
+
+    def __eq__(self, otra):
+        return isinstance(otra, Repeticion) and all(
+            getattr(self, campo) == getattr(otra, campo) for campo in self.__slots__)
+
+
+# -----------------------------
+# Codificación
+# -----------------------------
+def _nibble(valor):
+    if not 0 <= valor < CHANCILLER:
+        raise ValueError(f"No cabe en la repetición: {valor}")
+    return valor
+
+
+def codificar_accion(accion):
+    if len(accion) == 2:
+        conservada, devueltas = accion
+        devueltas = list(devueltas) + [SIN_OBJETIVO] * (2 - len(devueltas))
+        return bytes((_nibble(conservada) << 4 | CHANCILLER, devueltas[0] << 4 | devueltas[1]))
+    carta, objetivo, adivinanza = accion
+    return bytes((_nibble(carta) << 4 | (SIN_OBJETIVO if objetivo is None else _nibble(objetivo)),
+                  NINGUNO if adivinanza is None else adivinanza))
+
+
+def decodificar_accion(primero, segundo):
+    carta, objetivo = primero >> 4, primero & 0xF
+    if objetivo == CHANCILLER:
+        return carta, tuple(devuelta for devuelta in (segundo >> 4, segundo & 0xF) if devuelta != SIN_OBJETIVO)
+    return (carta, None if objetivo == SIN_OBJETIVO else objetivo,
+            None if segundo == NINGUNO else segundo)
+
+
+def codificar(repeticion):
+    if len(repeticion.acciones) > 0xFF:
+        raise ValueError("Demasiadas acciones para una repetición.")
+    return REGISTRO.pack(repeticion.num_jugadores, repeticion.semilla,
+                         NINGUNO if repeticion.ganador is None else repeticion.ganador,
+                         len(repeticion.acciones)) + b''.join(map(codificar_accion, repeticion.acciones))
+
+
+def decodificar(datos, posicion=0):
+    """Repetición que empieza en `posicion`. Devuelve (repeticion, posición siguiente)."""
+    try:
+        num_jugadores, semilla, ganador, num_acciones = REGISTRO.unpack_from(datos, posicion)
+    except struct.error as error:
+        raise ValueError("Repetición truncada.") from error
+    posicion += REGISTRO.size
+    fin = posicion + 2 * num_acciones
+    if fin > len(datos):
+        raise ValueError("Repetición truncada.")
+    acciones = [decodificar_accion(datos[i], datos[i + 1]) for i in range(posicion, fin, 2)]
+    return Repeticion(num_jugadores, semilla, acciones, None if ganador == NINGUNO else ganador), fin
+
+
+# -----------------------------
+# Corpus
+# -----------------------------
+class Corpus:
+    """Archivo de repeticiones al que se van añadiendo partidas terminadas."""
+
+    def __init__(self, ruta):
+        nuevo = not os.path.exists(ruta) or os.path.getsize(ruta) == 0
+        self.archivo = open(ruta, 'ab')
+        if nuevo:
+            self.archivo.write(MAGIA + bytes((VERSION,)))
+        self.guardadas = 0
+
+    def agregar(self, partida, ganador=None):
+        self.archivo.write(codificar(Repeticion.de_partida(partida, ganador)))
+        self.guardadas += 1
+
+    def cerrar(self):
+        self.archivo.close()
+
+
+def _registros(datos):
+    if datos[:len(MAGIA)] != MAGIA or len(datos) <= len(MAGIA) or datos[len(MAGIA)] != VERSION:
+        raise ValueError("No es un corpus de repeticiones de esta versión.")
+    return memoryview(datos)[len(MAGIA) + 1:]
+
+
+def leer(ruta):
+    """Todas las repeticiones del corpus."""
+    with open(ruta, 'rb') as archivo:
+        datos = _registros(archivo.read())
+    repeticiones, posicion = [], 0
+    while posicion < len(datos):
+        repeticion, posicion = decodificar(datos, posicion)
+        repeticiones.append(repeticion)
+    return repeticiones
+
+
+# -----------------------------
+# Reproducción
+# -----------------------------
+def aplicar_accion(partida, accion):
+    """Aplica una acción con el formato de Partida.historial."""
+    if len(accion) == 2:
+        conservada, devueltas = accion
+        return partida.resolver_chanciller(CATALOGO[conservada], [CATALOGO[carta] for carta in devueltas])
+    carta, objetivo, adivinanza = accion
+    return partida.jugar_carta(CATALOGO[carta], None if objetivo is None else partida.jugadores[objetivo],
+                               adivinanza)
+
+
+def reproducir(repeticion):
+    """
+    Vuelve a jugar la repetición con las reglas actuales y devuelve la partida final.
+    Lanza Divergencia si una acción ya no es válida o el final no coincide.
+    """
+    partida = Partida([Jugador(f"Jugador {i + 1}") for i in range(repeticion.num_jugadores)], repeticion.semilla)
+    partida.repartir_inicial()
+    ganador = avanzar(partida)
+    for indice, accion in enumerate(repeticion.acciones):
+        if ganador is not None:
+            raise Divergencia("la partida ya había terminado", indice)
+        try:
+            aplicar_accion(partida, accion)
+        except (ValueError, IndexError) as error:
+            raise Divergencia(str(error), indice) from error
+        ganador = avanzar(partida)
+    indice = None if ganador is None else partida.jugadores.index(ganador)
+    if indice != repeticion.ganador:
+        raise Divergencia(f"gana {indice} en lugar de {repeticion.ganador}")
+    return partida
+
+
+def _reproducir_lote(datos):
+    """Reproduce los registros seguidos de `datos`. Devuelve (total, [(número, motivo), ...])."""
+    total, divergencias, posicion = 0, [], 0
+    while posicion < len(datos):
+        repeticion, posicion = decodificar(datos, posicion)
+        try:
+            reproducir(repeticion)
+        except Divergencia as divergencia:
+            divergencias.append((total, str(divergencia)))
+        total += 1
+    return total, divergencias
+
+
+def _lotes(datos, tamano=LOTE):
+    """Trocea los registros en bloques de `tamano` repeticiones (solo lee las cabeceras)."""
+    inicio = posicion = contadas = 0
+    while posicion < len(datos):
+        if posicion + REGISTRO.size > len(datos):
+            raise ValueError("Repetición truncada.")
+        posicion += REGISTRO.size + 2 * datos[posicion + REGISTRO.size - 1]
+        contadas += 1
+        if contadas == tamano:
+            yield bytes(datos[inicio:posicion])
+            inicio, contadas = posicion, 0
+    if contadas:
+        yield bytes(datos[inicio:posicion])
+
+
+def comprobar_corpus(ruta, procesos=1):
+    """Reproduce todo el corpus. Devuelve (repeticiones, divergencias [(número, motivo)])."""
+    with open(ruta, 'rb') as archivo:
+        datos = _registros(archivo.read())
+    if procesos <= 1:
+        return _reproducir_lote(datos)
+    total, divergencias = 0, []
+    with ProcessPoolExecutor(procesos) as pool:
+        for cantidad, lote in pool.map(_reproducir_lote, _lotes(datos)):
+            divergencias.extend((total + numero, motivo) for numero, motivo in lote)
+            total += cantidad
+    return total, divergencias
+
+
+def generar(ruta, num_partidas, num_jugadores=2, semilla=None):
+    """
+    Añade al corpus (o lo crea) partidas con acciones legales al azar.
+    Devuelve los bytes añadidos al archivo.
+    """
+    rng = random.Random(semilla)
+    antes = os.path.getsize(ruta) if os.path.exists(ruta) else 0
+    corpus = Corpus(ruta)
+    for _ in range(num_partidas):
+        partida = Partida([Jugador(f"Jugador {i + 1}") for i in range(num_jugadores)], rng.getrandbits(32))
+        partida.repartir_inicial()
+        ganador = avanzar(partida)
+        while ganador is None:
+            aplicar(partida, rng.choice(acciones(partida)))
+            ganador = avanzar(partida)
+        corpus.agregar(partida, ganador)
+    corpus.cerrar()
+    return os.path.getsize(ruta) - antes
+
+
+def main():
+    argumentos = sys.argv[1:]
+    if argumentos and argumentos[0] == 'generar':
+        ruta = argumentos[1]
+        num_partidas = int(argumentos[2]) if len(argumentos) > 2 else 10000
+        num_jugadores = int(argumentos[3]) if len(argumentos) > 3 else 2
+        # El corpus puede tener ya partidas: solo cuenta lo que se añade ahora
+        anadidos = generar(ruta, num_partidas, num_jugadores)
+        print(f"{num_partidas} partidas añadidas a {ruta}: {anadidos} bytes "
+              f"({anadidos / num_partidas:.1f} por partida)")
+        return
+    procesos = 1
+    if '--procesos' in argumentos:
+        posicion = argumentos.index('--procesos')
+        procesos = int(argumentos[posicion + 1])
+        del argumentos[posicion:posicion + 2]
+    ruta = argumentos[0]
+    inicio = time.perf_counter()
+    total, divergencias = comprobar_corpus(ruta, procesos)
+    segundos = time.perf_counter() - inicio
+    print(f"{total} repeticiones en {segundos:.2f} s ({total / segundos:.0f} por segundo)")
+    for numero, motivo in divergencias[:20]:
+        print(f"  Repetición {numero}: {motivo}")
+    print(f"Divergencias: {len(divergencias)}")
+    sys.exit(1 if divergencias else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,446 @@
+# servidor.py
+# Servidor asyncio que aloja muchas mesas a la vez en un solo proceso. Cada mesa es
+# una partida.Partida con su propia tarea y su propia cola de acciones: un error en
+# una mesa la cierra sin afectar a las demás. El servidor valida cada acción contra
+# las jugadas legales del turno y, después de cada cambio, envía a cada jugador y
+# espectador la diferencia entre su vista de la mesa y la última que ha confirmado
+# (sincronizacion.py): su mano, y de los rivales solo lo público y lo que ha visto.
+#
+# Mensajes (tramas binarias de protocolo.py, o JSON con depuracion=True; sin ella las
+# tramas JSON de los clientes se rechazan):
+#   cliente -> servidor  {"tipo": "unirse", "nombre": ...}
+#                        {"tipo": "accion", "accion": [id_carta, objetivo, adivinanza] | [id_carta]}
+#                        {"tipo": "ack", "tick": ...}      (último delta aplicado)
+#                        {"tipo": "reconectar", "mesa": ..., "asiento": ..., "clave": ..., "tick": ... | None}
+#                        {"tipo": "observar", "mesa": ...} (entrar como espectador)
+#   servidor -> cliente  {"tipo": "mesa", "mesa": ..., "asiento": ... | None, "clave": ..., "nombres": [...]}
+#                        {"tipo": "delta", "tick": ..., "base": ..., "cambios": {...}, "jugada": ...}
+#                        {"tipo": "error", "codigo": ...}  (protocolo.TEXTOS_ERROR)
+#                        {"tipo": "fin", "ganador": asiento o None}
+# Las acciones usan la misma codificación que bot.acciones. La jugada del delta es
+# [asiento, carta, objetivo, adivinanza] de la última jugada, si la hubo.
+#
+# Si un jugador se desconecta, su asiento se guarda PLAZO_RECONEXION segundos: con
+# la clave que recibió en el mensaje "mesa" puede volver a sentarse, y recibe solo
+# lo que cambió desde el último tick que aplicó.
+#
+# Contrapresión: la cola de acciones de cada mesa está acotada (el lector de la
+# conexión espera a que haya hueco, y con él deja de leer del socket) y lo pendiente
+# de enviar a cada conexión también: un cliente que no lee sus mensajes se desconecta
+# en lugar de acumularlos en memoria.
+#
+# Con corpus=RUTA cada partida terminada se guarda como repetición (repeticion.py).
+#
+# Con diario=DIRECTORIO cada acción se anota en un diario (diario.py) que se confirma
+# en disco cada diario.INTERVALO segundos. Si el proceso cae, al arrancar de nuevo
+# con el mismo directorio las partidas abiertas se recuperan con todos sus asientos
+# libres durante el plazo de reconexión: los jugadores vuelven con su clave y reciben
+# el estado completo. Lo que cada uno sabía de las manos rivales no se guarda.
+#
+# Uso: python servidor.py [puerto] [jugadores_por_mesa] [--corpus RUTA] [--diario DIRECTORIO] [--depuracion]
+import asyncio
+import random
+import secrets
+import sys
+
+import protocolo
+from protocolo import ACCION_NO_VALIDA, INESPERADO, MAL_FORMADO, ErrorProtocolo
+
+from bot import acciones, aplicar, avanzar
+from cartas import CATALOGO
+from diario import Diario, turno_por_empezar
+from jugadores import Jugador
+from partida import Partida
+from repeticion import Corpus
+from sincronizacion import Conocimiento, Sincronizador, instantanea
+
+PUERTO = 8765
+JUGADORES_POR_MESA = 2
+COLA_MESA = 64        # Acciones pendientes por mesa
+MAX_SALIDA = 256 * 1024  # Bytes pendientes de enviar por conexión antes de cerrarla
+BACKLOG = 4096        # Conexiones pendientes de aceptar (las pruebas de carga conectan miles a la vez)
+PLAZO_RECONEXION = 30.0  # Segundos que se guarda el asiento de un jugador desconectado
+MAX_ESPECTADORES = 32    # Por mesa
+
+
+def _entero(valor):
+    """Los mensajes JSON de depuración pueden traer cualquier tipo donde se espera un número."""
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+def _accion_valida(accion):
+    """[carta, objetivo, adivinanza] o [carta] (Chanciller), con enteros o None: 0.0 o True no son una carta."""
+    if not isinstance(accion, list) or len(accion) not in (1, 3) or not _entero(accion[0]):
+        return False
+    return all(valor is None or _entero(valor) for valor in accion[1:])
+
+
+class Conexion:
+    """
+    Un cliente conectado. Los mensajes se escriben directamente en el transporte;
+    si lo pendiente de enviar supera MAX_SALIDA el cliente no está leyendo y se cierra.
+    """
+
+    def __init__(self, reader, writer, depuracion=False):
+        self.reader = reader
+        self.writer = writer
+        self.depuracion = depuracion
+        self.nombre = None
+        self.mesa = None
+        self.asiento = None
+        self.sincronizador = None  # Lo enviado y confirmado del estado de su mesa
+        self.cerrada = False
+
+    def enviar(self, mensaje):
+        if self.cerrada:
+            return
+        self.writer.write(protocolo.codificar(mensaje, self.depuracion))
+        if self.writer.transport.get_write_buffer_size() > MAX_SALIDA:
+            self.cerrar()
+
+    def cerrar(self):
+        if not self.cerrada:
+            self.cerrada = True
+            self.writer.transport.abort()
+
+
+class Mesa:
+    """
+    :param conexiones: Conexión de cada asiento (None en los asientos libres).
+    :param partida: Partida ya empezada, con `claves`, si se recupera del diario.
+    :param diario: Diario en el que se anotan las acciones (opcional).
+    """
+
+    def __init__(self, identificador, conexiones, semilla=None, partida=None, claves=None, diario=None):
+        self.id = identificador
+        self.conexiones = conexiones  # Por asiento; None mientras el jugador está desconectado
+        self.recuperada = partida is not None
+        if partida is None:
+            partida = Partida([Jugador(conexion.nombre) for conexion in conexiones], semilla)
+        self.partida = partida
+        self.nombres = [jugador.nombre for jugador in partida.jugadores]
+        self.claves = claves or [secrets.randbits(32) for _ in conexiones]
+        self.diario = diario
+        self.espectadores = []
+        self.entrada = asyncio.Queue(COLA_MESA)  # (asiento, acción)
+        self.conocimiento = Conocimiento(len(conexiones))
+        self.sincronizadores = [Sincronizador() for _ in conexiones]
+        self.tick = 0
+        self.ganador = None
+        self.terminada = False
+        self.abandonos = {}  # asiento -> temporizador de su plazo de reconexión
+        for asiento, conexion in enumerate(conexiones):
+            if conexion is not None:
+                self._sentar(asiento, conexion)
+        self.tarea = None
+
+    def _sentar(self, asiento, conexion):
+        conexion.mesa, conexion.asiento = self, asiento
+        conexion.sincronizador = self.sincronizadores[asiento]
+        self.conexiones[asiento] = conexion
+        conexion.enviar({"tipo": "mesa", "mesa": self.id, "asiento": asiento, "clave": self.claves[asiento],
+                         "nombres": self.nombres})
+
+    def _jugada(self, resultado):
+        """[asiento, carta, objetivo, adivinanza] de la jugada, o None (Chanciller resuelto)."""
+        if resultado is None:
+            return None
+        jugadores = self.partida.jugadores
+        objetivo = jugadores.index(resultado.objetivo) if resultado.objetivo is not None else None
+        return [jugadores.index(resultado.jugador), resultado.carta.id, objetivo, resultado.adivinanza]
+
+    def _enviar_estado(self, conexion, asiento, jugada=None):
+        vista = instantanea(self.partida, asiento, self.conocimiento, self.ganador is not None)
+        conexion.enviar(conexion.sincronizador.mensaje(self.tick, vista, jugada))
+
+    def difundir(self, resultado=None):
+        """Nuevo tick: cada jugador y espectador recibe lo que ha cambiado de su vista."""
+        self.tick += 1
+        jugada = self._jugada(resultado)
+        for asiento, conexion in enumerate(self.conexiones):
+            if conexion is not None:
+                self._enviar_estado(conexion, asiento, jugada)
+        for conexion in self.espectadores:
+            self._enviar_estado(conexion, None, jugada)
+
+    def terminar(self, ganador):
+        self.terminada = True
+        if self.diario is not None:
+            self.diario.terminar(self.id, ganador)
+        for temporizador in self.abandonos.values():
+            temporizador.cancel()
+        for conexion in self.conexiones + self.espectadores:
+            if conexion is not None:
+                conexion.enviar({"tipo": "fin", "ganador": ganador})
+
+    def desconectar(self, conexion):
+        """Deja libre el asiento durante el plazo de reconexión (o quita al espectador)."""
+        if conexion in self.espectadores:
+            self.espectadores.remove(conexion)
+            return
+        asiento = conexion.asiento
+        if self.conexiones[asiento] is not conexion:
+            return
+        self.conexiones[asiento] = None
+        self.abandonos[asiento] = asyncio.get_running_loop().call_later(PLAZO_RECONEXION, self.abandonar)
+
+    def reconectar(self, asiento, conexion, tick):
+        """
+        Vuelve a sentar al jugador y le envía lo que le falta desde el tick que tenía.
+        Si el servidor aún no ha visto caer su conexión anterior, la nueva la sustituye.
+        """
+        anterior = self.conexiones[asiento]
+        if anterior is not None:
+            anterior.cerrar()
+        temporizador = self.abandonos.pop(asiento, None)
+        if temporizador is not None:
+            temporizador.cancel()
+        self._sentar(asiento, conexion)
+        if not conexion.sincronizador.confirmar(tick):
+            conexion.sincronizador.reiniciar()
+        self._enviar_estado(conexion, asiento)
+
+    def observar(self, conexion):
+        conexion.mesa, conexion.sincronizador = self, Sincronizador()
+        self.espectadores.append(conexion)
+        conexion.enviar({"tipo": "mesa", "mesa": self.id, "asiento": None, "clave": 0, "nombres": self.nombres})
+        self._enviar_estado(conexion, None)
+
+    def abandonar(self):
+        """Se acabó el plazo de reconexión: la mesa termina sin ganador."""
+        if self.terminada:
+            return
+        self.terminada = True
+        try:
+            self.entrada.put_nowait((None, None))
+        except asyncio.QueueFull:
+            self.terminar(None)
+            self.tarea.cancel()
+
+    async def jugar(self):
+        """Tarea de la mesa: aplica las acciones de su cola hasta que hay ganador."""
+        partida = self.partida
+        if self.recuperada:
+            # Nadie está sentado todavía: cada asiento tiene el plazo de reconexión para volver
+            bucle = asyncio.get_running_loop()
+            for asiento in range(len(self.conexiones)):
+                self.abandonos[asiento] = bucle.call_later(PLAZO_RECONEXION, self.abandonar)
+            # El diario guarda el estado tras la última acción, quizá antes de pasar turno
+            ganador = avanzar(partida) if turno_por_empezar(partida) else None
+            if ganador is not None:
+                self.ganador = partida.jugadores.index(ganador)
+                self.terminar(self.ganador)
+                return
+        else:
+            partida.repartir_inicial()
+            if self.diario is not None:
+                self.diario.iniciar(self.id, partida, self.claves)
+            avanzar(partida)
+        self.difundir()
+        while True:
+            asiento, accion = await self.entrada.get()
+            if asiento is None:
+                self.terminar(None)  # Un jugador abandonó la mesa
+                return
+            actual = partida.jugadores.index(partida.current_player)
+            if asiento != actual or accion not in acciones(partida):
+                if self.conexiones[asiento] is not None:
+                    self.conexiones[asiento].enviar({"tipo": "error", "codigo": ACCION_NO_VALIDA})
+                continue
+            resultado = self._aplicar(accion)
+            if self.diario is not None:
+                self.diario.actualizar(self.id)
+            if resultado is not None:
+                self.conocimiento.registrar(partida, resultado)
+            else:
+                self.conocimiento.olvidar(actual)  # Ha devuelto cartas al mazo
+            ganador = avanzar(partida)
+            if ganador is not None:
+                self.ganador = partida.jugadores.index(ganador)
+            self.difundir(resultado)
+            if self.ganador is not None:
+                self.terminar(self.ganador)
+                return
+
+    def _aplicar(self, accion):
+        """Aplica una acción ya validada. Devuelve el Resultado de la jugada (None con el Chanciller)."""
+        partida = self.partida
+        if len(accion) == 1:
+            # Chanciller: el orden de las cartas devueltas sale del generador de la partida
+            aplicar(partida, accion)
+            return None
+        id_carta, objetivo, adivinanza = accion
+        return partida.jugar_carta(CATALOGO[id_carta], None if objetivo is None else partida.jugadores[objetivo],
+                                   adivinanza)
+
+
+class Servidor:
+    """
+    :param jugadores_por_mesa: Las mesas empiezan en cuanto se sientan estos jugadores.
+    :param semilla: Semilla para las mesas (opcional, para pruebas reproducibles).
+    :param depuracion: Envía los mensajes en JSON (misma trama) para inspeccionarlos.
+    :param corpus: Archivo al que se añade la repetición de cada partida terminada (opcional).
+    :param diario: Directorio del diario de partidas abiertas (opcional); al iniciar se recuperan.
+    """
+
+    def __init__(self, host='127.0.0.1', puerto=PUERTO, jugadores_por_mesa=JUGADORES_POR_MESA, semilla=None,
+                 depuracion=False, corpus=None, diario=None):
+        self.host = host
+        self.depuracion = depuracion  # Mensajes en JSON en lugar de binario
+        self.puerto = puerto
+        self.jugadores_por_mesa = jugadores_por_mesa
+        self.rng = random.Random(semilla)
+        self.mesas = {}
+        self.esperando = []  # Conexiones sin mesa todavía
+        self.siguiente_id = 0
+        self.terminadas = 0
+        self.errores = 0
+        self.max_mesas = 0
+        self.corpus = Corpus(corpus) if corpus else None
+        self.diario = Diario(diario) if diario else None
+        self.recuperadas = 0
+        self.confirmacion = None  # Tarea que confirma el diario en disco
+        self.servidor = None
+
+    async def iniciar(self):
+        if self.diario is not None:
+            for identificador, (partida, claves) in self.diario.abrir().items():
+                self._alojar(Mesa(identificador, [None] * len(partida.jugadores), partida=partida, claves=claves,
+                                  diario=self.diario))
+            self.recuperadas = len(self.mesas)
+            self.siguiente_id = max(self.mesas, default=-1) + 1
+            self.confirmacion = asyncio.create_task(self.diario.confirmar_periodicamente())
+        self.servidor = await asyncio.start_server(self._atender, self.host, self.puerto, backlog=BACKLOG)
+        self.puerto = self.servidor.sockets[0].getsockname()[1]
+        return self
+
+    async def cerrar(self):
+        self.servidor.close()
+        await self.servidor.wait_closed()
+        for mesa in list(self.mesas.values()):
+            mesa.tarea.cancel()
+        if self.corpus is not None:
+            self.corpus.cerrar()
+        if self.diario is not None:
+            # Las partidas sin terminar siguen abiertas en el diario: se recuperan al volver a iniciar
+            self.confirmacion.cancel()
+            self.diario.cerrar()
+
+    async def _atender(self, reader, writer):
+        conexion = Conexion(reader, writer, self.depuracion)
+        try:
+            while not conexion.cerrada:
+                trama = await protocolo.leer_trama(reader)
+                if trama is None:
+                    break
+                try:
+                    mensaje = protocolo.decodificar(trama, admitir_json=self.depuracion)
+                except ErrorProtocolo:
+                    # La longitud delimita la trama: se puede seguir leyendo la siguiente
+                    conexion.enviar({"tipo": "error", "codigo": MAL_FORMADO})
+                    continue
+                await self._procesar(conexion, mensaje)
+        except ConnectionError:
+            pass
+        finally:
+            self._desconectar(conexion)
+
+    async def _procesar(self, conexion, mensaje):
+        tipo = mensaje.get("tipo")
+        if tipo == "unirse" and conexion.mesa is None and conexion not in self.esperando:
+            conexion.nombre = str(mensaje.get("nombre", "Jugador"))[:32]
+            self.esperando.append(conexion)
+            if len(self.esperando) >= self.jugadores_por_mesa:
+                self._abrir_mesa()
+        elif tipo == "accion" and conexion.asiento is not None and not conexion.mesa.terminada:
+            accion = mensaje.get("accion")
+            if not _accion_valida(accion):
+                conexion.enviar({"tipo": "error", "codigo": MAL_FORMADO})
+                return
+            # Si la mesa va retrasada se espera aquí, y mientras tanto no se lee más del socket
+            await conexion.mesa.entrada.put((conexion.asiento, tuple(accion)))
+        elif tipo == "ack" and conexion.sincronizador is not None and _entero(mensaje.get("tick")):
+            conexion.sincronizador.confirmar(mensaje["tick"])
+        elif tipo == "reconectar" and conexion.mesa is None and conexion not in self.esperando:
+            mesa = self.mesas.get(mensaje.get("mesa")) if _entero(mensaje.get("mesa")) else None
+            asiento, tick = mensaje.get("asiento"), mensaje.get("tick")
+            if (mesa is None or mesa.terminada or not _entero(asiento) or not (tick is None or _entero(tick))
+                    or not 0 <= asiento < len(mesa.claves) or mesa.claves[asiento] != mensaje.get("clave")):
+                conexion.enviar({"tipo": "error", "codigo": INESPERADO})
+                return
+            conexion.nombre = mesa.nombres[asiento]
+            mesa.reconectar(asiento, conexion, mensaje.get("tick"))
+        elif tipo == "observar" and conexion.mesa is None and conexion not in self.esperando:
+            mesa = self.mesas.get(mensaje.get("mesa")) if _entero(mensaje.get("mesa")) else None
+            if mesa is None or mesa.terminada or len(mesa.espectadores) >= MAX_ESPECTADORES:
+                conexion.enviar({"tipo": "error", "codigo": INESPERADO})
+                return
+            mesa.observar(conexion)
+        else:
+            conexion.enviar({"tipo": "error", "codigo": INESPERADO})
+
+    def _abrir_mesa(self):
+        conexiones = self.esperando[:self.jugadores_por_mesa]
+        del self.esperando[:self.jugadores_por_mesa]
+        self._alojar(Mesa(self.siguiente_id, conexiones, self.rng.getrandbits(32), diario=self.diario))
+        self.siguiente_id += 1
+
+    def _alojar(self, mesa):
+        self.mesas[mesa.id] = mesa
+        self.max_mesas = max(self.max_mesas, len(self.mesas))
+        mesa.tarea = asyncio.create_task(mesa.jugar())
+        mesa.tarea.add_done_callback(lambda tarea: self._mesa_terminada(mesa, tarea))
+
+    def _mesa_terminada(self, mesa, tarea):
+        self.mesas.pop(mesa.id, None)
+        if not tarea.cancelled() and tarea.exception() is not None:
+            # El fallo se queda en esta mesa: se avisa a sus jugadores y el resto sigue
+            self.errores += 1
+            print(f"Mesa {mesa.id}: {tarea.exception()!r}", file=sys.stderr)
+            mesa.terminar(None)
+        else:
+            self.terminadas += 1
+            if self.corpus is not None and mesa.ganador is not None:
+                self.corpus.agregar(mesa.partida, mesa.partida.jugadores[mesa.ganador])
+
+    def _desconectar(self, conexion):
+        if conexion in self.esperando:
+            self.esperando.remove(conexion)
+        mesa = conexion.mesa
+        if mesa is not None and not mesa.terminada:
+            mesa.desconectar(conexion)
+        conexion.cerrar()
+
+
+async def servir(puerto=PUERTO, jugadores_por_mesa=JUGADORES_POR_MESA, depuracion=False, corpus=None, diario=None):
+    servidor = await Servidor(puerto=puerto, jugadores_por_mesa=jugadores_por_mesa, depuracion=depuracion,
+                              corpus=corpus, diario=diario).iniciar()
+    print(f"Servidor en 127.0.0.1:{servidor.puerto} ({jugadores_por_mesa} jugadores por mesa)")
+    if servidor.recuperadas:
+        print(f"Partidas recuperadas del diario: {servidor.recuperadas}")
+    async with servidor.servidor:
+        await servidor.servidor.serve_forever()
+
+
+def main():
+    argumentos = [argumento for argumento in sys.argv[1:] if argumento != '--depuracion']
+    depuracion = len(argumentos) != len(sys.argv) - 1
+    corpus = diario = None
+    if '--corpus' in argumentos:
+        posicion = argumentos.index('--corpus')
+        corpus = argumentos[posicion + 1]
+        del argumentos[posicion:posicion + 2]
+    if '--diario' in argumentos:
+        posicion = argumentos.index('--diario')
+        diario = argumentos[posicion + 1]
+        del argumentos[posicion:posicion + 2]
+    puerto = int(argumentos[0]) if len(argumentos) > 0 else PUERTO
+    jugadores_por_mesa = int(argumentos[1]) if len(argumentos) > 1 else JUGADORES_POR_MESA
+    try:
+        asyncio.run(servir(puerto, jugadores_por_mesa, depuracion, corpus, diario))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# simulacion.py
+# Simulación de partidas completas sin interfaz, para pruebas de equilibrio y de IA.
+import random
+import sys
+import time
+
+from cartas import CONDESA
+from efectos import TABLA as EFECTOS, ADIVINANZAS
+from jugadores import Jugador
+from partida import Partida
+
+
+def resolver_chanciller_al_azar(partida, rng=random):
+    """Conserva una carta al azar y devuelve el resto en orden aleatorio."""
+    mano = list(partida.current_player.mano)
+    rng.shuffle(mano)
+    partida.resolver_chanciller(mano[0], mano[1:])
+
+
+def jugar_turno_al_azar(partida, jugador, rng=random):
+    """Juega una carta al azar de la mano del jugador, que ya ha robado."""
+    if partida.debe_jugar_condesa(jugador):
+        carta = next(c for c in jugador.mano if c.id == CONDESA)
+    else:
+        carta = rng.choice(jugador.mano)
+    efecto = EFECTOS[carta.id]
+    objetivos = efecto.objetivos(partida, jugador)
+    objetivo = rng.choice(objetivos) if objetivos else None
+    adivinanza = rng.choice(ADIVINANZAS) if efecto.requiere_adivinanza else None
+    resultado = partida.jugar_carta(carta, objetivo, adivinanza)
+    if resultado.pendiente:
+        resolver_chanciller_al_azar(partida, rng)
+
+
+def jugar_al_azar(partida, rng=random):
+    """Juega una partida completa eligiendo cartas y objetivos al azar. Devuelve el ganador."""
+    partida.repartir_inicial()
+    while True:
+        jugador, _ = partida.iniciar_turno()
+        jugar_turno_al_azar(partida, jugador, rng)
+        ganador = partida.determinar_ganador()
+        if ganador:
+            return ganador
+
+
+def simular(num_partidas, num_jugadores=2, semilla=None):
+    """
+    Simula partidas al azar y devuelve las victorias por posición en la mesa.
+    :param num_partidas: Número de partidas a simular.
+    :param num_jugadores: Número de jugadores por partida.
+    :param semilla: Semilla para repetir exactamente la misma simulación (opcional).
+    """
+    rng = random.Random(semilla)
+    victorias = [0] * num_jugadores
+    for _ in range(num_partidas):
+        jugadores = [Jugador(f"Jugador {i + 1}") for i in range(num_jugadores)]
+        partida = Partida(jugadores, rng.getrandbits(32))
+        ganador = jugar_al_azar(partida, partida.rng)
+        victorias[jugadores.index(ganador)] += 1
+    return victorias
+
+
+def main():
+    num_partidas = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    num_jugadores = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    inicio = time.perf_counter()
+    victorias = simular(num_partidas, num_jugadores)
+    segundos = time.perf_counter() - inicio
+    print(f"{num_partidas} partidas en {segundos:.2f} s ({num_partidas / segundos:.0f} partidas/s)")
+    for i, v in enumerate(victorias):
+        print(f"Jugador {i + 1}: {v / num_partidas:.1%}")
+
+
+if __name__ == "__main__":
+    main()
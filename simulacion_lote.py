@@ -0,0 +1,216 @@
+# simulacion_lote.py
+# Simulación vectorizada de muchas partidas a la vez con NumPy. Cada partida se
+# guarda como una fila de arrays (struct-of-arrays) y todas avanzan un turno por
+# llamada a BatchPartida.paso(), con jugadores que eligen al azar.
+import sys
+import time
+
+import numpy as np
+
+import cartas
+from cartas import crear_baraja, VALOR_POR_ID
+
+SIN_CARTA = -1
+
+# El lote trabaja con valores de carta; se obtienen del registro de cartas
+GUARDIA, BARON, DONCELLA, PRINCIPE, CHANCILLER, REY, CONDESA, PRINCESA = (
+    VALOR_POR_ID[cartas.GUARDIA], VALOR_POR_ID[cartas.BARON], VALOR_POR_ID[cartas.DONCELLA],
+    VALOR_POR_ID[cartas.PRINCIPE], VALOR_POR_ID[cartas.CHANCILLER], VALOR_POR_ID[cartas.REY],
+    VALOR_POR_ID[cartas.CONDESA], VALOR_POR_ID[cartas.PRINCESA])
+
+# Valores que el Guardia puede nombrar (cualquiera salvo el propio Guardia)
+ADIVINANZAS = np.array(sorted(set(VALOR_POR_ID) - {GUARDIA}), dtype=np.int8)
+
+
+class BatchPartida:
+    """
+    Un lote de partidas independientes que avanzan en paralelo.
+    :param num_partidas: Número de partidas del lote.
+    :param num_jugadores: Jugadores por partida.
+    :param semilla: Semilla del generador aleatorio (opcional).
+    """
+
+    def __init__(self, num_partidas, num_jugadores=2, semilla=None):
+        self.num_partidas = num_partidas
+        self.num_jugadores = num_jugadores
+        self.rng = np.random.default_rng(semilla)
+
+        valores = np.array([carta.valor for carta in crear_baraja()], dtype=np.int8)
+        self.tam_mazo = len(valores)
+        # Cada fila se baraja con su propia permutación
+        orden = np.argsort(self.rng.random((num_partidas, self.tam_mazo)), axis=1)
+        # El mazo es un buffer circular: se roba por `cabeza` y se devuelve por el fondo
+        self.deck = valores[orden]
+        self.cabeza = np.zeros(num_partidas, dtype=np.int16)
+        self.restantes = np.full(num_partidas, self.tam_mazo, dtype=np.int16)
+
+        self.manos = np.full((num_partidas, num_jugadores), SIN_CARTA, dtype=np.int8)
+        self.eliminado = np.zeros((num_partidas, num_jugadores), dtype=bool)
+        self.protegido = np.zeros((num_partidas, num_jugadores), dtype=bool)
+        self.turno = np.full(num_partidas, -1, dtype=np.int16)  # Índice del jugador actual
+        self.turnos_jugados = np.zeros(num_partidas, dtype=np.int32)
+        self.ganador = np.full(num_partidas, -1, dtype=np.int8)
+
+        todas = np.arange(num_partidas)
+        for jugador in range(num_jugadores):
+            self.manos[:, jugador] = self._robar(todas)
+
+    # -----------------------------
+    # Mazo
+    # -----------------------------
+    def _robar(self, filas):
+        """Roba la carta superior de cada partida de `filas` (SIN_CARTA si el mazo está vacío)."""
+        cartas = np.full(len(filas), SIN_CARTA, dtype=np.int8)
+        hay = self.restantes[filas] > 0
+        f = filas[hay]
+        cartas[hay] = self.deck[f, self.cabeza[f]]
+        self.cabeza[f] = (self.cabeza[f] + 1) % self.tam_mazo
+        self.restantes[f] -= 1
+        return cartas
+
+    def _poner_al_fondo(self, filas, cartas):
+        pos = (self.cabeza[filas] + self.restantes[filas]) % self.tam_mazo
+        self.deck[filas, pos] = cartas
+        self.restantes[filas] += 1
+
+    def _eliminar(self, filas, jugadores):
+        self.eliminado[filas, jugadores] = True
+        self.manos[filas, jugadores] = SIN_CARTA
+
+    # -----------------------------
+    # Turnos
+    # -----------------------------
+    @property
+    def terminadas(self):
+        return self.ganador >= 0
+
+    def paso(self):
+        """Juega un turno en cada partida no terminada. Devuelve cuántas siguen en juego."""
+        filas = np.nonzero(self.ganador < 0)[0]
+        m = len(filas)
+        if not m:
+            return 0
+        rng = self.rng
+        p = self.num_jugadores
+        ar = np.arange(m)
+
+        # Siguiente jugador que no esté eliminado
+        candidatos = (self.turno[filas, None] + 1 + np.arange(p)) % p
+        libres = ~self.eliminado[filas[:, None], candidatos]
+        jug = candidatos[ar, np.argmax(libres, axis=1)]
+        self.turno[filas] = jug
+        self.protegido[filas, jug] = False
+
+        # Robar y elegir carta (al azar, respetando la regla de la Condesa)
+        mano = self.manos[filas, jug]
+        robada = self._robar(filas)
+        opciones = np.stack([mano, robada], axis=1)
+        eleccion = rng.integers(0, 2, m)
+        eleccion[robada == SIN_CARTA] = 0
+        rey_o_principe = ((opciones == REY) | (opciones == PRINCIPE)).any(axis=1)
+        condesa = (opciones == CONDESA) & rey_o_principe[:, None]
+        forzada = condesa.any(axis=1)
+        eleccion[forzada] = np.argmax(condesa[forzada], axis=1)
+        jugada = opciones[ar, eleccion]
+        conservada = opciones[ar, 1 - eleccion]
+        self.manos[filas, jug] = conservada
+
+        # Objetivo al azar entre los válidos (el Príncipe puede elegirse a sí mismo)
+        validos = ~self.eliminado[filas] & ~self.protegido[filas]
+        validos[ar, jug] &= jugada == PRINCIPE
+        claves = np.where(validos, rng.random((m, p)), -1.0)
+        obj = np.argmax(claves, axis=1)
+        tiene_obj = validos.any(axis=1)
+
+        # Guardia
+        g = np.nonzero((jugada == GUARDIA) & tiene_obj)[0]
+        adivinanza = rng.choice(ADIVINANZAS, len(g))
+        acierto = g[self.manos[filas[g], obj[g]] == adivinanza]
+        self._eliminar(filas[acierto], obj[acierto])
+
+        # Barón
+        b = np.nonzero((jugada == BARON) & tiene_obj)[0]
+        propia = self.manos[filas[b], jug[b]]
+        ajena = self.manos[filas[b], obj[b]]
+        pierde_obj = b[propia > ajena]
+        pierde_jug = b[propia < ajena]
+        self._eliminar(filas[pierde_obj], obj[pierde_obj])
+        self._eliminar(filas[pierde_jug], jug[pierde_jug])
+
+        # Doncella
+        d = np.nonzero(jugada == DONCELLA)[0]
+        self.protegido[filas[d], jug[d]] = True
+
+        # Príncipe
+        pr = np.nonzero((jugada == PRINCIPE) & tiene_obj)[0]
+        descartada = self.manos[filas[pr], obj[pr]]
+        princesa = pr[descartada == PRINCESA]
+        self._eliminar(filas[princesa], obj[princesa])
+        roba = pr[descartada != PRINCESA]
+        self.manos[filas[roba], obj[roba]] = self._robar(filas[roba])
+
+        # Chanciller: roba hasta dos, se queda una al azar y devuelve el resto al fondo
+        c = np.nonzero(jugada == CHANCILLER)[0]
+        if len(c):
+            fc = filas[c]
+            tres = np.stack([self.manos[fc, jug[c]], self._robar(fc), self._robar(fc)], axis=1)
+            presentes = tres != SIN_CARTA
+            claves = np.where(presentes, rng.random((len(c), 3)), -1.0)
+            elegida = np.argmax(claves, axis=1)
+            self.manos[fc, jug[c]] = tres[np.arange(len(c)), elegida]
+            for k in range(3):
+                devolver = presentes[:, k] & (elegida != k)
+                self._poner_al_fondo(fc[devolver], tres[devolver, k])
+
+        # Rey
+        r = np.nonzero((jugada == REY) & tiene_obj)[0]
+        fr = filas[r]
+        propia = self.manos[fr, jug[r]]
+        self.manos[fr, jug[r]] = self.manos[fr, obj[r]]
+        self.manos[fr, obj[r]] = propia
+
+        # Princesa
+        pa = np.nonzero(jugada == PRINCESA)[0]
+        self._eliminar(filas[pa], jug[pa])
+
+        self.turnos_jugados[filas] += 1
+        self._comprobar_ganadores(filas)
+        return int(np.count_nonzero(self.ganador < 0))
+
+    def _comprobar_ganadores(self, filas):
+        activos = ~self.eliminado[filas]
+        num_activos = activos.sum(axis=1)
+        solo = num_activos == 1
+        self.ganador[filas[solo]] = np.argmax(activos[solo], axis=1)
+        # Con el mazo agotado gana la carta más alta (el primero en caso de empate)
+        agotado = (self.restantes[filas] == 0) & (num_activos > 1)
+        fa = filas[agotado]
+        valores = np.where(activos[agotado], np.maximum(self.manos[fa], 0), -1)
+        self.ganador[fa] = np.argmax(valores, axis=1)
+
+    def jugar(self):
+        """Avanza todas las partidas hasta que terminen."""
+        while self.paso():
+            pass
+        return self.ganador
+
+    def victorias(self):
+        """Número de victorias por posición en la mesa."""
+        terminadas = self.ganador[self.ganador >= 0]
+        return np.bincount(terminadas, minlength=self.num_jugadores)
+
+
+def main():
+    num_partidas = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    num_jugadores = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    inicio = time.perf_counter()
+    lote = BatchPartida(num_partidas, num_jugadores)
+    lote.jugar()
+    segundos = time.perf_counter() - inicio
+    print(f"{num_partidas} partidas en {segundos:.2f} s ({num_partidas / segundos:.0f} partidas/s)")
+    for i, v in enumerate(lote.victorias()):
+        print(f"Jugador {i + 1}: {v / num_partidas:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# sincronizacion.py
+# Sincronización del estado de una mesa con instantáneas y diferencias.
+#
+# Cada cambio de la mesa es un tick. Para cada destinatario (un asiento o un
+# espectador) el servidor calcula su instantánea: lo que ese destinatario puede ver
+# de la partida. Es decir, su mano, y de los rivales solo lo público y las cartas que
+# conoce por un Sacerdote, un Barón o un Rey. En lugar de enviarla entera se envía la
+# diferencia respecto a la última instantánea que el cliente ha confirmado (ack).
+# Si se pierde un mensaje, o el cliente tarda en confirmar, la siguiente diferencia
+# parte igualmente de algo que el cliente tiene, así que nunca hace falta reenviar.
+# Al reconectarse, el cliente indica el último tick que aplicó y recibe solo lo que
+# le falta.
+#
+# Las diferencias ("cambios") solo llevan los campos que han cambiado:
+#   turno, actual, mazo       el valor nuevo
+#   mano, conocidas, acciones la lista nueva completa (son cortas)
+#   jugadores                 [[asiento, eliminado, protegido, cartas], ...] de los que cambian
+#   descartes                 [desde, [ids...]]: la pila solo crece, se envía lo añadido
+# Así el tamaño de cada mensaje no depende de lo larga que sea la partida.
+#
+# Uso: python sincronizacion.py [partidas]  comprueba réplicas y conocimiento.
+import sys
+from collections import OrderedDict
+
+from cartas import CATALOGO, PRINCIPE, REY
+
+from bot import acciones
+
+HISTORIAL = 32  # Instantáneas enviadas sin confirmar que se guardan por destinatario
+# Un cliente que lleva más de HISTORIAL ticks sin confirmar recibe instantáneas completas
+
+CAMPOS = ("turno", "actual", "mazo", "mano", "jugadores", "descartes", "conocidas", "acciones")
+VACIA = {"turno": 0, "actual": None, "mazo": 0, "mano": (), "jugadores": (), "descartes": (),
+         "conocidas": (), "acciones": ()}
+
+
+class Conocimiento:
+    """
+    Cartas de los rivales que conoce cada jugador: conocidas[quien][de_quien] = id.
+    Se actualiza con el Resultado de cada jugada. Una carta deja de conocerse cuando
+    su dueño la juega, la descarta, la intercambia o la devuelve al mazo.
+    """
+
+    def __init__(self, num_jugadores):
+        self.conocidas = [[None] * num_jugadores for _ in range(num_jugadores)]
+
+    def de(self, asiento):
+        """[(asiento del rival, id), ...] que conoce el jugador del asiento (nada para espectadores)."""
+        if asiento is None:
+            return ()
+        return tuple((rival, carta) for rival, carta in enumerate(self.conocidas[asiento]) if carta is not None)
+
+    def olvidar(self, asiento):
+        """Nadie sabe ya qué tiene el jugador del asiento."""
+        for fila in self.conocidas:
+            fila[asiento] = None
+
+    def registrar(self, partida, resultado):
+        jugadores = partida.jugadores
+        jugador = jugadores.index(resultado.jugador)
+        objetivo = jugadores.index(resultado.objetivo) if resultado.objetivo is not None else None
+        carta = resultado.carta.id
+        # Quien sabía que tenía esa carta ya no sabe si le queda otra igual
+        for fila in self.conocidas:
+            if fila[jugador] == carta:
+                fila[jugador] = None
+
+        if resultado.revelada is not None:
+            self.conocidas[jugador][objetivo] = resultado.revelada.id
+        if resultado.comparacion is not None:
+            carta_jugador, carta_objetivo = resultado.comparacion
+            self.conocidas[jugador][objetivo] = carta_objetivo.id
+            self.conocidas[objetivo][jugador] = carta_jugador.id
+        if carta == PRINCIPE and resultado.descartada is not None:
+            self.olvidar(objetivo)
+        if carta == REY and objetivo is not None and jugadores[jugador].mano and jugadores[objetivo].mano:
+            # Lo que otros sabían de una mano pasa a la otra; los dos saben lo que han dado
+            for fila in self.conocidas:
+                fila[jugador], fila[objetivo] = fila[objetivo], fila[jugador]
+            self.conocidas[jugador][objetivo] = jugadores[objetivo].mano[0].id
+            self.conocidas[objetivo][jugador] = jugadores[jugador].mano[0].id
+            self.conocidas[jugador][jugador] = self.conocidas[objetivo][objetivo] = None
+        for eliminado in resultado.eliminados:
+            self.olvidar(jugadores.index(eliminado))
+
+
+def instantanea(partida, asiento, conocimiento, terminada=False):
+    """
+    Estado de la mesa visto desde el asiento (None para un espectador), con tuplas
+    para poder guardarlo y compararlo sin copias.
+    """
+    jugadores = partida.jugadores
+    actual = jugadores.index(partida.current_player) if partida.current_player else None
+    return {
+        "turno": partida.turn,
+        "actual": actual,
+        "mazo": len(partida.deck),
+        "mano": tuple(carta.id for carta in jugadores[asiento].mano) if asiento is not None else (),
+        "jugadores": tuple((j.eliminado, j.protegido, len(j.mano)) for j in jugadores),
+        "descartes": tuple(carta.id for carta in partida.discard_pile),
+        "conocidas": conocimiento.de(asiento),
+        "acciones": tuple(map(tuple, acciones(partida)))
+        if asiento is not None and actual == asiento and not terminada else (),
+    }
+
+
+def diferencia(base, actual):
+    """Cambios (en el formato de los mensajes) que llevan de la instantánea `base` a `actual`."""
+    cambios = {}
+    for campo in CAMPOS:
+        anterior, valor = base[campo], actual[campo]
+        if valor == anterior:
+            continue
+        if campo == "jugadores":
+            cambios[campo] = [[asiento, *estado] for asiento, estado in enumerate(valor)
+                              if asiento >= len(anterior) or anterior[asiento] != estado]
+        elif campo == "descartes":
+            desde = len(anterior) if valor[:len(anterior)] == anterior else 0
+            cambios[campo] = [desde, list(valor[desde:])]
+        elif campo in ("mano", "conocidas", "acciones"):
+            cambios[campo] = [list(elemento) if isinstance(elemento, tuple) else elemento for elemento in valor]
+        else:
+            cambios[campo] = valor
+    return cambios
+
+
+def aplicar_diferencia(base, cambios):
+    """Instantánea resultante de aplicar `cambios` a `base`."""
+    estado = dict(base)
+    for campo, valor in cambios.items():
+        if campo == "jugadores":
+            jugadores = list(base["jugadores"])
+            for asiento, eliminado, protegido, cartas in valor:
+                jugadores.extend([None] * (asiento + 1 - len(jugadores)))
+                jugadores[asiento] = (eliminado, protegido, cartas)
+            estado[campo] = tuple(jugadores)
+        elif campo == "descartes":
+            desde, nuevos = valor
+            estado[campo] = base["descartes"][:desde] + tuple(nuevos)
+        elif campo in ("mano", "conocidas", "acciones"):
+            estado[campo] = tuple(tuple(elemento) if isinstance(elemento, list) else elemento
+                                  for elemento in valor)
+        elif campo in CAMPOS:
+            estado[campo] = valor
+    return estado
+
+
+class Sincronizador:
+    """Lado del servidor para un destinatario: qué se le ha enviado y qué ha confirmado."""
+
+    def __init__(self, historial=HISTORIAL):
+        self.historial = historial
+        self.enviadas = OrderedDict()  # tick -> instantánea enviada y aún sin confirmar
+        self.confirmado = None         # Último tick confirmado
+        self.base = VACIA              # Su instantánea
+
+    def confirmar(self, tick):
+        """
+        El cliente tiene aplicado el tick. Devuelve False si ya no se guarda esa
+        instantánea: la siguiente diferencia será entonces una instantánea completa.
+        """
+        if tick is not None and tick == self.confirmado:
+            return True
+        instantanea = self.enviadas.get(tick)
+        if instantanea is None:
+            return False
+        self.confirmado, self.base = tick, instantanea
+        while self.enviadas and next(iter(self.enviadas)) <= tick:
+            self.enviadas.popitem(last=False)
+        return True
+
+    def reiniciar(self):
+        self.enviadas.clear()
+        self.confirmado, self.base = None, VACIA
+
+    def mensaje(self, tick, instantanea, jugada=None):
+        """Mensaje "delta" con la instantánea del tick respecto a la última confirmada."""
+        if self.confirmado is not None and tick - self.confirmado > self.historial:
+            self.reiniciar()
+        self.enviadas[tick] = instantanea
+        if len(self.enviadas) > self.historial:
+            self.enviadas.popitem(last=False)
+        return {"tipo": "delta", "tick": tick, "base": self.confirmado,
+                "cambios": diferencia(self.base, instantanea), "jugada": jugada}
+
+
+class Replica:
+    """
+    Lado del cliente: reconstruye las instantáneas a partir de los mensajes "delta".
+    Guarda las de los ticks que el servidor aún puede usar como base.
+    """
+
+    def __init__(self):
+        self.tick = None
+        self.estado = VACIA
+        self._estados = {}  # tick -> instantánea aplicada
+
+    def aplicar(self, mensaje):
+        """Aplica un mensaje "delta". Devuelve False si no se tiene su base (hay que reconectar)."""
+        base = mensaje["base"]
+        if base is None:
+            anterior = VACIA
+        elif base in self._estados:
+            anterior = self._estados[base]
+        else:
+            return False
+        tick = mensaje["tick"]
+        self.estado = aplicar_diferencia(anterior, mensaje["cambios"])
+        self.tick = tick
+        # El servidor ya no usará como base nada anterior a la base que ha usado ahora
+        self._estados = {t: estado for t, estado in self._estados.items() if base is not None and t >= base}
+        self._estados[tick] = self.estado
+        return True
+
+
+# -----------------------------
+# Comprobación: partidas al azar con mensajes perdidos y confirmaciones tardías
+# -----------------------------
+def comprobar(partidas=2000, jugadores=4, semilla=0):
+    """
+    Juega partidas al azar sincronizando cada asiento y un espectador. Comprueba que
+    las réplicas reconstruyen la instantánea del servidor aunque se pierdan mensajes
+    y que toda carta "conocida" está de verdad en la mano de su dueño.
+    Devuelve (diferencias enviadas, tamaño medio de la diferencia, tamaño medio de la instantánea completa).
+    """
+    import json
+    import random
+
+    from bot import aplicar, avanzar
+    from jugadores import Jugador
+    from partida import Partida
+
+    rng = random.Random(semilla)
+    enviadas = bytes_diferencias = bytes_completas = 0
+    for _ in range(partidas):
+        partida = Partida([Jugador(f"J{i}") for i in range(jugadores)])
+        partida.repartir_inicial()
+        avanzar(partida)
+        conocimiento = Conocimiento(jugadores)
+        asientos = list(range(jugadores)) + [None]
+        sincronizadores = {asiento: Sincronizador() for asiento in asientos}
+        replicas = {asiento: Replica() for asiento in asientos}
+        tick, terminada = 0, False
+        while True:
+            tick += 1
+            for asiento in asientos:
+                vista = instantanea(partida, asiento, conocimiento, terminada)
+                mensaje = sincronizadores[asiento].mensaje(tick, vista)
+                enviadas += 1
+                bytes_diferencias += len(json.dumps(mensaje["cambios"]))
+                bytes_completas += len(json.dumps(diferencia(VACIA, vista)))
+                if rng.random() < 0.2:
+                    continue  # Mensaje perdido
+                assert replicas[asiento].aplicar(mensaje), "Falta la base del delta"
+                assert replicas[asiento].estado == vista
+                if rng.random() < 0.7:
+                    sincronizadores[asiento].confirmar(replicas[asiento].tick)
+            for quien, fila in enumerate(conocimiento.conocidas):
+                for rival, carta in enumerate(fila):
+                    assert carta is None or partida.jugadores[rival].mano.tiene(carta), (quien, rival, carta)
+            if terminada:
+                break
+            actual = partida.jugadores.index(partida.current_player)
+            accion = rng.choice(acciones(partida))
+            if len(accion) == 1:
+                aplicar(partida, accion, rng)
+                conocimiento.olvidar(actual)
+            else:
+                id_carta, objetivo, adivinanza = accion
+                resultado = partida.jugar_carta(CATALOGO[id_carta], None if objetivo is None
+                                                else partida.jugadores[objetivo], adivinanza)
+                conocimiento.registrar(partida, resultado)
+            terminada = avanzar(partida) is not None
+    return enviadas, bytes_diferencias / enviadas, bytes_completas / enviadas
+
+
+def main():
+    partidas = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    enviadas, media_diferencia, media_completa = comprobar(partidas)
+    print(f"{partidas} partidas, {enviadas} deltas: réplicas correctas con un 20% de mensajes perdidos")
+    print(f"Tamaño medio (JSON): diferencia {media_diferencia:.0f} B, instantánea completa {media_completa:.0f} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# solucionador.py
+# Solucionador exhaustivo del final de la partida: cuando quedan pocas cartas en
+# el mazo estima, para cada jugada legal del jugador actual, su probabilidad de
+# ganar. Sirve para las pistas de la interfaz y para evaluar bots sin muestrear.
+#
+# Cómo se calcula (determinización):
+#   - Las cartas que el jugador actual no ve (manos rivales y mazo) se reparten de
+#     todas las formas posibles, cada una con su probabilidad.
+#   - Cada reparto se resuelve como una partida de información perfecta: se recorre
+#     el árbol completo, los robos son nodos de azar sobre el multiconjunto de
+#     cartas del mazo y en cada decisión el jugador de turno elige la jugada que
+#     maximiza su probabilidad de ganar (max-n).
+#   - Los estados se memoizan por su codificación (estado.codificar) en una tabla
+#     LRU de tamaño acotado.
+#
+# El resultado es una aproximación, no la probabilidad exacta: dentro de cada
+# reparto todos juegan viendo las manos de los demás, y al promediar los repartos
+# se supone que cada jugador puede elegir una jugada distinta en cada uno aunque no
+# sepa en cuál está (fusión de estrategias). Además, las cartas devueltas por el
+# Chanciller se tratan como barajadas de nuevo en el mazo, ya que el estado solo
+# guarda el multiconjunto del mazo.
+#
+# El coste crece muy deprisa con el mazo: con el presupuesto por defecto (50 ms)
+# casi todas las posiciones con 2 cartas en el mazo se resuelven, pero con 3 o 4
+# la mayoría agotan el tiempo. Por eso max_cartas es 2 por defecto.
+import time
+from collections import Counter, OrderedDict
+
+from cartas import CATALOGO, Mazo
+from efectos import TABLA as EFECTOS, EfectoChanciller, EfectoPrincipe
+from jugadores import Mano
+
+
+class TiempoAgotado(Exception):
+    """Se ha superado el presupuesto de tiempo del solucionador."""
+
+
+class Solucionador:
+    """
+    :param max_cartas: Solo se resuelven posiciones con este número de cartas o menos en el mazo.
+    :param presupuesto: Segundos máximos por consulta (None para no limitar).
+    :param tam_tabla: Número máximo de estados memoizados.
+    """
+
+    def __init__(self, max_cartas=2, presupuesto=0.05, tam_tabla=200000):
+        self.max_cartas = max_cartas
+        self.presupuesto = presupuesto
+        self.tam_tabla = tam_tabla
+        self.tabla = OrderedDict()
+        self.consultas = 0
+        self.aciertos = 0
+        self._limite = None
+
+    # -----------------------------
+    # API
+    # -----------------------------
+    def evaluar(self, partida):
+        """
+        Probabilidad de victoria estimada del jugador actual para cada una de sus
+        jugadas legales (una aproximación; ver la cabecera del módulo).
+        :return: Diccionario {Jugada: probabilidad}, o None si la posición queda fuera
+                 del alcance del solucionador o se agota el tiempo.
+        """
+        if partida.chanciller_pendiente is not None or len(partida.deck) > self.max_cartas:
+            return None
+        jugadas = partida.jugadas_legales()
+        if not jugadas:
+            return None
+        yo = partida.jugadores.index(partida.current_player)
+        self._limite = time.perf_counter() + self.presupuesto if self.presupuesto else None
+        totales = [0.0] * len(jugadas)
+        try:
+            for peso, mundo in self._mundos(partida, yo):
+                for i, jugada in enumerate(jugadas):
+                    totales[i] += peso * self._aplicar(mundo, jugada, partida)[yo]
+        except TiempoAgotado:
+            return None
+        return dict(zip(jugadas, totales))
+
+    def mejor_jugada(self, partida):
+        """Jugada con mayor probabilidad de victoria estimada, o None si no se pudo resolver."""
+        valores = self.evaluar(partida)
+        if not valores:
+            return None
+        return max(valores, key=valores.get)
+
+    # -----------------------------
+    # Información oculta
+    # -----------------------------
+    def _mundos(self, partida, yo):
+        """Repartos posibles de las cartas no vistas por el jugador `yo`, con su probabilidad."""
+        recuentos = partida.cartas_no_vistas(partida.jugadores[yo])
+        rivales = [i for i, j in enumerate(partida.jugadores) if i != yo and j.mano]
+
+        def repartir(k, peso, manos):
+            if k == len(rivales):
+                yield peso, self._construir_mundo(partida, rivales, manos, recuentos)
+                return
+            total = sum(recuentos)
+            for id_carta, n in enumerate(recuentos):
+                if n:
+                    recuentos[id_carta] -= 1
+                    yield from repartir(k + 1, peso * n / total, manos + [id_carta])
+                    recuentos[id_carta] += 1
+
+        return repartir(0, 1.0, [])
+
+    def _construir_mundo(self, partida, rivales, manos, recuentos):
+        mundo = partida.copiar()
+        for i, id_carta in zip(rivales, manos):
+            mundo.jugadores[i].mano = Mano([CATALOGO[id_carta]])
+        mundo.deck = Mazo([CATALOGO[i] for i, n in enumerate(recuentos) for _ in range(n)])
+        return mundo
+
+    # -----------------------------
+    # Búsqueda
+    # -----------------------------
+    def _valor(self, partida):
+        """Probabilidades de victoria de cada jugador al comienzo de un turno."""
+        clave = partida.estado()
+        self.consultas += 1
+        valor = self.tabla.get(clave)
+        if valor is not None:
+            self.aciertos += 1
+            self.tabla.move_to_end(clave)
+            return valor
+        if self._limite is not None and time.perf_counter() > self._limite:
+            raise TiempoAgotado()
+
+        valor = [0.0] * len(partida.jugadores)
+        for peso, encima in _secuencias(partida.deck, 1):
+            turno = _con_mazo(partida, encima)
+            turno.iniciar_turno()
+            for i, v in enumerate(self._decision(turno)):
+                valor[i] += peso * v
+        valor = tuple(valor)
+
+        self.tabla[clave] = valor
+        if len(self.tabla) > self.tam_tabla:
+            self.tabla.popitem(last=False)
+        return valor
+
+    def _decision(self, partida):
+        """El jugador actual elige la jugada que maximiza su probabilidad de ganar."""
+        yo = partida.jugadores.index(partida.current_player)
+        mejor = None
+        for jugada in partida.jugadas_legales():
+            valor = self._aplicar(partida, jugada, partida)
+            if mejor is None or valor[yo] > mejor[yo]:
+                mejor = valor
+        return mejor
+
+    def _aplicar(self, partida, jugada, origen):
+        """
+        Valor esperado de hacer `jugada` en `partida`. `origen` es la partida a la que
+        pertenecen los jugadores de la jugada (se traducen por posición en la mesa).
+        """
+        efecto = EFECTOS[jugada.carta.id]
+        robos = 0
+        if isinstance(efecto, EfectoChanciller):
+            robos = 2
+        elif isinstance(efecto, EfectoPrincipe) and jugada.objetivo is not None:
+            robos = 1
+        robos = min(robos, len(partida.deck))
+
+        objetivo = None if jugada.objetivo is None else origen.jugadores.index(jugada.objetivo)
+        valor = [0.0] * len(partida.jugadores)
+        for peso, encima in _secuencias(partida.deck, robos):
+            tras = _con_mazo(partida, encima)
+            resultado = tras.jugar_carta(jugada.carta, None if objetivo is None else tras.jugadores[objetivo],
+                                         jugada.adivinanza)
+            if resultado.pendiente:
+                parcial = self._elegir_chanciller(tras)
+            else:
+                parcial = self._fin_de_jugada(tras)
+            for i, v in enumerate(parcial):
+                valor[i] += peso * v
+        return valor
+
+    def _elegir_chanciller(self, partida):
+        yo = partida.jugadores.index(partida.current_player)
+        mano = list(partida.current_player.mano)
+        mejor = None
+        for conservada in set(mano):
+            devueltas = list(mano)
+            devueltas.remove(conservada)
+            opcion = partida.copiar()
+            opcion.resolver_chanciller(conservada, devueltas)
+            valor = self._fin_de_jugada(opcion)
+            if mejor is None or valor[yo] > mejor[yo]:
+                mejor = valor
+        return mejor
+
+    def _fin_de_jugada(self, partida):
+        ganador = partida.determinar_ganador()
+        if ganador is not None:
+            return tuple(1.0 if j is ganador else 0.0 for j in partida.jugadores)
+        return self._valor(partida)
+
+
+def _secuencias(mazo, num):
+    """Secuencias distintas de `num` cartas que pueden salir del mazo, con su probabilidad."""
+    if num == 0:
+        yield 1.0, ()
+        return
+    recuentos = Counter(carta.id for carta in mazo)
+
+    def generar(restantes, total, peso, prefijo):
+        if restantes == 0:
+            yield peso, prefijo
+            return
+        for id_carta, n in list(recuentos.items()):
+            if n:
+                recuentos[id_carta] -= 1
+                yield from generar(restantes - 1, total - 1, peso * n / total, prefijo + (CATALOGO[id_carta],))
+                recuentos[id_carta] += 1
+
+    yield from generar(num, len(mazo), 1.0, ())
+
+
+def _con_mazo(partida, encima):
+    """Copia de la partida con las cartas `encima` en lo alto del mazo, en ese orden."""
+    copia = partida.copiar()
+    if encima:
+        resto = list(partida.deck)
+        for carta in encima:
+            resto.remove(carta)
+        copia.deck = Mazo(list(encima) + resto)
+    return copia
@@ -0,0 +1,208 @@
+# texturas.py
+# Caché de texturas de las cartas. Las imágenes se decodifican una sola vez en un
+# hilo en segundo plano y se suben a atlas (una única textura en la GPU por tamaño).
+# Los widgets comparten las regiones del atlas en lugar de cargar el PNG cada vez
+# que se crean.
+#
+# Si se han generado los assets (generar_assets.py) se usan los atlas ya reducidos
+# del manifiesto y cada widget recibe la variante del tamaño más cercano al que se
+# dibuja. Si no, se monta en la GPU un atlas con los originales reducidos a
+# TAMANO_CARTA.
+#
+# Las imágenes que faltan o no se pueden leer usan la carta por defecto, con un aviso
+# en el log; si tampoco se puede cargar esa, una carta lisa generada aquí.
+import json
+import os
+import threading
+
+from kivy.clock import Clock
+from kivy.core.image import Image as CoreImage, ImageLoader
+from kivy.graphics import Color, Fbo, Rectangle
+from kivy.graphics.texture import Texture
+from kivy.logger import Logger
+from kivy.uix.image import Image
+
+from cartas import CATALOGO
+
+IMAGEN_DORSO = 'images/deck_back.png'
+IMAGEN_DEFECTO = 'images/default_card.png'
+RUTA_MANIFIESTO = 'images/generadas/manifest.json'
+
+# Tamaño de cada carta en el atlas montado al vuelo: el mayor al que se dibuja (popups de 200x300)
+TAMANO_CARTA = (200, 300)
+COLOR_SUSTITUTA = (242, 230, 204, 255)  # Pergamino, como el fondo de la carta por defecto
+
+
+def cargar_manifiesto(ruta=RUTA_MANIFIESTO):
+    """Manifiesto de generar_assets.py, o None si los assets no se han generado."""
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _decodificar_imagen(ruta, **kwargs):
+    """Decodifica sin crear texturas (se puede llamar fuera del hilo de OpenGL)."""
+    if not os.path.exists(ruta):
+        return None
+    try:
+        return ImageLoader.load(ruta, keep_data=True, nocache=True, **kwargs)
+    except Exception:
+        return None
+
+
+class AtlasCartas:
+    def __init__(self, tamano=TAMANO_CARTA, manifiesto=None):
+        self.tamano = tamano
+        self.manifiesto = manifiesto
+        self._texturas = {}       # ruta -> textura (región del atlas o carga individual)
+        self._variantes = {}      # (ancho, alto) -> {ruta: región del atlas de ese tamaño}
+        self._decodificadas = {}  # imágenes decodificadas a la espera de subir a la GPU
+        self._cerrojo = threading.Lock()
+        self._fbo = None
+        self._hilo = None
+        self._sustituta = None    # Textura lisa si ni la carta por defecto se puede cargar
+        self._avisadas = set()    # Rutas de las que ya se ha avisado que faltan
+
+    def precargar(self, rutas):
+        """Decodifica las imágenes en segundo plano y monta los atlas al terminar."""
+        if self._hilo is not None:
+            return
+        rutas = list(dict.fromkeys(rutas))
+        self._hilo = threading.Thread(target=self._decodificar, args=(rutas,), daemon=True)
+        self._hilo.start()
+
+    def _decodificar(self, rutas):
+        # Solo se decodifica: las texturas se crean en el hilo principal (contexto OpenGL)
+        if self.manifiesto:
+            pendientes = [(nombre, atlas["imagen"], {}) for nombre, atlas in self.manifiesto["atlas"].items()]
+            montar = self._montar_variantes
+        else:
+            pendientes = [(ruta, ruta, {'mipmap': True}) for ruta in rutas]
+            montar = self._montar_atlas
+        for clave, ruta, opciones in pendientes:
+            imagen = _decodificar_imagen(ruta, **opciones)
+            if imagen is not None:
+                with self._cerrojo:
+                    self._decodificadas[clave] = imagen
+        Clock.schedule_once(lambda dt: montar(rutas))
+
+    def _tomar_decodificadas(self):
+        with self._cerrojo:
+            decodificadas, self._decodificadas = self._decodificadas, {}
+        return decodificadas
+
+    def _montar_variantes(self, rutas):
+        """Crea las texturas de los atlas pregenerados y recorta sus regiones."""
+        for nombre, imagen in self._tomar_decodificadas().items():
+            atlas = self.manifiesto["atlas"][nombre]
+            textura = imagen.texture
+            variante = {ruta: textura.get_region(*region) for ruta, region in atlas["regiones"].items()}
+            self._completar(variante, rutas)
+            self._variantes[tuple(atlas["tamano"])] = variante
+
+    def _montar_atlas(self, rutas):
+        """Dibuja los originales reducidos en un Fbo que hace de atlas."""
+        decodificadas = self._tomar_decodificadas()
+        if not decodificadas:
+            return
+        ancho, alto = self.tamano
+        columnas = min(len(decodificadas), 4)
+        filas = (len(decodificadas) + columnas - 1) // columnas
+        self._fbo = Fbo(size=(columnas * ancho, filas * alto))
+        posiciones = {}
+        with self._fbo:
+            Color(1, 1, 1, 1)
+            for i, (ruta, imagen) in enumerate(decodificadas.items()):
+                posicion = ((i % columnas) * ancho, (i // columnas) * alto)
+                # Dibujar la imagen completa (con mipmaps) reducida a su hueco del atlas
+                Rectangle(texture=imagen.texture, pos=posicion, size=self.tamano)
+                posiciones[ruta] = posicion
+        self._fbo.draw()
+        atlas = self._fbo.texture
+        for ruta, (x, y) in posiciones.items():
+            self._texturas[ruta] = atlas.get_region(x, y, ancho, alto)
+        self._completar(self._texturas, rutas)
+
+    def _completar(self, texturas, rutas):
+        # Las imágenes que no existen o no se pueden leer usan la carta por defecto
+        defecto = texturas.get(IMAGEN_DEFECTO) or self.sustituta()
+        for ruta in rutas:
+            if ruta not in texturas:
+                self._avisar(ruta)
+                texturas[ruta] = defecto
+
+    def _avisar(self, ruta):
+        if ruta not in self._avisadas:
+            self._avisadas.add(ruta)
+            Logger.warning(f"Texturas: no se ha podido cargar {ruta}, se usa la carta por defecto")
+
+    def sustituta(self):
+        """Carta lisa generada en memoria, para cuando no se puede cargar IMAGEN_DEFECTO."""
+        if self._sustituta is None:
+            self._avisadas.add(IMAGEN_DEFECTO)
+            Logger.warning(f"Texturas: no se ha podido cargar {IMAGEN_DEFECTO}, se usa una carta lisa")
+            ancho, alto = self.tamano
+            self._sustituta = Texture.create(size=self.tamano, colorfmt='rgba')
+            self._sustituta.blit_buffer(bytes(COLOR_SUSTITUTA) * (ancho * alto), colorfmt='rgba', bufferfmt='ubyte')
+        return self._sustituta
+
+    def _tamano_cercano(self, tamano):
+        """El menor tamaño pregenerado que cubre `tamano`, o el mayor si ninguno lo cubre."""
+        disponibles = sorted(self._variantes, key=lambda t: t[0] * t[1])
+        if tamano is not None:
+            for disponible in disponibles:
+                if disponible[0] >= tamano[0] and disponible[1] >= tamano[1]:
+                    return disponible
+        return disponibles[-1]
+
+    def textura(self, ruta, tamano=None):
+        """
+        Textura compartida de la imagen para dibujarla a `tamano` (None = el mayor).
+        Si los atlas aún no están listos se carga esa imagen en el momento y se
+        guarda para no volver a decodificarla.
+        """
+        if self._variantes:
+            textura = self._variantes[self._tamano_cercano(tamano)].get(ruta)
+            if textura is not None:
+                return textura
+        textura = self._texturas.get(ruta)
+        if textura is None:
+            if not os.path.exists(ruta):
+                self._avisar(ruta)
+                ruta = IMAGEN_DEFECTO
+            textura = self._texturas.get(ruta)
+            if textura is None:
+                try:
+                    textura = CoreImage(ruta, mipmap=True).texture
+                except Exception:
+                    if ruta == IMAGEN_DEFECTO:
+                        return self.sustituta()
+                    self._avisar(ruta)
+                    return self.textura(IMAGEN_DEFECTO, tamano)
+                self._texturas[ruta] = textura
+        return textura
+
+
+ATLAS = AtlasCartas(manifiesto=cargar_manifiesto())
+
+
+def rutas_cartas():
+    """Imágenes que usa la interfaz: las caras del catálogo, el dorso y la carta por defecto."""
+    return [carta.image_source for carta in CATALOGO] + [IMAGEN_DORSO, IMAGEN_DEFECTO]
+
+
+def precargar():
+    ATLAS.precargar(rutas_cartas())
+
+
+def textura(ruta, tamano=None):
+    return ATLAS.textura(ruta, tamano)
+
+
+def imagen(ruta, **kwargs):
+    """Widget Image con la textura compartida de `ruta`, del tamaño más cercano a su `size`."""
+    widget = Image(**kwargs)
+    tamano = kwargs.get('size') if kwargs.get('size_hint') == (None, None) else None
+    widget.texture = ATLAS.textura(ruta, tamano)
+    return widget